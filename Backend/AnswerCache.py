@@ -0,0 +1,186 @@
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.Memory import Embed, Dims, StopWords  # Hashed n-gram query vectors
+from Backend.DecisionCache import NormaliseQuery  # Shared query normalisation
+from Backend.Tracing import Span  # Latency tracing
+import numpy as np  # Vector matrix and cosine lookup
+import threading  # Cache lock
+import json  # Entry metadata
+import time  # LRU / TTL
+import re  # Query words
+import os  # Paths
+
+# ========================== Settings ==========================
+AnswerCacheEnabled = env_vars.get("AnswerCache", "True") == "True"
+AnswerCachePath = env_vars.get("AnswerCachePath") or r"Data\AnswerCache"  # .f32 / .json are added
+AnswerCacheSize = int(env_vars.get("AnswerCacheSize") or 2000)  # 1.5 KB of vector per entry
+AnswerCacheThreshold = float(env_vars.get("AnswerCacheThreshold") or 0.9)  # cosine similarity for a hit
+AnswerCacheTTL = float(env_vars.get("AnswerCacheTTLHours") or 720) * 3600
+
+# Answers to these depend on the clock (RealtimeInformation) or on the
+# conversation so far, so they are never cached
+TimeWords = {
+    "time", "date", "day", "today", "tonight", "tomorrow", "yesterday", "now", "week", "month",
+    "year", "current", "currently", "latest", "recent", "recently", "news", "weather",
+}
+ContextWords = {
+    "he", "she", "him", "her", "his", "hers", "it", "its", "they", "them", "their", "this", "that",
+    "these", "those", "more", "again", "previous", "last", "above", "earlier", "my", "me", "i", "we", "our",
+}
+
+# Retrieval may drop "not" and "no"; a cache lookup must not, or "is python
+# not fast" is served the answer to "is python fast". Negations stay in the
+# vectors, and a hit also needs the same polarity: one extra "not" in a long
+# question barely moves the similarity.
+Negations = {
+    "no", "not", "never", "nor", "none", "nothing", "without", "cannot", "cant", "dont", "doesnt",
+    "didnt", "isnt", "arent", "wasnt", "werent", "wont", "wouldnt", "shouldnt", "couldnt", "havent", "hasnt",
+    "mustnt", "neednt", "aint",
+}
+CacheStopWords = (StopWords - Negations) | {"whats", "whos", "hows", "wheres", "whens", "whys"}
+
+def Negated(query):
+    """ True when query asks the negative question (an odd number of negations). """
+    return sum(word in Negations for word in NormaliseQuery(query).split()) % 2 == 1
+
+def CacheVector(query):
+    return Embed([NormaliseQuery(query)], CacheStopWords)[0]
+
+def Cacheable(query):
+    """ False for time-sensitive or context-dependent questions. """
+    words = set(re.findall(r"[\w]+", query.lower()))
+    return bool(words) and not (words & TimeWords) and not (words & ContextWords)
+
+# ========================== Semantic Answer Cache ==========================
+class SemanticAnswerCache:
+    """ Answers to general questions, looked up by query similarity.
+
+    Vectors live in a fixed-size memory-mapped matrix (one row per slot);
+    queries, answers and LRU times are in a JSON file next to it. A lookup
+    is one matrix-vector product; a hit also needs the same polarity
+    (negated or not). When the cache is full the least recently used slot
+    is overwritten.
+    """
+
+    def __init__(self, path, capacity, threshold, ttl):
+        self.paths = {ext: f"{path}.{ext}" for ext in ("f32", "json")}
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.vectors = None
+        self.entries = []  # slot -> {"query", "answer", "stored", "used"} or None
+        self.stored = None  # slot -> store time (0 when empty), for vectorised TTL checks
+        self.used = None  # slot -> last hit time, for LRU eviction
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0, "stores": 0, "evictions": 0}
+
+    # ---------------------- Storage ----------------------
+    def Open(self):
+        """ Map the matrix and read the entries, once. """
+        with self.lock:
+            if self.vectors is None:
+                self._load()
+
+    def _load(self):
+        # Called with the lock held
+        try:
+            with open(self.paths["json"], "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["dims"] != Dims or meta["capacity"] != self.capacity:
+                raise ValueError("cache shape changed")
+            self.vectors = np.memmap(self.paths["f32"], dtype=np.float32, mode="r+", shape=(self.capacity, Dims))
+            self.entries = meta["entries"]
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(self.paths["json"]):
+                print(f"Answer cache reset: {e}")
+            folder = os.path.dirname(self.paths["f32"])
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self.vectors = np.memmap(self.paths["f32"], dtype=np.float32, mode="w+", shape=(self.capacity, Dims))
+            self.entries = [None] * self.capacity
+            self._save()
+        self.stored = np.array([entry["stored"] if entry else 0.0 for entry in self.entries])
+        self.used = np.array([entry["used"] if entry else 0.0 for entry in self.entries])
+
+    def _save(self):
+        # Called with the lock held; vectors first, so no entry points at a stale row
+        self.vectors.flush()
+        if self.used is not None:
+            for slot in np.flatnonzero(self.stored):
+                self.entries[slot]["used"] = float(self.used[slot])
+        temp = self.paths["json"] + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"dims": Dims, "capacity": self.capacity, "entries": self.entries}, f)
+        os.replace(temp, self.paths["json"])
+
+    def _best(self, vector):
+        # Called with the lock held; (slot, score) of the most similar live entry
+        live = (self.stored > 0) & (time.time() - self.stored <= self.ttl)
+        scores = np.where(live, self.vectors @ vector, -1.0)
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    # ---------------------- Lookup ----------------------
+    def Get(self, query):
+        """ Cached answer for a question similar enough to query, or None. """
+        if not AnswerCacheEnabled or not Cacheable(query):
+            with self.lock:
+                self.stats["skipped"] += 1
+            return None
+        vector = CacheVector(query)
+        self.Open()
+        with self.lock, Span("answer_cache") as span:
+            slot, score = self._best(vector)
+            hit = score >= self.threshold and Negated(self.entries[slot]["query"]) == Negated(query)
+            span.fields.update(score=round(score, 3), hit=hit)
+            if not hit:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.used[slot] = time.time()  # LRU order is saved with the next store
+            return self.entries[slot]["answer"]
+
+    def Put(self, query, answer):
+        """ Remember answer for query; a near-identical cached question is replaced. """
+        if not AnswerCacheEnabled or not answer or not Cacheable(query):
+            return
+        vector = CacheVector(query)
+        self.Open()
+        with self.lock:
+            slot, score = self._best(vector)
+            same = score >= self.threshold and Negated(self.entries[slot]["query"]) == Negated(query)
+            if same and self.entries[slot]["answer"] == answer:
+                return  # a cached answer being saved to the chat log; keep its age
+            if not same:
+                # An empty slot, else the least recently used one
+                slot = int(np.argmin(self.used))
+                if self.stored[slot] > 0:
+                    self.stats["evictions"] += 1
+            now = time.time()
+            self.vectors[slot] = vector
+            self.entries[slot] = {"query": query, "answer": answer, "stored": now, "used": now}
+            self.stored[slot] = self.used[slot] = now
+            self.stats["stores"] += 1
+            self._save()
+
+    def Clear(self):
+        self.Open()
+        with self.lock:
+            self.entries = [None] * self.capacity
+            self.stored[:] = 0.0
+            self.used[:] = 0.0
+            self._save()
+
+    def Stats(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            size = int(np.count_nonzero(self.stored)) if self.stored is not None else 0
+            return dict(self.stats, size=size,
+                        hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0)
+
+# Process-wide cache of general answers
+Answers = SemanticAnswerCache(AnswerCachePath, AnswerCacheSize, AnswerCacheThreshold, AnswerCacheTTL)
+
+def WarmUp():
+    if AnswerCacheEnabled:
+        Answers.Open()  # map the matrix before the first question
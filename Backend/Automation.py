@@ -2,10 +2,11 @@
 from AppOpener import close, open as appopen  # Import functions to open and close apps
 from webbrowser import open as webopen  # Import webbrowser for opening URLs
 from pywhatkit import search, playonyt  # Import functions for Google search and YouTube playback
-from dotenv import dotenv_values  # Import dotenv to manage environment variables
 from bs4 import BeautifulSoup  # Import BeautifulSoup for parsing HTML content
 from rich import print  # Import rich for styled console output
-from groq import Groq  # Import Groq for AI chat functionalities
+from Backend.LLMClient import Clients  # Import the shared pooled Groq client
+from Backend.ModelRouter import Router  # Import per-request model routing
+from Backend.Tracing import Span  # Import per-turn latency tracing
 import webbrowser  # Import webbrowser for opening URLs
 import subprocess  # Import subprocess for interacting with the system
 import requests  # Import requests for making HTTP requests
@@ -13,10 +14,6 @@ import keyboard  # Import keyboard for keyboard-related actions
 import asyncio  # Import asyncio for asynchronous programming
 import os  # Import os for operating system functionalities
 
-# Load environment variables from the .env file
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
-GroqAPIKey = env_vars.get("GroqAPIKey")  # Retrieve the Groq API key
-
 # Define CSS classes for parsing specific elements in HTML content
 classes = [
     "zCubwf", "hgKElc", "LTKOO sY7ric", "Z0LcW", "gsrt vk_bk FzvWSb YwPhnf",
@@ -28,9 +25,6 @@ classes = [
 # Define a user-agent for making web requests
 useragent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
 
-# Initialize the Groq client with the API key
-client = Groq(api_key=GroqAPIKey)
-
 # Predefined professional responses for user interactions
 professional_responses = [
     "Your satisfaction is my top priority; feel free to reach out if there's anything else I can help you with.",
@@ -58,19 +52,28 @@ def Content(Topic):
 
     def ContentWriterAI(prompt):
         messages.append({"role": "user", "content": f"{prompt}"})
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=SystemChatBot + messages,
-            max_tokens=2048,
-            temperature=0.7,
-            top_p=1,
-            stream=True,
-            stop=None
-        )
-        Answer = ""
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
+
+        def complete(model, stop):
+            with Span("groq.content", model=model) as span:
+                completion = Clients.Stream(
+                    "groq", Clients.Groq().chat.completions.create,
+                    model=model,
+                    messages=SystemChatBot + messages,
+                    max_tokens=2048,
+                    temperature=0.7,
+                    top_p=1,
+                    stream=True,
+                    stop=None
+                )
+                for chunk in completion:
+                    if stop.is_set():
+                        return
+                    if chunk.choices[0].delta.content:
+                        span.mark("first_token")
+                        yield chunk.choices[0].delta.content
+
+        # The router picks 8B or 70B for the topic and hedges slow requests
+        Answer = "".join(Router.Stream(Router.Choose("content", prompt), complete))
         Answer = Answer.replace("</s>", "")
         messages.append({"role": "assistant", "content": Answer})
         return Answer
@@ -210,8 +213,9 @@ async def TranslateAndExecute(commands: list[str]):
 
 # Asynchronous function to automate command execution
 async def Automation(commands: list[str]):
-    async for result in TranslateAndExecute(commands):
-        pass
+    with Span("automation", commands=len(commands)):
+        async for result in TranslateAndExecute(commands):
+            pass
     return True #indicate success
 
 if __name__ == "__main__":
@@ -0,0 +1,302 @@
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from concurrent.futures import Future  # Write completion handles
+from contextlib import contextmanager  # Read snapshots
+import threading  # Per-thread connections and the writer thread
+import queue  # Writer mailbox
+import sqlite3  # Storage engine
+import json  # Legacy ChatLog.json migration
+import time  # Turn timestamps
+import re  # Search query tokenising
+import os  # Paths
+
+# ========================== Paths ==========================
+ChatDbPath = env_vars.get("ChatDbPath") or r"Data\ChatLog.db"
+LegacyJsonPath = r"Data\ChatLog.json"
+WriteBatchSize = 256  # most queued writes committed in one transaction
+
+# ========================== Chat Store ==========================
+class ChatStore:
+    """ Append-only chat history in SQLite (WAL mode).
+
+    Each row is one message ("turn") with an increasing id. Appending costs
+    the same no matter how long the history is, and readers fetch only the
+    slice they need instead of parsing the whole log. An FTS5 index over the
+    turns is kept in step by triggers, so every writer is covered.
+
+    All writes go through one writer thread (see ChatWriter); readers use
+    their own connections and can take a Snapshot() for consistent
+    multi-query reads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS turns_created ON turns(created)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    upto INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    created REAL NOT NULL
+                )""")
+        self.fts = self._create_index()
+        self.writer = ChatWriter(self)
+
+    def _create_index(self):
+        """ FTS5 index over turns.content; False if this SQLite lacks FTS5. """
+        conn = self._conn()
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'turns_fts'").fetchone()
+        if exists:
+            return True
+        try:
+            with conn:
+                conn.execute("""
+                    CREATE VIRTUAL TABLE turns_fts USING fts5(
+                        content, content='turns', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                    )""")
+                conn.execute("""
+                    CREATE TRIGGER turns_fts_insert AFTER INSERT ON turns BEGIN
+                        INSERT INTO turns_fts (rowid, content) VALUES (new.id, new.content);
+                    END""")
+                conn.execute("""
+                    CREATE TRIGGER turns_fts_delete AFTER DELETE ON turns BEGIN
+                        INSERT INTO turns_fts (turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                    END""")
+                conn.execute("INSERT INTO turns_fts (turns_fts) VALUES ('rebuild')")  # index existing turns
+        except sqlite3.OperationalError as e:
+            print(f"Chat search falls back to a full scan: {e}")
+            return False
+        return True
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def _turn(row):
+        return {"id": row["id"], "role": row["role"], "content": row["content"], "created": row["created"]}
+
+    # ---------------------- Writers ----------------------
+    # Each writer queues an operation for the writer thread. With wait=True
+    # (the default) it returns once the batch holding it is committed.
+    def AppendMany(self, messages, wait=True):
+        """ Append [{"role", "content"}, ...] together. Returns the last id. """
+        now = time.time()
+        rows = [(message["role"], message["content"], now) for message in messages]
+
+        def append(conn):
+            last = None
+            for row in rows:
+                last = conn.execute("INSERT INTO turns (role, content, created) VALUES (?, ?, ?)", row).lastrowid
+            return last
+        return self.writer.Submit(append, wait)
+
+    def Append(self, role, content, wait=True):
+        return self.AppendMany([{"role": role, "content": content}], wait)
+
+    def Clear(self, wait=True):
+        def clear(conn):
+            conn.execute("DELETE FROM turns")
+            conn.execute("DELETE FROM summaries")
+        return self.writer.Submit(clear, wait)
+
+    def AddSummary(self, upto, content, wait=True):
+        """ Record a summary of every turn with id <= upto. """
+        created = time.time()
+
+        def add(conn):
+            conn.execute("INSERT INTO summaries (upto, content, created) VALUES (?, ?, ?)", (upto, content, created))
+        return self.writer.Submit(add, wait)
+
+    def Flush(self, timeout=None):
+        """ Wait until every write queued so far is committed. """
+        self.writer.Submit(lambda conn: None, wait=False).result(timeout)
+
+    # ---------------------- Snapshots ----------------------
+    @contextmanager
+    def Snapshot(self):
+        """ Reads inside the block see one consistent state of the store. """
+        conn = self._conn()
+        if conn.in_transaction:
+            yield self  # already inside a snapshot on this thread
+            return
+        conn.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            conn.execute("COMMIT")
+
+    # ---------------------- Readers ----------------------
+    def LastTurns(self, n):
+        """ The newest n turns, oldest first. """
+        rows = self._conn().execute(
+            "SELECT * FROM (SELECT * FROM turns ORDER BY id DESC LIMIT ?) ORDER BY id", (n,)
+        ).fetchall()
+        return [self._turn(row) for row in rows]
+
+    def TurnsSince(self, turn_id, limit=-1):
+        """ Turns with id greater than turn_id, oldest first. """
+        rows = self._conn().execute(
+            "SELECT * FROM turns WHERE id > ? ORDER BY id LIMIT ?", (turn_id, limit)
+        ).fetchall()
+        return [self._turn(row) for row in rows]
+
+    def TurnsByIds(self, turn_ids):
+        """ The given turns (missing ids are skipped), oldest first. """
+        turn_ids = list(turn_ids)
+        if not turn_ids:
+            return []
+        rows = self._conn().execute(
+            f"SELECT * FROM turns WHERE id IN ({','.join('?' * len(turn_ids))}) ORDER BY id", turn_ids
+        ).fetchall()
+        return [self._turn(row) for row in rows]
+
+    def AllTurns(self):
+        return self.TurnsSince(0)
+
+    def Count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+    def LastId(self):
+        return self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM turns").fetchone()[0]
+
+    def Has(self, turn_id):
+        return self._conn().execute("SELECT 1 FROM turns WHERE id = ?", (turn_id,)).fetchone() is not None
+
+    def LatestSummary(self):
+        """ {"upto", "content"} of the newest summary, or None. """
+        row = self._conn().execute(
+            "SELECT upto, content FROM summaries ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return {"upto": row["upto"], "content": row["content"]} if row else None
+
+    # ---------------------- Search ----------------------
+    def Search(self, query, since=None, until=None, role=None, limit=20):
+        """ Best-matching turns for query, optionally within [since, until]
+        (unix timestamps) and for one role. Each turn also carries "snippet". """
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        filters, params = [], []
+        if since is not None:
+            filters.append("t.created >= ?"); params.append(since)
+        if until is not None:
+            filters.append("t.created <= ?"); params.append(until)
+        if role is not None:
+            filters.append("t.role = ?"); params.append(role)
+
+        if self.fts:
+            # Every word must match; the last one may be a prefix ("weath" -> weather)
+            match = " ".join(f'"{w}"' for w in words[:-1]) + f' "{words[-1]}"*'
+            where = " AND ".join(["turns_fts MATCH ?"] + filters)
+            rows = self._conn().execute(f"""
+                SELECT t.*, snippet(turns_fts, 0, '[', ']', '...', 12) AS snippet
+                FROM turns_fts JOIN turns t ON t.id = turns_fts.rowid
+                WHERE {where} ORDER BY bm25(turns_fts) LIMIT ?""",
+                [match] + params + [limit],
+            ).fetchall()
+        else:
+            where = " AND ".join(["t.content LIKE ?"] * len(words) + filters)
+            rows = self._conn().execute(f"""
+                SELECT t.*, substr(t.content, 1, 120) AS snippet FROM turns t
+                WHERE {where} ORDER BY t.id DESC LIMIT ?""",
+                [f"%{w}%" for w in words] + params + [limit],
+            ).fetchall()
+        return [dict(self._turn(row), snippet=row["snippet"]) for row in rows]
+
+    # ---------------------- Migration ----------------------
+    def Migrate(self, json_path):
+        """ One-time import of the old ChatLog.json; the file is renamed afterwards. """
+        if not os.path.exists(json_path) or self.Count() > 0:
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                messages = json.load(f)
+        except ValueError as e:
+            print(f"Could not migrate {json_path}: {e}")
+            return 0
+        messages = [m for m in messages if m.get("role") in ("user", "assistant") and "content" in m]
+        if messages:
+            self.AppendMany(messages)
+        os.replace(json_path, json_path + ".migrated")
+        return len(messages)
+
+# ========================== Writer ==========================
+class ChatWriter:
+    """ Single writer thread that owns all changes to the chat store.
+
+    Writers enqueue operations; the thread drains whatever has queued up
+    (up to WriteBatchSize) and commits it as one transaction, so concurrent
+    turns cost at most one fsync per batch and never contend for the
+    database lock. If a batch fails, its operations are retried one by one
+    so a single bad write cannot take the others down with it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self.thread.start()
+
+    def Submit(self, operation, wait=True):
+        """ Queue operation(conn). Returns its result if wait, else a Future. """
+        future = Future()
+        self.queue.put((operation, future))
+        return future.result() if wait else future
+
+    def _run(self):
+        conn = self.store._conn()
+        conn.execute("PRAGMA synchronous=FULL")  # durable commits; batching keeps them rare
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < WriteBatchSize:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    results = [operation(conn) for operation, _ in batch]
+            except Exception:
+                for operation, future in batch:
+                    self._run_one(conn, operation, future)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    @staticmethod
+    def _run_one(conn, operation, future):
+        try:
+            with conn:
+                result = operation(conn)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+def AsMessages(turns):
+    """ Strip store metadata so turns can be sent to the LLM APIs. """
+    return [{"role": turn["role"], "content": turn["content"]} for turn in turns]
+
+# Process-wide store shared by ChatBot, RealtimeSearchEngine and Main
+Store = ChatStore(ChatDbPath)
+Store.Migrate(LegacyJsonPath)
@@ -1,18 +1,20 @@
 # ========================== Imports ==========================
-from groq import Groq                 # Groq API
-from json import load, dump           # JSON file handling
 import datetime                        # Real-time date and time
-from dotenv import dotenv_values       # Load environment variables
+from Backend.Config import env_vars    # Settings parsed once from .env
 from rich import print                 # Pretty printing in terminal
+from Backend.Tracing import Span       # Per-turn latency tracing
+from Backend.ChatStore import Store  # Append-only chat history
+from Backend.ContextWindow import Context, ModelBudgets, FitMessages  # Token-budgeted history
+from Backend.LLMClient import Clients  # Shared pooled Groq client
+from Backend.SingleFlight import Flights, Key  # Shared identical in-flight requests
+from Backend.ModelRouter import Router  # Per-request 70B / 8B choice with hedging
+from Backend.AnswerCache import Answers  # Semantic cache of general answers
+from Backend.Streaming import FallbackAnswer  # Said when no answer could be produced
 
 # ========================== Load Environment Variables ==========================
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
-GroqAPIKey = env_vars.get("GroqAPIKey")
-
-# ========================== Initialize Groq Client ==========================
-client = Groq(api_key=GroqAPIKey)
+ChatModel = "llama-3.3-70b-versatile"  # history is sized for this model; Router picks per request
 
 # ========================== Chat Log Setup ==========================
 
@@ -27,14 +29,6 @@ SystemChatBot =[
     {"role": "system", "content": System}
 ]
 
-# Load existing chat log or create a new one
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-except FileNotFoundError:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
-
 # ========================== Realtime Information Function ==========================
 def RealtimeInformation():
     current_date_time = datetime.datetime.now()
@@ -58,51 +52,84 @@ def AnswerModifier(Answer):
     modified_answer = '\n'.join(non_empty_lines)
     return modified_answer
 
+# ========================== Completion Functions ==========================
+def ChatBotStream(messages, cancel=None):
+    """ Yield answer tokens for messages from Groq as they arrive, without
+    touching the chat log. Stops early if the cancel event is set.
+    Identical requests already streaming share that completion. """
+    def complete(model, stop):
+        with Span("groq.chatbot", model=model) as span:
+            completion = Clients.Stream(
+                "groq", Clients.Groq().chat.completions.create,
+                model=model,
+                messages=[{"role": "system", "content": RealtimeInformation()}] + FitMessages(messages, model),  # ✅ system + chat history
+                max_tokens=1024,
+                temperature=0.7,
+                top_p=1,
+                stream=True
+            )
+
+            # Process streamed response; leaving the loop closes the stream
+            for chunk in completion:
+                if stop.is_set():
+                    return  # every reader has gone, or the other model won
+                if chunk.choices[0].delta.content:
+                    span.mark("first_token")
+                    yield chunk.choices[0].delta.content
+
+    route = Router.Choose("general", messages[-1]["content"])
+    produce = lambda upstream_cancel: Router.Stream(route, complete, upstream_cancel)
+    for token in Flights.Stream("groq.chat", Key("general", messages), produce):
+        if cancel is not None and cancel.is_set():
+            return
+        yield token
+
+def ChatBotRetryStream(Query):
+    """ Tokens for Query with half the usual history, as ChatBot() retries a
+    failed request, in case the prompt itself was the problem. """
+    messages = Context.Messages(ChatModel, ModelBudgets[ChatModel] // 2, query=Query)
+    messages.append({"role": "user", "content": Query})
+    return ChatBotStream(messages)
+
+def ChatBotAnswer(messages, cancel=None):
+    """ Complete answer for messages; None if the cancel event is set before the stream finishes. """
+    Answer = "".join(ChatBotStream(messages, cancel))
+    if cancel is not None and cancel.is_set():
+        return None
+    return Answer.replace("</s>", "")
+
 # ========================== Main ChatBot Function ==========================
-def ChatBot(Query):
-    """ Send user's query to chatbot and return AI's response """
-    try:
-        # Load existing chat log
-        with open(r"Data\ChatLog.json", "r") as f:
-            messages = load(f)
-
-        # Append user's query
-        messages.append({"role": "user", "content": Query})
-
-        # Request response from Groq API
-        completion = client.chat.completions.create(
-    model="llama-3.3-70b-versatile",
-    messages=[{"role": "system", "content": RealtimeInformation()}] + messages,  # ✅ system + chat history
-    max_tokens=1024,
-    temperature=0.7,
-    top_p=1,
-    stream=True
-)
-
-        Answer = ""
-
-        # Process streamed response
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
-
-        Answer = Answer.replace("</s>", "")
-
-        # Append chatbot's response to messages
-        messages.append({"role": "assistant", "content": Answer})
-
-        # Save updated chat log
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump(messages, f, indent=4)
-
-        return AnswerModifier(Answer)
-
-    except Exception as e:
-        print(f"[red]Error:[/red] {e}")
-        # Reset chat log and retry
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump([], f, indent=4)
-        return ChatBot(Query)
+def ChatBot(Query, Answer=None):
+    """ Send user's query to chatbot and return AI's response.
+    A precomputed Answer (e.g. a finished stream or speculative call) is saved as-is. """
+    if Answer is None:
+        # Request response from Groq API; a failed request is retried once
+        # with half the history in case the prompt itself was the problem
+        budget = ModelBudgets[ChatModel]
+        for attempt in range(2):
+            try:
+                messages = Context.Messages(ChatModel, budget, query=Query)
+                messages.append({"role": "user", "content": Query})
+                Answer = ChatBotAnswer(messages)
+                break
+            except Exception as e:
+                print(f"[red]Error:[/red] {e}")
+                budget //= 2
+        else:
+            return FallbackAnswer  # nothing is saved for a failed turn
+
+    # Append the user's query and the response to the chat log
+    Answer = Answer.replace("</s>", "")
+    if Answer.endswith(FallbackAnswer):
+        return AnswerModifier(Answer)  # a stream that failed; nothing is saved for a failed turn
+    Store.AppendMany([
+        {"role": "user", "content": Query},
+        {"role": "assistant", "content": Answer}
+    ])
+    Context.Refresh()
+    Answers.Put(Query, Answer)  # skipped for time-sensitive or context-dependent questions
+
+    return AnswerModifier(Answer)
 
 # ========================== Main Program Entry ==========================
 if __name__ == "__main__":
@@ -0,0 +1,8 @@
+# ========================== Imports ==========================
+from dotenv import dotenv_values  # Load environment variables
+
+# ========================== Load Environment Variables ==========================
+# Parsed once per process; every module reads settings from here instead of
+# re-parsing the .env file itself.
+EnvPath = r"c:\Users\user\Desktop\jervisai\.env"
+env_vars = dotenv_values(EnvPath)
@@ -0,0 +1,192 @@
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.ChatStore import Store, AsMessages  # Append-only chat history
+from Backend.Tracing import Span, Bind  # Latency tracing
+from Backend.Memory import Memory, MemoryEnabled  # Relevance recall of older turns
+from Backend.Text import CountTokens  # Prompt token estimate
+import threading  # Background summarisation
+
+# ========================== Settings ==========================
+Username = env_vars.get("Username")
+Assistantname = env_vars.get("Assistantname")
+
+# Tokens of chat history (summary + recalled + verbatim turns) sent to each model. The
+# system prompt, real-time information and search results come on top.
+DefaultModel = "llama-3.3-70b-versatile"
+DefaultBudget = int(env_vars.get("ContextTokenBudget") or 3000)
+ModelBudgets = {
+    "llama-3.3-70b-versatile": DefaultBudget,
+    "llama-3.1-8b-instant": min(DefaultBudget, 1500),
+}
+
+KeepRecentTurns = 6     # newest messages are never folded into the summary
+FoldAt = 0.75           # fold once unsummarised history passes this share of the budget...
+FoldTo = 0.40           # ...until it is back under this share
+FoldChunkTokens = 2000  # most history tokens summarised by one request
+RecentScanLimit = 200   # most turns read from the store per request
+RecallShare = 0.3       # share of the budget kept for turns recalled by relevance
+RecallTurns = 6         # most recalled turns per request
+
+SummaryModel = "llama-3.1-8b-instant"
+SummaryMaxTokens = 400
+SummaryPrompt = f"""You keep a running summary of a conversation between {Username} and the assistant {Assistantname}.
+Merge the new messages into the current summary. Keep names, facts, preferences, decisions and open questions; drop small talk.
+Reply with the updated summary only, in under 200 words."""
+
+MessageOverhead = 4     # role and separator tokens added per chat message
+
+# ========================== Token Counting ==========================
+def FitMessages(messages, model):
+    """ messages trimmed to model's budget for a request built for a larger
+    model: the oldest history goes first; leading system messages and the
+    final user message are always kept. """
+    budget = ModelBudgets.get(model, DefaultBudget)
+    head = 0
+    while head < len(messages) - 1 and messages[head]["role"] == "system":
+        head += 1
+    kept = list(messages)
+    total = sum(CountTokens(m["content"]) for m in kept[head:])
+    while total > budget and len(kept) - head > 1:
+        total -= CountTokens(kept.pop(head)["content"])
+    return kept
+
+# ========================== Context Window ==========================
+class ContextWindow:
+    """ Builds the chat history sent with each request within a token budget.
+
+    The newest turns are sent verbatim; older ones are folded into a rolling
+    summary (stored next to the turns) by a background request after each
+    turn, so the prompt stays about the same size however long the
+    assistant has been running. Given the query, older turns most similar to
+    it are recalled from the retrieval memory as well.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.token_cache = {}  # turn id -> tokens; turns never change once stored
+        self.lock = threading.Lock()
+        self.folding = False
+        self.again = False
+
+    def Tokens(self, turn):
+        tokens = self.token_cache.get(turn["id"])
+        if tokens is None:
+            tokens = CountTokens(turn["content"]) + MessageOverhead
+            self.token_cache[turn["id"]] = tokens
+        return tokens
+
+    # ---------------------- Prompt ----------------------
+    def Messages(self, model=DefaultModel, budget=None, query=None):
+        """ History for a request to model: [summary] + [recalled turns] + newest turns that fit. """
+        if budget is None:
+            budget = ModelBudgets.get(model, DefaultBudget)
+        recall_budget = int(budget * RecallShare) if query and MemoryEnabled else 0
+        budget -= recall_budget
+        with self.store.Snapshot():  # summary and turns from the same state
+            summary = self.store.LatestSummary()
+            recent = self.store.LastTurns(RecentScanLimit)
+        upto = summary["upto"] if summary else 0
+
+        messages = []
+        if summary:
+            head = {"role": "system", "content": f"Summary of the earlier conversation:\n{summary['content']}"}
+            budget -= CountTokens(head["content"]) + MessageOverhead
+            messages.append(head)
+
+        kept = []
+        for turn in reversed(recent):
+            if turn["id"] <= upto:
+                break
+            cost = self.Tokens(turn)
+            if cost > budget:
+                break  # anything older waits for the summary to catch up
+            budget -= cost
+            kept.append(turn)
+        kept.reverse()
+
+        if recall_budget:
+            recall_budget += budget  # plus whatever the recent turns left over
+            before = kept[0]["id"] if kept else self.store.LastId() + 1
+            lines = []
+            for turn in Memory.Recall(query, RecallTurns, before):
+                cost = self.Tokens(turn)
+                if cost > recall_budget:
+                    continue
+                recall_budget -= cost
+                lines.append(f"{Username if turn['role'] == 'user' else Assistantname}: {turn['content']}")
+            if lines:
+                messages.append({"role": "system", "content": "Relevant earlier messages:\n" + "\n".join(lines)})
+
+        return messages + AsMessages(kept)
+
+    # ---------------------- Rolling Summary ----------------------
+    def Refresh(self):
+        """ Fold old turns into the summary in the background, if needed. """
+        with self.lock:
+            if self.folding:
+                self.again = True  # the running fold re-checks when it ends
+                return
+            self.folding = True
+        threading.Thread(target=Bind(self._fold_loop), name="context-fold", daemon=True).start()
+
+    def _fold_loop(self):
+        while True:
+            try:
+                if MemoryEnabled:
+                    Memory.Sync()  # embed the new turns off the request path
+                self.Fold()
+            except Exception as e:
+                print(f"Chat summary failed: {e}")
+            with self.lock:
+                if not self.again:
+                    self.folding = False
+                    return
+                self.again = False
+
+    def Fold(self, budget=DefaultBudget):
+        """ Summarise the oldest unsummarised turns until the rest fits. """
+        while True:
+            with self.store.Snapshot():
+                summary = self.store.LatestSummary()
+                turns = self.store.TurnsSince(summary["upto"] if summary else 0)
+            total = sum(self.Tokens(turn) for turn in turns)
+            if total <= budget * FoldAt:
+                return
+
+            chunk, chunk_tokens = [], 0
+            for turn in turns[:-KeepRecentTurns]:
+                if total <= budget * FoldTo or (chunk and chunk_tokens + self.Tokens(turn) > FoldChunkTokens):
+                    break
+                chunk.append(turn)
+                chunk_tokens += self.Tokens(turn)
+                total -= self.Tokens(turn)
+            if not chunk:
+                return
+
+            content = Summarise(summary["content"] if summary else "", chunk)
+            self.store.AddSummary(chunk[-1]["id"], content)
+            for turn in chunk:
+                self.token_cache.pop(turn["id"], None)
+
+def Summarise(previous, turns):
+    """ Merge turns into the previous summary with the small Groq model. """
+    from Backend.LLMClient import Clients  # shared pooled client
+    transcript = "\n".join(
+        f"{Username if turn['role'] == 'user' else Assistantname}: {turn['content']}" for turn in turns
+    )
+    with Span("context.summary", model=SummaryModel, turns=len(turns)):
+        completion = Clients.Retry(
+            "groq", Clients.Groq().chat.completions.create,
+            model=SummaryModel,
+            messages=[
+                {"role": "system", "content": SummaryPrompt},
+                {"role": "user", "content": f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"},
+            ],
+            max_tokens=SummaryMaxTokens,
+            temperature=0.3,
+            stream=False,
+        )
+    return completion.choices[0].message.content.strip()
+
+# Process-wide window over the shared chat store
+Context = ContextWindow(Store)
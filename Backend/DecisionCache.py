@@ -0,0 +1,110 @@
+# ========================== Imports ==========================
+from collections import OrderedDict  # LRU order
+import threading  # Cache lock
+import hashlib  # Preamble fingerprint
+import json  # On-disk format
+import time  # TTL
+import re  # Query normalisation
+import os  # Paths
+
+# ========================== Decision Cache ==========================
+def NormaliseQuery(query):
+    """ Case and punctuation folded, so "What's the time?" and "whats the time" share a key. """
+    return " ".join(re.sub(r"[^\w\s]", "", query.lower()).split())
+
+def Fingerprint(*parts):
+    """ Hash of everything that shapes a decision (model, preamble, examples). """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+class DecisionCache:
+    """ LRU + TTL cache of FirstLayerDMM decisions, persisted to a JSON file.
+
+    Decisions containing a stateful intent (see `excluded`) are never
+    stored. The file records the fingerprint it was built with; a different
+    preamble, model or example history discards it on load.
+    """
+
+    def __init__(self, path, fingerprint, capacity=512, ttl=7 * 86400, excluded=("reminder",)):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.capacity = capacity
+        self.ttl = ttl
+        self.excluded = tuple(excluded)
+        self.entries = OrderedDict()  # key -> (stored at, decision); oldest first
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "excluded": 0}
+        self.Load()
+
+    # ---------------------- Lookup ----------------------
+    def Get(self, query):
+        """ Cached decision list for query, or None. """
+        key = NormaliseQuery(query)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self.entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return list(entry[1])
+
+    def Put(self, query, decision):
+        key = NormaliseQuery(query)
+        with self.lock:
+            if not key or not decision or any(task.startswith(self.excluded) for task in decision):
+                self.stats["excluded"] += 1
+                return
+            self.entries[key] = (time.time(), list(decision))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._save()
+
+    def Clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._save()
+
+    def Stats(self):
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(self.stats, size=len(self.entries),
+                        hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0)
+
+    # ---------------------- Persistence ----------------------
+    def Load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("fingerprint") != self.fingerprint:
+            print("Decision cache discarded: the DMM preamble changed.")
+            return
+        now = time.time()
+        entries = [(key, (stored, decision)) for key, stored, decision in data.get("entries", [])
+                   if now - stored <= self.ttl]
+        with self.lock:
+            self.entries = OrderedDict(entries[-self.capacity:])
+
+    def _save(self):
+        # Called with the lock held; small file, replaced atomically
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({
+                "fingerprint": self.fingerprint,
+                "entries": [[key, stored, decision] for key, (stored, decision) in self.entries.items()],
+            }, f)
+        os.replace(temp, self.path)
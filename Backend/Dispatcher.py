@@ -0,0 +1,114 @@
+# ========================== Imports ==========================
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # Concurrent task execution
+from Backend.Tracing import Span, Bind  # Per-task spans on the current turn
+import time  # Deadlines
+
+# ========================== Task ==========================
+class Task:
+    """ One node of a TaskGraph.
+
+    needs     -- tasks whose results this one uses; if any of them fails or
+                 times out, this task is skipped.
+    after     -- tasks that must finish first (ordering only).
+    timeout   -- seconds the task may run before it is reported as timed out.
+    """
+
+    def __init__(self, name, function, needs=(), after=(), timeout=None):
+        self.name = name
+        self.function = function
+        self.needs = list(needs)
+        self.after = list(after)
+        self.timeout = timeout
+        self.state = "pending"    # pending -> running -> done | failed | timeout | skipped
+        self.result = None
+        self.error = None
+        self.future = None
+        self.deadline = None
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed", "timeout", "skipped")
+
+    @property
+    def ok(self):
+        return self.state == "done"
+
+# ========================== Task Graph ==========================
+class TaskGraph:
+    """ Runs a small dependency graph of blocking functions on a thread pool.
+
+    Independent tasks run concurrently; a graph costs roughly its longest
+    dependency chain instead of the sum of its tasks. Timed-out tasks keep
+    their thread (Python cannot kill it) but no longer hold up the graph.
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.tasks = {}
+
+    def Add(self, name, function, needs=(), after=(), timeout=None):
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task name: {name}")
+        for dep in list(needs) + list(after):
+            if dep not in self.tasks:
+                raise KeyError(f"Task '{name}' depends on unknown task '{dep}'")
+        task = Task(name, function, needs, after, timeout)
+        self.tasks[name] = task
+        return task
+
+    def Result(self, name):
+        return self.tasks[name].result
+
+    def _run_task(self, task):
+        # "answer:1" is traced as stage dispatch.answer
+        with Span(f"dispatch.{task.name.split(':')[0]}", task=task.name):
+            return task.function()
+
+    def Run(self):
+        """ Run every task; returns {name: Task} once all of them are finished. """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dispatch")
+        while True:
+            # Start everything whose dependencies are settled.
+            for task in self.tasks.values():
+                if task.state != "pending":
+                    continue
+                deps = [self.tasks[d] for d in task.needs + task.after]
+                if not all(dep.finished for dep in deps):
+                    continue
+                if not all(self.tasks[d].ok for d in task.needs):
+                    task.state = "skipped"
+                    continue
+                task.state = "running"
+                task.deadline = time.monotonic() + task.timeout if task.timeout else None
+                task.future = executor.submit(Bind(self._run_task), task)
+
+            # Collect finished work and expired deadlines.
+            now = time.monotonic()
+            for task in self.tasks.values():
+                if task.future is None:
+                    continue
+                if task.future.done():
+                    if task.state == "running":
+                        try:
+                            task.result = task.future.result()
+                            task.state = "done"
+                        except Exception as e:
+                            task.error = e
+                            task.state = "failed"
+                            print(f"Task {task.name} failed: {e}")
+                elif task.state == "running" and task.deadline and now >= task.deadline:
+                    task.state = "timeout"
+                    print(f"Task {task.name} timed out after {task.timeout}s")
+
+            if all(task.finished for task in self.tasks.values()):
+                break
+            running = [t for t in self.tasks.values() if t.future is not None and not t.future.done()]
+            if not running:
+                continue  # states changed without new work in flight; re-scan
+
+            deadlines = [t.deadline for t in running if t.state == "running" and t.deadline]
+            wait_for = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+            wait([t.future for t in running], timeout=wait_for, return_when=FIRST_COMPLETED)
+        # Timed-out work may still be running; don't wait for it here.
+        executor.shutdown(wait=False)
+        return self.tasks
@@ -0,0 +1,244 @@
+"""
+Local fast path in front of the Cohere DMM.
+
+Plain commands ("open chrome", "close notepad and firefox", "volume up",
+"youtube search lofi beats") are classified by a keyword trie in a few
+microseconds and returned in FirstLayerDMM's format. Anything it is unsure
+about (questions, reminders, content requests, ambiguous compounds) is left
+to Cohere.
+
+Report accuracy on the labelled sets. Benchmark\\Intents.json was written
+alongside the rules, including the queries they once got wrong. Benchmark\\
+IntentsHeldOut.json is never used to write rules; a query from it that
+prompts a rule change moves to Intents.json and is replaced by a fresh one:
+    python -m Backend.FastIntent [labels.json ...]
+"""
+
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+import json  # Labelled examples
+import time  # Evaluation timing
+import sys  # CLI arguments
+import re  # Clause splitting
+import os  # Default paths
+
+# Decisions below this confidence go to Cohere
+FastIntentThreshold = float(env_vars.get("FastIntentThreshold") or 0.9)
+
+# ========================== Rules ==========================
+# Leading phrase -> (intent, confidence, argument kind). The rest of the
+# clause is the intent's argument, e.g. "open chrome" -> "open chrome".
+# Argument kinds (see ArgumentFits):
+#   app    -- a known app only ("launch date of ..." and "quit smoking" are not commands)
+#   target -- a known app or a short name with no question or filler words
+#   system -- one of SystemActions
+#   play   -- a song or video title; defers when it reads like a request to chat
+#   free   -- anything (search terms, image prompts)
+PrefixRules = {
+    "open": ("open", 0.97, "target"),
+    "launch": ("open", 0.93, "app"),
+    "close": ("close", 0.97, "target"),
+    "quit": ("close", 0.92, "app"),
+    "play": ("play", 0.95, "play"),
+    "youtube search": ("youtube search", 0.98, "free"),
+    "search youtube for": ("youtube search", 0.96, "free"),
+    "google search": ("google search", 0.98, "free"),
+    "search google for": ("google search", 0.96, "free"),
+    "generate image": ("generate image", 0.97, "free"),
+    "generate an image": ("generate image", 0.95, "free"),
+    "generate a image": ("generate image", 0.95, "free"),
+    "create an image": ("generate image", 0.92, "free"),
+    "system": ("system", 0.97, "system"),
+    "write": ("content", 0.75, "free"),  # topics are too free-form to trust
+}
+
+# Trailing phrase -> (intent, confidence), e.g. "lofi beats on youtube"
+SuffixRules = {
+    "on youtube": ("youtube search", 0.93),
+    "on google": ("google search", 0.93),
+}
+
+# Whole clauses
+ExactRules = {
+    "mute": ("system mute", 0.98),
+    "unmute": ("system unmute", 0.98),
+    "volume up": ("system volume up", 0.98),
+    "volume down": ("system volume down", 0.98),
+    "increase volume": ("system volume up", 0.95),
+    "increase the volume": ("system volume up", 0.95),
+    "decrease volume": ("system volume down", 0.95),
+    "decrease the volume": ("system volume down", 0.95),
+    "turn up the volume": ("system volume up", 0.95),
+    "turn down the volume": ("system volume down", 0.95),
+    "exit": ("exit", 0.95),
+    "bye": ("exit", 0.95),
+    "goodbye": ("exit", 0.95),
+}
+
+# ---------------------- Arguments ----------------------
+KnownApps = {
+    "chrome", "google chrome", "firefox", "edge", "microsoft edge", "brave", "opera", "notepad", "calculator",
+    "paint", "word", "excel", "powerpoint", "outlook", "teams", "microsoft teams", "zoom", "skype", "discord",
+    "slack", "spotify", "vlc", "whatsapp", "telegram", "instagram", "facebook", "twitter", "youtube", "netflix",
+    "settings", "camera", "photos", "file explorer", "explorer", "task manager", "control panel", "cmd",
+    "command prompt", "terminal", "powershell", "vs code", "vscode", "visual studio code", "visual studio",
+    "pycharm", "steam", "obs", "canva", "figma", "notion", "gmail", "google drive", "chatgpt",
+}
+SystemActions = {"mute", "unmute", "volume up", "volume down"}
+
+# Question words and fillers; a target name never contains them ("close to me", "open up about ...")
+QuestionWords = {"what", "who", "why", "how", "when", "where", "which", "is", "are", "do", "does", "can", "could"}
+FillerWords = {
+    "a", "an", "the", "to", "of", "for", "with", "about", "on", "in", "at", "from", "up", "and", "or",
+    "me", "my", "you", "your", "i", "we", "us", "it", "this", "that", "tell", "some", "more", "please",
+}
+# Words that make the clause a request for information, not a target
+RequestWords = {
+    "tips", "tip", "date", "dates", "source", "news", "today", "tonight", "tomorrow", "latest", "benefits",
+    "ideas", "meaning", "review", "reviews", "price", "definition", "history", "examples", "guide",
+    "tutorial", "weather", "game", "games", "smoking", "interview", "design", "account",
+}
+MaxTargetWords = 3  # longer arguments are sentences, not names
+PlayNotTitles = QuestionWords | {"me", "us", "game", "games", "something", "anything", "store"}  # "play a game with me", "play store refund"
+
+def ArgumentFits(kind, words):
+    """ True when words can be the argument of a rule with this argument kind. """
+    name = " ".join(words)
+    if kind == "free":
+        return True
+    if kind == "system":
+        return name in SystemActions
+    if kind == "play":
+        return not (set(words) & (PlayNotTitles | RequestWords))
+    if name in KnownApps:
+        return True
+    return (kind == "target" and len(words) <= MaxTargetWords
+            and not (set(words) & (QuestionWords | FillerWords | RequestWords)))
+
+# Intents whose bare follow-up clauses inherit the verb ("open chrome and firefox")
+InheritableIntents = {"open": 0.92, "close": 0.92}
+
+ClauseSplit = re.compile(r"\s*(?:,|\band then\b|\bthen\b|\band\b|\balso\b)\s*")
+
+# ========================== Trie ==========================
+def BuildTrie(rules):
+    """ Word-level trie; the value of a matched phrase is kept under key None. """
+    root = {}
+    for phrase, value in rules.items():
+        node = root
+        for word in phrase.split():
+            node = node.setdefault(word, {})
+        node[None] = value
+    return root
+
+PrefixTrie = BuildTrie(PrefixRules)
+
+def LongestPrefix(words):
+    """ (value, number of words) of the longest rule phrase starting words. """
+    node, best = PrefixTrie, (None, 0)
+    for i, word in enumerate(words):
+        node = node.get(word)
+        if node is None:
+            break
+        if None in node:
+            best = (node[None], i + 1)
+    return best
+
+# ========================== Classifier ==========================
+def NormaliseClause(text):
+    return " ".join(text.lower().strip().rstrip(".?!").split())
+
+def ClassifyClause(clause):
+    """ (task, confidence) for one clause, or (None, 0.0). """
+    if clause in ExactRules:
+        return ExactRules[clause]
+    words = clause.split()
+    if not words:
+        return None, 0.0
+    if words[0] in ("bye", "goodbye") and len(words) <= 3:
+        return "exit", 0.93  # "bye jarvis", "goodbye for now"
+    (rule, used) = LongestPrefix(words)
+    if rule is not None:
+        intent, confidence, kind = rule
+        argument = words[used:]
+        if not argument or not ArgumentFits(kind, argument):
+            return None, 0.0  # a question or request that starts like a command
+        return f"{intent} {' '.join(argument)}", confidence
+    for suffix, (intent, confidence) in SuffixRules.items():
+        if clause.endswith(" " + suffix):
+            argument = clause[:-len(suffix) - 1]
+            argument = re.sub(r"^(search|find|look up)\s+(for\s+)?", "", argument)
+            if argument:
+                return f"{intent} {argument}", confidence
+    return None, 0.0
+
+def Classify(query):
+    """ (decision list, confidence) for query; (None, confidence) when unsure.
+    The decision has FirstLayerDMM's format, e.g. ["open chrome", "open firefox"]. """
+    text = NormaliseClause(query)
+    if not text:
+        return None, 0.0
+    first, confidence = ClassifyClause(text)
+    if first is not None and first.startswith("play"):
+        # Song names often contain "and"; never split them
+        return ([first], confidence if " and " not in text else min(confidence, 0.85))
+
+    decision, confidence = [], 1.0
+    previous = None
+    for clause in filter(None, ClauseSplit.split(text)):
+        task, score = ClassifyClause(clause)
+        words = clause.split()
+        if task is None and previous in InheritableIntents and ArgumentFits("target", words):
+            task, score = f"{previous} {clause}", InheritableIntents[previous]
+        if task is None:
+            return None, 0.0
+        decision.append(task)
+        confidence = min(confidence, score)
+        previous = next((intent for intent in InheritableIntents if task.startswith(intent + " ")), None)
+    return (decision or None), (confidence if decision else 0.0)
+
+# ========================== Evaluation ==========================
+BenchmarkDir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Benchmark")
+DefaultLabels = [os.path.join(BenchmarkDir, "Intents.json"), os.path.join(BenchmarkDir, "IntentsHeldOut.json")]
+
+def Evaluate(examples, threshold):
+    """ Coverage and accuracy of the fast path on labelled examples.
+
+    Each example is {"query", "decision"}; decision null means the query must
+    be left to Cohere, so answering it counts as an error.
+    """
+    answered = correct = wrong_deferrals = 0
+    errors = []
+    started = time.perf_counter()
+    for example in examples:
+        decision, confidence = Classify(example["query"])
+        if decision is None or confidence < threshold:
+            continue
+        answered += 1
+        if decision == example["decision"]:
+            correct += 1
+        else:
+            if example["decision"] is None:
+                wrong_deferrals += 1
+            errors.append((example["query"], decision, example["decision"], confidence))
+    elapsed = time.perf_counter() - started
+    return {
+        "examples": len(examples),
+        "answered": answered,
+        "coverage": round(answered / len(examples), 3) if examples else 0.0,
+        "accuracy": round(correct / answered, 3) if answered else 1.0,
+        "should_have_deferred": wrong_deferrals,
+        "us_per_query": round(elapsed / max(len(examples), 1) * 1e6, 1),
+        "errors": errors,
+    }
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or DefaultLabels:
+        with open(path, "r", encoding="utf-8") as f:
+            report = Evaluate(json.load(f), FastIntentThreshold)
+        print(os.path.basename(path))
+        for query, got, expected, confidence in report.pop("errors"):
+            print(f"MISS {query!r}: got {got} ({confidence:.2f}), expected {expected}")
+        for key, value in report.items():
+            print(f"{key:<22}{value}")
+        print()
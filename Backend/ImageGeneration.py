@@ -5,6 +5,7 @@ from PIL import Image
 import requests
 from dotenv import get_key
 from time import sleep
+from Backend.Tracing import Span
 
 # Function to open and display images based on a given prompt
 def open_images(prompt):
@@ -39,14 +40,25 @@ async def query(payload):
 
 
 # Async function to generate images based on the given prompt
-async def generate_images(prompt: str):
+# progress(done, total) is called as each image arrives
+async def generate_images(prompt: str, progress=None):
+    done = 0
+
+    async def tracked_query(payload):
+        nonlocal done
+        content = await query(payload)
+        done += 1
+        if progress:
+            progress(done, 4)
+        return content
+
     tasks = []
     # Create 4 image generation tasks
     for i in range(4):
         payload = {
             "inputs": f"{prompt}, quality=4K, sharpness=maximum, Ultra High details, high resolution"
         }
-        task = asyncio.create_task(query(payload))
+        task = asyncio.create_task(tracked_query(payload))
         tasks.append(task)
 
     # Wait for all tasks to complete
@@ -59,31 +71,34 @@ async def generate_images(prompt: str):
 
 
 # Wrapper function to generate and open images
-def GenerateImages(prompt: str):
-    asyncio.run(generate_images(prompt))  # Run the async image generation
+def GenerateImages(prompt: str, progress=None):
+    with Span("image.generate"):
+        asyncio.run(generate_images(prompt, progress))  # Run the async image generation
     open_images(prompt)  # Open the generated images
 
 
-# Main loop to monitor for image generation requests
-while True:
-    try:
-        # Read the status and prompt from the data file
-        with open(r"Frontend\Files\ImageGeneration.data", "r") as f:
-            Data: str = f.read()
-        Prompt, Status = Data.split(",")
-
-        # If the status indicates an image generation request
-        if Status == "True":
-            print("Generating Images ...")
-            ImageStatus = GenerateImages(prompt=Prompt)
-
-            # Reset the status in the file after generating images
-            with open(r"Frontend\Files\ImageGeneration.data", "w") as f:
-                f.write("False, False")
-
-                break  # Exit the loop after processing the request
-        else:
-            sleep(1)  # Wait for 1 second before checking again
-
-    except:
-        pass
\ No newline at end of file
+# Standalone mode: monitor the data file for one image generation request.
+# The assistant itself uses the in-process worker in Backend/ImageWorker.py.
+if __name__ == "__main__":
+    while True:
+        try:
+            # Read the status and prompt from the data file
+            with open(r"Frontend\Files\ImageGeneration.data", "r") as f:
+                Data: str = f.read()
+            Prompt, Status = Data.split(",")
+
+            # If the status indicates an image generation request
+            if Status == "True":
+                print("Generating Images ...")
+                ImageStatus = GenerateImages(prompt=Prompt)
+
+                # Reset the status in the file after generating images
+                with open(r"Frontend\Files\ImageGeneration.data", "w") as f:
+                    f.write("False, False")
+
+                    break  # Exit the loop after processing the request
+            else:
+                sleep(1)  # Wait for 1 second before checking again
+
+        except:
+            pass
\ No newline at end of file
@@ -0,0 +1,148 @@
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.ImageGeneration import GenerateImages  # Image generation (imported once)
+from Backend.StateBus import Bus  # Publish job state for the GUI
+from Backend.Tracing import Bind  # Keep image spans on the submitting turn
+import itertools  # Job ids
+import threading  # Worker threads
+import queue  # Job queue
+import time  # Job timestamps
+
+# ========================== Load Environment Variables ==========================
+ImageConcurrency = int(env_vars.get("ImageConcurrency") or 1)
+KeepFinishedJobs = 20  # finished jobs still answered by Status()/Jobs(); older ones are dropped
+
+# ========================== Image Job ==========================
+class ImageJob:
+    """ One image generation request and its progress. """
+
+    def __init__(self, job_id, prompt):
+        self.id = job_id
+        self.prompt = prompt
+        self.state = "queued"     # queued -> running -> done | failed
+        self.done = 0             # images finished so far
+        self.total = 4            # images requested per prompt
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.callbacks = []
+        self.event = threading.Event()
+        self.generate = Bind(GenerateImages)  # runs in the submitter's trace context
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "prompt": self.prompt,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+# ========================== Image Worker ==========================
+class ImageWorker:
+    """ Long-lived in-process image generator fed from a job queue.
+
+    Worker threads start on the first Submit() and live for the rest of the
+    process, so PIL/requests are imported and warmed only once. At most
+    `concurrency` prompts are generated at the same time. Only the newest
+    KeepFinishedJobs finished jobs are kept once they have been reported.
+    """
+
+    def __init__(self, concurrency=1):
+        self.concurrency = max(1, concurrency)
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.threads = []
+
+    def _start(self):
+        while len(self.threads) < self.concurrency:
+            thread = threading.Thread(target=self._run, name=f"image-worker-{len(self.threads) + 1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _publish(self, job):
+        Bus.publish("image-job", job.to_dict())
+
+    def Submit(self, prompt, callback=None):
+        """ Queue a prompt and return its job id. callback(job_dict) runs on completion.
+        A prompt that is already queued or running is not generated twice. """
+        with self.lock:
+            for job in self.jobs.values():
+                if job.prompt == prompt and job.state in ("queued", "running"):
+                    if callback:
+                        job.callbacks.append(callback)
+                    return job.id
+            job = ImageJob(next(self.ids), prompt)
+            if callback:
+                job.callbacks.append(callback)
+            self.jobs[job.id] = job
+            self._start()
+        self._publish(job)
+        self.queue.put(job)
+        return job.id
+
+    def Status(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def Jobs(self):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def Wait(self, job_id, timeout=None):
+        """ Block until the job finishes. Returns its status dict, or None
+        for an unknown (or long finished and dropped) job. """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.event.wait(timeout)
+        return job.to_dict()
+
+    def _evict(self):
+        # Jobs are kept in submission order; drop the oldest finished ones
+        with self.lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.state in ("done", "failed")]
+            for job_id in finished[:max(0, len(finished) - KeepFinishedJobs)]:
+                del self.jobs[job_id]
+
+    def _progress(self, job, done, total):
+        job.done, job.total = done, total
+        self._publish(job)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                job.state = "running"
+            self._publish(job)
+            try:
+                job.generate(job.prompt, progress=lambda done, total: self._progress(job, done, total))
+                state, error = "done", None
+            except Exception as e:
+                state, error = "failed", str(e)
+                print(f"Image job {job.id} failed: {e}")
+            # Under the lock, so a Submit either joins before the callbacks are
+            # taken or sees the job finished and queues a new one
+            with self.lock:
+                job.state, job.error = state, error
+                job.finished = time.time()
+                callbacks = list(job.callbacks)
+            job.event.set()
+            self._publish(job)
+            for callback in callbacks:
+                try:
+                    callback(job.to_dict())
+                except Exception as e:
+                    print(f"Image job {job.id} callback error: {e}")
+            self._evict()  # reported on the bus and to its callbacks
+            self.queue.task_done()
+
+# Process-wide worker used by Main
+Worker = ImageWorker(ImageConcurrency)
@@ -0,0 +1,337 @@
+"""
+Local knowledge for realtime questions.
+
+Search results that RealtimeSearchEngine has fetched are kept in SQLite,
+together with the page text that deep mode read and short facts (sentences
+that name the entity). Everything is indexed by the question's entity
+("akshay kumar" for "who is akshay kumar") and by its words. A later
+question about the same entity, or with nearly the same words, is grounded
+in the stored results while they are fresh for its query class (the
+SearchCache TTLs). News questions only use results stored for news
+questions. A repeat of the same question is left to SearchCache, so the
+store never keeps results alive past the cache's own TTL; results keep the
+time they were really fetched. When live search fails, stale results are
+still better than none.
+
+Replay the recorded fixtures with:
+    python -m Backend.KnowledgeStore
+"""
+
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.DecisionCache import NormaliseQuery  # Shared query normalisation
+from Backend.SearchCache import QueryClass  # Freshness per query class
+from Backend.SnippetRanker import Tokens  # Shared tokenising
+from Backend.Tracing import Span, Percentile  # Latency tracing / freshness report
+from collections import deque  # Recent ages of served data
+import threading  # Per-thread connections / stats lock
+import sqlite3  # Storage engine
+import json  # Result rows / fixtures
+import time  # Freshness
+import re  # Sentences
+import os  # Paths
+
+# ========================== Settings ==========================
+KnowledgeEnabled = env_vars.get("KnowledgeStore", "True") == "True"
+KnowledgeDbPath = env_vars.get("KnowledgeDbPath") or r"Data\Knowledge.db"
+KnowledgeMatch = float(env_vars.get("KnowledgeMatch") or 0.75)  # word overlap that counts as the same question
+KnowledgeKeep = float(env_vars.get("KnowledgeKeepDays") or 30) * 86400  # older rows are deleted
+MaxFacts = 5  # facts about the entity added to a local answer
+FactChars = (30, 300)  # shortest and longest sentence kept as a fact
+TimelyClasses = {"news"}  # questions of these classes only match results stored for the same class
+
+# Words that say what is asked, not who or what it is about
+GenericWords = {
+    "whats", "whos", "tell", "about", "search", "find", "latest", "current", "recent", "today", "todays", "news",
+    "update", "updates", "price", "information", "info", "details", "know", "give", "show", "please",
+}
+
+def Entity(query):
+    """ "akshay kumar" for "who is Akshay Kumar?"; "" when only generic words are left. """
+    return " ".join(w for w in Tokens(NormaliseQuery(query)) if w not in GenericWords)
+
+def Sentences(text):
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text or "") if s.strip()]
+
+# ========================== Knowledge Store ==========================
+class KnowledgeStore:
+    """ Fetched results, page text and facts, by entity and query words (SQLite, WAL). """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock  # replaced when replaying fixtures
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "repeats": 0, "offline": 0, "records": 0}
+        self.ages = deque(maxlen=500)  # age in seconds of the data behind recent hits
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS queries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    query TEXT UNIQUE NOT NULL,
+                    entity TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    fetched REAL NOT NULL,
+                    kind TEXT NOT NULL DEFAULT ''
+                )""")
+            if "kind" not in {row["name"] for row in conn.execute("PRAGMA table_info(queries)")}:
+                conn.execute("ALTER TABLE queries ADD COLUMN kind TEXT NOT NULL DEFAULT ''")  # stores made before query classes
+            conn.execute("CREATE INDEX IF NOT EXISTS queries_entity ON queries(entity)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS terms (
+                    term TEXT NOT NULL,
+                    query_id INTEGER NOT NULL REFERENCES queries(id) ON DELETE CASCADE
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS terms_term ON terms(term)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    fetched REAL NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS facts (
+                    entity TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    url TEXT,
+                    fetched REAL NOT NULL,
+                    PRIMARY KEY (entity, text)
+                )""")
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self.local.conn = conn
+        return conn
+
+    # ---------------------- Lookup ----------------------
+    def Matches(self, query):
+        """ Stored questions matching query, freshest first: same entity or
+        nearly the same words, and for timely questions the same class. """
+        key = NormaliseQuery(query)
+        entity, terms, kind = Entity(key), set(Tokens(key)), QueryClass(key)[0]
+        if not terms:
+            return []
+        marks = ",".join("?" * len(terms))
+        rows = self._conn().execute(f"""
+            SELECT q.id, q.query, q.entity, q.results, q.fetched, q.kind FROM queries q
+            WHERE q.entity = ? AND q.entity != ''
+               OR q.id IN (SELECT query_id FROM terms WHERE term IN ({marks}))""",
+            (entity, *terms)).fetchall()
+        matches = []
+        for row in rows:
+            if (kind in TimelyClasses or row["kind"] in TimelyClasses) and row["kind"] != kind:
+                continue  # "<entity> news today" is not answered by a biography
+            other = set(Tokens(row["query"]))
+            overlap = len(terms & other) / len(terms | other)
+            if (entity and row["entity"] == entity) or overlap >= KnowledgeMatch:
+                matches.append(row)
+        return sorted(matches, key=lambda row: -row["fetched"])
+
+    def Results(self, best, since=0):
+        """ Stored results of row best, with page text and the facts about its
+        entity stored since the given time. """
+        conn = self._conn()
+        results = json.loads(best["results"])
+        urls = [r.get("url") for r in results if r.get("url")]
+        if urls:
+            pages = dict(conn.execute(
+                f"SELECT url, content FROM pages WHERE url IN ({','.join('?' * len(urls))})", urls).fetchall())
+            results = [dict(r, content=pages[r["url"]]) if r.get("url") in pages and not r.get("content") else r
+                       for r in results]
+        facts = self.Facts(best["entity"], exclude=results, since=since)
+        if facts:
+            results.append({"url": "", "title": f"Known facts about {best['entity']}", "description": " ".join(facts)})
+        return results
+
+    def Facts(self, entity, exclude=(), limit=MaxFacts, since=0):
+        """ Newest facts about entity stored since the given time that are not already in exclude's text. """
+        if not entity:
+            return []
+        seen = " ".join(f"{r.get('description') or ''} {r.get('content') or ''}" for r in exclude)
+        rows = self._conn().execute(
+            "SELECT text FROM facts WHERE entity = ? AND fetched >= ? ORDER BY fetched DESC LIMIT ?",
+            (entity, since, limit * 4)).fetchall()
+        return [row["text"] for row in rows if row["text"] not in seen][:limit]
+
+    def Get(self, query, live):
+        """ Results for query: those of a related stored question while fresh,
+        else live() -> (results, time fetched), which are then stored. Repeats
+        of a stored question go to live() too; SearchCache decides their
+        freshness. Stale results are returned if live() fails. """
+        if not KnowledgeEnabled:
+            return live()[0]
+        key = NormaliseQuery(query)
+        kind, ttl = QueryClass(key)
+        since = self.clock() - ttl if kind in TimelyClasses else 0  # facts as fresh as a timely answer
+        with Span("knowledge", kind=kind) as span:
+            rows = self.Matches(key)
+            related = [row for row in rows if row["query"] != key]
+            age = self.clock() - related[0]["fetched"] if related else None
+            if related and age <= ttl:
+                state = "hit"
+            elif len(related) < len(rows):
+                state = "repeat"  # SearchCache owns this question's freshness
+            else:
+                state = "stale" if related else "miss"
+            span.fields.update(state=state)
+        if state == "hit":
+            self._served("hits", age)
+            return self.Results(related[0], since)
+        self._count({"repeat": "repeats", "miss": "misses", "stale": "stale"}[state])
+        try:
+            fresh, fetched = live()
+        except Exception:
+            if not rows:
+                raise
+            age = self.clock() - rows[0]["fetched"]  # the question itself counts now
+            print(f"Live search for '{query}' failed; answering from results {age / 60:.0f} minutes old")
+            self._served("offline", age)
+            return self.Results(rows[0], since)
+        self.Record(query, fresh, fetched)
+        return fresh
+
+    # ---------------------- Recording ----------------------
+    def Record(self, query, results, fetched=None):
+        """ Store results (a list of {"url", "title", "description"}) for query,
+        as fetched at the given time (now by default). Older results than the
+        ones already stored for query are ignored. """
+        if not KnowledgeEnabled or not results:
+            return  # an empty page is more likely a blocked request than an answer
+        key = NormaliseQuery(query)
+        entity, now = Entity(key), self.clock()
+        fetched = now if fetched is None else fetched
+        results = [{k: r.get(k) for k in ("url", "title", "description")} for r in results if r.get("url")]
+        with self._conn() as conn:
+            stored = conn.execute("SELECT fetched FROM queries WHERE query = ?", (key,)).fetchone()
+            if stored is not None and stored["fetched"] >= fetched:
+                return  # a search cache entry we already have
+            conn.execute("DELETE FROM queries WHERE query = ?", (key,))
+            query_id = conn.execute("INSERT INTO queries (query, entity, results, fetched, kind) VALUES (?, ?, ?, ?, ?)",
+                                    (key, entity, json.dumps(results), fetched, QueryClass(key)[0])).lastrowid
+            conn.executemany("INSERT INTO terms (term, query_id) VALUES (?, ?)",
+                             [(term, query_id) for term in set(Tokens(key))])
+            self._add_facts(conn, entity, [(r["url"], r.get("description")) for r in results], fetched)
+            conn.execute("DELETE FROM queries WHERE fetched < ?", (now - KnowledgeKeep,))
+            conn.execute("DELETE FROM facts WHERE fetched < ?", (now - KnowledgeKeep,))
+        self._count("records")
+
+    def RecordPages(self, query, texts):
+        """ Store page text read in deep mode ({url: text}) and the facts in it. """
+        if not KnowledgeEnabled or not texts:
+            return
+        now = self.clock()
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO pages (url, content, fetched) VALUES (?, ?, ?)",
+                             [(url, text, now) for url, text in texts.items()])
+            self._add_facts(conn, Entity(query), list(texts.items()), now)
+            conn.execute("DELETE FROM pages WHERE fetched < ?", (now - KnowledgeKeep,))
+
+    def _add_facts(self, conn, entity, sources, now):
+        # Sentences that name every word of the entity
+        if not entity:
+            return
+        words = entity.split()
+        facts = []
+        for url, text in sources:
+            for sentence in Sentences(text):
+                lowered = sentence.lower()
+                if FactChars[0] <= len(sentence) <= FactChars[1] and all(w in lowered for w in words):
+                    facts.append((entity, sentence, url, now))
+        conn.executemany("INSERT OR REPLACE INTO facts (entity, text, url, fetched) VALUES (?, ?, ?, ?)", facts)
+
+    def Clear(self):
+        with self._conn() as conn:
+            for table in ("terms", "queries", "pages", "facts"):
+                conn.execute(f"DELETE FROM {table}")
+
+    # ---------------------- Metrics ----------------------
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _served(self, key, age):
+        with self.lock:
+            self.stats[key] += 1
+            self.ages.append(age)
+
+    def Stats(self):
+        """ Counters, hit rate, and how old the data behind recent hits was. """
+        conn = self._conn()
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["stale"] + self.stats["repeats"]
+            ages = sorted(self.ages)
+            stats = dict(self.stats, hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0)
+        stats.update(
+            age_p50_s=round(Percentile(ages, 50), 1) if ages else None,
+            age_max_s=round(ages[-1], 1) if ages else None,
+            questions=conn.execute("SELECT COUNT(*) FROM queries").fetchone()[0],
+            entities=conn.execute("SELECT COUNT(DISTINCT entity) FROM queries WHERE entity != ''").fetchone()[0],
+            facts=conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0],
+        )
+        return stats
+
+# Process-wide store used by RealtimesearchEngine.SearchResultsFor
+Knowledge = KnowledgeStore(KnowledgeDbPath)
+
+# ========================== Fixture Replay ==========================
+FixtureDir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Benchmark")
+
+def Replay(recorded, cases):
+    """ Record the recorded result sets, then ask each case's question
+    "after_minutes" later. Live search finds nothing, fails when the case has
+    "live": "down", or with "cached_minutes" returns the recorded results as
+    a search cache entry stored that many minutes after the start.
+    Returns (failures, stats). """
+    import tempfile
+    now = [time.time()]
+    start = now[0]
+    store = KnowledgeStore(os.path.join(tempfile.mkdtemp(), "Knowledge.db"), clock=lambda: now[0])
+    for item in recorded:
+        store.Record(item["query"], item["results"])
+    by_query = {NormaliseQuery(item["query"]): item["results"] for item in recorded}
+    failures = []
+    for case in cases:
+        now[0] = start + case["after_minutes"] * 60
+
+        def live():
+            if case.get("live") == "down":
+                raise ConnectionError("live search is down")
+            if "cached_minutes" in case:
+                return by_query[NormaliseQuery(case["query"])], start + case["cached_minutes"] * 60
+            return [], now[0]
+        before = dict(store.stats)
+        try:
+            results = store.Get(case["query"], live)
+        except ConnectionError:
+            results = None
+        got = next(state for state, counter in (("offline", "offline"), ("hit", "hits"), ("stale", "stale"),
+                                                ("repeat", "repeats"), ("miss", "misses"))
+                   if store.stats[counter] > before[counter])
+        titles = {r["title"] for r in results or []}
+        missing = [t for t in case.get("titles", []) if t not in titles]
+        if got != case["expect"] or missing:
+            failures.append(f"{case['query']!r} after {case['after_minutes']} min: expected {case['expect']}, "
+                            f"got {got}" + (f", missing {missing}" if missing else ""))
+    return failures, store.Stats()
+
+if __name__ == "__main__":
+    with open(os.path.join(FixtureDir, "SearchResults.json"), "r", encoding="utf-8") as f:
+        recorded = json.load(f)
+    with open(os.path.join(FixtureDir, "Knowledge.json"), "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    failures, stats = Replay(recorded, cases)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(cases) - len(failures)}/{len(cases)} cases passed")
+    print(stats)
+    raise SystemExit(1 if failures else 0)
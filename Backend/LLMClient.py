@@ -0,0 +1,216 @@
+"""
+One pooled HTTP client layer shared by every LLM backend.
+
+Groq (chat, realtime answers, summaries, content writing) and Cohere (the
+DMM) all talk through a single httpx.Client, so TLS connections are reused
+across backends instead of each SDK keeping its own cold pool. Connections
+are opened at start-up (WarmUp) and kept alive with a light request whenever
+a host has been idle for a while, so the first turn after a pause does not
+pay a handshake. Transient failures (connection errors, timeouts, 429, 5xx)
+are retried with bounded exponential backoff and full jitter.
+
+    completion = Clients.Stream("groq", Clients.Groq().chat.completions.create, model=..., stream=True)
+"""
+
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+import threading  # Client lock / keep-alive thread
+import random  # Backoff jitter
+import time  # Backoff / idle tracking
+
+# ========================== Settings ==========================
+GroqAPIKey = env_vars.get("GroqAPIKey")
+CohereAPIKey = env_vars.get("CohereAPIKey")
+
+# Hosts warmed at start-up and pinged while idle; only those with an API key
+Hosts = {
+    "groq": ("https://api.groq.com", GroqAPIKey),
+    "cohere": ("https://api.cohere.com", CohereAPIKey),
+}
+
+MaxConnections = int(env_vars.get("LLMMaxConnections") or 20)
+KeepAliveExpiry = 300  # seconds an idle pooled connection is kept open
+PingInterval = float(env_vars.get("LLMPingSeconds") or 45)  # below typical server idle timeouts
+ConnectTimeout = 5.0
+ReadTimeout = 60.0
+RetryAttempts = int(env_vars.get("LLMRetryAttempts") or 4)  # total tries per request
+RetryBase = 0.25  # seconds; doubled on each retry
+RetryCap = 4.0  # longest single backoff
+
+# ========================== Errors ==========================
+def IsTransient(error):
+    """ True for failures worth retrying: network errors, timeouts, 408/409/429 and 5xx. """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    name = type(error).__name__
+    return any(word in name for word in ("Timeout", "Connect", "Network", "Protocol"))
+
+def Backoff(attempt):
+    """ Full-jitter delay before retry number attempt (0-based). """
+    return random.uniform(0, min(RetryCap, RetryBase * (2 ** attempt)))
+
+# ========================== Client Pool ==========================
+class ClientPool:
+    """ Shared httpx pool plus the Groq and Cohere SDK clients built on it. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.http = None
+        self.groq = None
+        self.cohere = None
+        self.pinger = None
+        self.last_used = {}  # host -> monotonic time of the last response
+        self.stats = {
+            "requests": 0, "responses": 0, "errors": 0, "retries": 0, "failures": 0,
+            "connections_opened": 0, "tls_handshakes": 0, "warmups": 0, "pings": 0,
+        }
+
+    # ---------------------- Clients ----------------------
+    def Http(self):
+        with self.lock:
+            if self.http is None:
+                import httpx  # Shared connection pool
+                self.http = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=MaxConnections,
+                        max_keepalive_connections=MaxConnections,
+                        keepalive_expiry=KeepAliveExpiry,
+                    ),
+                    timeout=httpx.Timeout(ReadTimeout, connect=ConnectTimeout),
+                    event_hooks={"request": [self._on_request], "response": [self._on_response]},
+                )
+            return self.http
+
+    def Groq(self):
+        if self.groq is None:
+            http = self.Http()
+            from groq import Groq  # Groq API
+            with self.lock:
+                if self.groq is None:
+                    # Retries are done here, with jitter, not by the SDK
+                    self.groq = Groq(api_key=GroqAPIKey, http_client=http, max_retries=0)
+        return self.groq
+
+    def Cohere(self):
+        if self.cohere is None:
+            http = self.Http()
+            import cohere  # Cohere API
+            with self.lock:
+                if self.cohere is None:
+                    self.cohere = cohere.Client(api_key=CohereAPIKey, httpx_client=http)
+        return self.cohere
+
+    # ---------------------- Retries ----------------------
+    def Retry(self, name, call, *args, **kwargs):
+        """ call(*args, **kwargs), retrying transient failures with backoff. """
+        for attempt in range(RetryAttempts):
+            try:
+                return call(*args, **kwargs)
+            except Exception as e:
+                if attempt == RetryAttempts - 1 or not IsTransient(e):
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                delay = Backoff(attempt)
+                print(f"{name} request failed ({type(e).__name__}: {e}); retrying in {delay:.2f} s")
+                time.sleep(delay)
+
+    def Stream(self, name, create, *args, **kwargs):
+        """ Iterate the stream returned by create(*args, **kwargs).
+
+        The request and its first item are retried like Retry(); once data
+        has arrived a failure is raised as-is, since it cannot be replayed
+        without repeating tokens. The stream is closed when iteration stops.
+        """
+        def opened():
+            stream = create(*args, **kwargs)
+            iterator = iter(stream)
+            try:
+                return stream, iterator, [next(iterator)]
+            except StopIteration:
+                return stream, iterator, []
+        stream, iterator, head = self.Retry(name, opened)
+        try:
+            yield from head
+            yield from iterator
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    # ---------------------- Warm-up / Keep-alive ----------------------
+    def Warm(self):
+        """ Build the SDK clients and open a connection to each configured host. """
+        if GroqAPIKey:
+            self.Groq()
+        if CohereAPIKey:
+            self.Cohere()
+        threads = [threading.Thread(target=self._ping, args=(url, "warmups"), daemon=True)
+                   for url, key in Hosts.values() if key]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(ConnectTimeout + 1)
+        self.StartKeepAlive()
+
+    def StartKeepAlive(self):
+        with self.lock:
+            if self.pinger is None and any(key for _, key in Hosts.values()):
+                self.pinger = threading.Thread(target=self._keep_alive, name="llm-keepalive", daemon=True)
+                self.pinger.start()
+
+    def _keep_alive(self):
+        while True:
+            time.sleep(PingInterval / 2)
+            now = time.monotonic()
+            for url, key in Hosts.values():
+                host = url.split("://", 1)[1]
+                if key and now - self.last_used.get(host, 0) >= PingInterval:
+                    self._ping(url, "pings")
+
+    def _ping(self, url, counter):
+        # Any response keeps the connection open; the status does not matter
+        try:
+            self.Http().head(url)
+            self._count(counter)
+        except Exception as e:
+            print(f"Connection warm-up to {url} failed: {e}")
+
+    # ---------------------- Metrics ----------------------
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def _on_request(self, request):
+        self._count("requests")
+        request.extensions["trace"] = self._trace
+
+    def _on_response(self, response):
+        self._count("responses" if response.status_code < 400 else "errors")
+        self.last_used[response.request.url.host] = time.monotonic()
+
+    def _trace(self, event, info):
+        # httpcore connection events; fired only when a new connection is made
+        if event == "connection.connect_tcp.complete":
+            self._count("connections_opened")
+        elif event == "connection.start_tls.complete":
+            self._count("tls_handshakes")
+
+    def Stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        pool = getattr(getattr(self.http, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["pooled"] = len(connections)
+            stats["idle"] = sum(1 for c in connections if c.is_idle())
+        return stats
+
+# Process-wide pool shared by Chatbot, RealtimesearchEngine, Automation, ContextWindow and Model
+Clients = ClientPool()
+
+def WarmUp():
+    Clients.Warm()
@@ -0,0 +1,157 @@
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.ChatStore import Store  # Source of the indexed turns
+from Backend.Tracing import Span  # Latency tracing
+from Backend.Text import StopWords, TokenPattern  # Shared tokenising
+from collections import Counter  # Feature counts
+import numpy as np  # Vector matrix and cosine search
+import threading  # Index lock
+import json  # Index metadata
+import math  # Sublinear term weights
+import zlib  # Stable feature hashing
+import os  # Paths
+
+# ========================== Settings ==========================
+MemoryEnabled = env_vars.get("RetrievalMemory", "True") == "True"
+MemoryPath = env_vars.get("MemoryPath") or r"Data\Memory"  # .f32 / .ids / .json are added
+Dims = 384                # hashed feature space; 384 float32 = 1.5 KB per turn
+MinScore = 0.2            # cosine similarity below this is not worth the prompt tokens
+InitialCapacity = 1024    # rows allocated up front; doubled when full
+
+# ========================== Hashed Vectoriser ==========================
+def Features(text, stop_words=StopWords):
+    """ Words, word bigrams and character trigrams of text. """
+    words = [w for w in TokenPattern.findall(text.lower()) if w not in stop_words]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return features
+
+def Embed(texts, stop_words=StopWords):
+    """ Unit-length (len(texts), Dims) float32 vectors; no model download, CPU only. """
+    vectors = np.zeros((len(texts), Dims), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature, count in Counter(Features(text, stop_words)).items():
+            h = zlib.crc32(feature.encode("utf-8"))  # stable across runs, unlike hash()
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vectors[row, h % Dims] += sign * (1.0 + math.log(count))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+# ========================== Retrieval Memory ==========================
+class RetrievalMemory:
+    """ Embeddings of every chat turn in a memory-mapped matrix on disk.
+
+    Row i holds the vector of turn ids[i]; ids only ever grow, so "turns
+    before id X" is a prefix of the matrix. Only turns newer than the last
+    indexed one are embedded on each Sync(); a search is one matrix-vector
+    product over the mapped rows.
+    """
+
+    def __init__(self, store, path):
+        self.store = store
+        self.paths = {ext: f"{path}.{ext}" for ext in ("f32", "ids", "json")}
+        self.lock = threading.Lock()
+        self.vectors = None
+        self.ids = None
+        self.count = 0
+        self.loaded = False
+
+    # ---------------------- Storage ----------------------
+    def _map(self, capacity, mode):
+        self.vectors = np.memmap(self.paths["f32"], dtype=np.float32, mode=mode, shape=(capacity, Dims))
+        self.ids = np.memmap(self.paths["ids"], dtype=np.int64, mode=mode, shape=(capacity,))
+
+    def _load(self):
+        try:
+            with open(self.paths["json"], "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["dims"] != Dims:
+                raise ValueError("vector size changed")
+            self._map(meta["capacity"], "r+")
+            self.count = meta["count"]
+            if self.count and not self.store.Has(int(self.ids[self.count - 1])):
+                raise ValueError("chat store was cleared")
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(self.paths["json"]):
+                print(f"Rebuilding retrieval memory: {e}")
+            self._reset()
+        self.loaded = True
+
+    def _reset(self):
+        folder = os.path.dirname(self.paths["f32"])
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._map(InitialCapacity, "w+")
+        self.count = 0
+        self._save_meta()
+
+    def _grow(self, needed):
+        capacity = len(self.ids)
+        while capacity < needed:
+            capacity *= 2
+        self.vectors.flush()
+        self.ids.flush()
+        for key, itemsize in (("f32", 4 * Dims), ("ids", 8)):
+            with open(self.paths[key], "r+b") as f:
+                f.truncate(capacity * itemsize)
+        self._map(capacity, "r+")
+
+    def _save_meta(self):
+        # Rows past "count" are ignored, so vectors are flushed before the count moves
+        temp = self.paths["json"] + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"dims": Dims, "count": self.count, "capacity": len(self.ids)}, f)
+        os.replace(temp, self.paths["json"])
+
+    # ---------------------- Indexing ----------------------
+    def Sync(self):
+        """ Embed turns saved since the last sync. Returns how many were added. """
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            last_id = int(self.ids[self.count - 1]) if self.count else 0
+            turns = self.store.TurnsSince(last_id)
+            if not turns:
+                return 0
+            if self.count + len(turns) > len(self.ids):
+                self._grow(self.count + len(turns))
+            end = self.count + len(turns)
+            self.vectors[self.count:end] = Embed([turn["content"] for turn in turns])
+            self.ids[self.count:end] = [turn["id"] for turn in turns]
+            self.vectors.flush()
+            self.ids.flush()
+            self.count = end
+            self._save_meta()
+            return len(turns)
+
+    # ---------------------- Search ----------------------
+    def Search(self, query, k=6, before=None):
+        """ [(turn id, score)] of the k turns most similar to query, best first,
+        looking only at turns with id < before when given. """
+        self.Sync()
+        with self.lock, Span("memory.search", rows=self.count):
+            rows = self.count
+            if before is not None:
+                rows = int(np.searchsorted(self.ids[:rows], before))
+            if rows == 0:
+                return []
+            scores = self.vectors[:rows] @ Embed([query])[0]
+            k = min(k, rows)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(self.ids[i]), float(scores[i])) for i in top if scores[i] >= MinScore]
+
+    def Recall(self, query, k=6, before=None):
+        """ Turns for Search() hits, in chronological order. """
+        hits = self.Search(query, k, before)
+        return self.store.TurnsByIds(sorted(turn_id for turn_id, _ in hits))
+
+# Process-wide memory over the shared chat store
+Memory = RetrievalMemory(Store, MemoryPath)
+
+def WarmUp():
+    if MemoryEnabled:
+        Memory.Sync()  # map the matrix and embed turns saved since the last run
@@ -1,15 +1,22 @@
-import cohere  # Import the Cohere library for AI services.
 from rich import print  # Import the Rich library to enhance terminal outputs.
-from dotenv import dotenv_values  # Import dotenv to load environment variables from a .env file.
-
-# Load environment variables from the .env file.
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
+from Backend.Config import env_vars  # Import settings parsed once from the .env file.
+from Backend.Tracing import Span  # Import per-turn latency tracing.
+from Backend.DecisionCache import DecisionCache, Fingerprint, NormaliseQuery  # Import the decision cache.
+from Backend.FastIntent import Classify, FastIntentThreshold  # Import the local command classifier.
+from Backend.LLMClient import Clients  # Import the shared pooled Cohere client.
+from Backend.SingleFlight import Flights  # Import de-duplication of identical in-flight requests.
 
 # Retrieve API key.
 CohereAPIKey = env_vars.get("CohereAPIKey")
 
-# Create a Cohere client using the provided API key.
-co = cohere.Client(api_key=CohereAPIKey)
+# Decision cache settings.
+DecisionCacheEnabled = env_vars.get("DecisionCache", "True") == "True"
+DecisionCachePath = env_vars.get("DecisionCachePath") or r"Data\DecisionCache.json"
+DecisionCacheSize = int(env_vars.get("DecisionCacheSize") or 512)
+DecisionCacheTTL = float(env_vars.get("DecisionCacheTTLHours") or 168) * 3600
+
+# Plain commands are classified locally; anything below the threshold goes to Cohere.
+FastIntentEnabled = env_vars.get("FastIntent", "True") == "True"
 
 # Print the Cohere API Key (for debugging or verification purposes)
 print("CohereAPIKey:", CohereAPIKey)
@@ -61,29 +68,63 @@ ChatHistory = [
     {"role": "Chatbot", "message": "general chat with me."}
 ]
 
+# Cache of decisions for repeated commands; any change to the model, preamble,
+# examples or keywords invalidates it. Reminders are stateful and never cached.
+Decisions = DecisionCache(
+    DecisionCachePath,
+    Fingerprint("command-r-plus", preamble, ChatHistory, funcs),
+    capacity=DecisionCacheSize,
+    ttl=DecisionCacheTTL,
+    excluded=("reminder",),
+)
+
 # Define the main function for decision-making on queries.
 def FirstLayerDMM(prompt: str = "test"):
+    # Answer repeated commands from the cache.
+    if DecisionCacheEnabled:
+        cached = Decisions.Get(prompt)
+        if cached is not None:
+            with Span("dmm", cached=True):
+                return cached
+
+    # Answer plain commands ("open chrome", "volume up") without a network call.
+    confidence = 0.0
+    if FastIntentEnabled:
+        decision, confidence = Classify(prompt)
+        if decision is not None and confidence >= FastIntentThreshold:
+            with Span("dmm", fast=True, confidence=confidence):
+                return decision
+
+    # Identical queries already being decided share that Cohere call.
+    return list(Flights.Do("dmm", NormaliseQuery(prompt), lambda: CohereDecision(prompt, confidence)))
+
+# Ask Cohere for the decision and remember it.
+def CohereDecision(prompt, confidence=0.0):
     # Add the user's query to the messages list.
     messages.append({"role": "user", "content": prompt})
 
-    # Create a streaming chat session with the Cohere model.
-    stream = co.chat_stream(
-        model="command-r-plus",       # Specify the Cohere model to use.
-        message=prompt,               # Pass the user's query.
-        temperature=0.7,              # Set the creativity level of the model.
-        chat_history=ChatHistory,     # Provide the predefined chat history for context.
-        prompt_truncation="OFF",      # Ensure the prompt is not truncated.
-        connectors=[],                # No additional connectors are used.
-        preamble=preamble             # Pass the detailed instruction preamble.
-    )
-
-    # Initialize an empty string to store the generated response.
-    response = ""
-
-    # Iterate over events in the stream
-    for event in stream:
-        if event.event_type == "text-generation":
-            response += event.text  # Append generated text to the response.
+    # Trace the whole Cohere stream, marking the first generated token.
+    with Span("dmm", model="command-r-plus", fast_confidence=confidence) as span:
+        # Create a streaming chat session with the Cohere model.
+        stream = Clients.Stream(
+            "cohere", Clients.Cohere().chat_stream,
+            model="command-r-plus",       # Specify the Cohere model to use.
+            message=prompt,               # Pass the user's query.
+            temperature=0.7,              # Set the creativity level of the model.
+            chat_history=ChatHistory,     # Provide the predefined chat history for context.
+            prompt_truncation="OFF",      # Ensure the prompt is not truncated.
+            connectors=[],                # No additional connectors are used.
+            preamble=preamble             # Pass the detailed instruction preamble.
+        )
+
+        # Initialize an empty string to store the generated response.
+        response = ""
+
+        # Iterate over events in the stream
+        for event in stream:
+            if event.event_type == "text-generation":
+                span.mark("first_token")
+                response += event.text  # Append generated text to the response.
 
     # Remove newline characters and split responses into individual tasks.
     response = response.replace("\n", "")
@@ -106,9 +147,11 @@ def FirstLayerDMM(prompt: str = "test"):
 
     # If (query) is in the response, recursively call the function for further clarification.
     if "(query)" in response:
-        newresponse = FirstLayerDMM(prompt=prompt)
+        newresponse = CohereDecision(prompt, confidence)
         return newresponse  # Return the clarified response.
     else:
+        if DecisionCacheEnabled:
+            Decisions.Put(prompt, response)  # Remember the decision for next time.
         return response  # Return the filtered response.
 
 
@@ -118,4 +161,5 @@ if __name__ == "__main__":
     while True:
         user_input = input(">>>>> ")
         result = FirstLayerDMM(user_input)
-        print(f"[green]Recognized Tasks:[/green] {result}")
\ No newline at end of file
+        print(f"[green]Recognized Tasks:[/green] {result}")
+        print(f"[blue]Decision cache:[/blue] {Decisions.Stats()}")
\ No newline at end of file
@@ -0,0 +1,337 @@
+"""
+Per-request choice between the large and the small Groq model.
+
+Each request keeps the model its intent used before routing (70B for
+general and realtime answers, 8B for content) unless it is small talk or a
+bare word or two, which 8B answers as well. 70B is also swapped for 8B
+while its recent first-token latency is over the intent's budget; every
+ProbeEvery such requests, or after ProbeAfterS without a 70B sample, one
+goes to 70B anyway (hedged as usual) so the router notices it has recovered.
+Routing by a complexity estimate (length, reasoning words, intent, whether
+search results ground the answer) is off until ComplexityThreshold is set,
+once the routing log shows a threshold that keeps answer quality.
+A request is hedged: if the chosen model has produced nothing after
+HedgeAfterMs, the other model is asked too and whichever answers first wins.
+
+Every routed request is appended to Data\\Routing.jsonl. Summarise it with:
+    python -m Backend.ModelRouter [Data\\Routing.jsonl]
+Check that routing returns to 70B after a slow spell (simulated models):
+    python -m Backend.ModelRouter --check-recovery
+"""
+
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.Tracing import Bind, TraceWriter, Percentile, ReadSpans  # Trace context / JSONL log
+import threading  # Hedged attempts
+import queue  # Tokens from the attempts
+import time  # Latency
+import sys  # CLI arguments
+import os  # Temporary routing log
+import re  # Tokenising queries
+
+# ========================== Settings ==========================
+LargeModel = "llama-3.3-70b-versatile"
+SmallModel = "llama-3.1-8b-instant"
+
+RoutingEnabled = env_vars.get("ModelRouting", "True") == "True"
+HedgingEnabled = env_vars.get("HedgedRequests", "True") == "True"
+HedgeAfterMs = float(env_vars.get("HedgeAfterMs") or 800)
+RoutingLogPath = env_vars.get("RoutingLogPath") or r"Data\Routing.jsonl"
+
+# Models used before routing existed, and whenever it is switched off
+DefaultModels = {"general": LargeModel, "realtime": LargeModel, "content": SmallModel}
+
+# Time-to-first-token budget per intent (ms); content is written to a file
+LatencyBudgets = {
+    "general": float(env_vars.get("GeneralLatencyBudgetMs") or 900),
+    "realtime": float(env_vars.get("RealtimeLatencyBudgetMs") or 1200),
+    "content": float(env_vars.get("ContentLatencyBudgetMs") or 4000),
+}
+
+# At or above, the large model is preferred; 0 (the default) keeps each
+# intent's default model. Pick a value from SummariseRouting data first.
+ComplexityThreshold = float(env_vars.get("ComplexityThreshold") or 0)
+ReportBand = ComplexityThreshold or 0.45  # complexity band split in the report
+ShortQueryWords = 2  # at most this many words, and no question word, is "trivial"
+FirstTokenGuess = {LargeModel: 450.0, SmallModel: 180.0}  # ms, until measured
+Smoothing = 0.2  # weight of each new first-token sample
+ProbeEvery = int(env_vars.get("RouterProbeEvery") or 10)  # requests moved off 70B between probes
+ProbeAfterS = float(env_vars.get("RouterProbeSeconds") or 60)  # or seconds without a 70B sample
+
+ReasoningWords = {
+    "why", "how", "explain", "compare", "difference", "between", "analyse", "analyze",
+    "prove", "derive", "calculate", "solve", "code", "program", "function", "algorithm",
+    "essay", "story", "detailed", "steps", "pros", "cons", "advantages", "summarise", "summarize",
+}
+QuestionWords = {"what", "who", "whom", "whose", "why", "how", "when", "where", "which"}
+SmallTalk = {
+    "hi", "hello", "hey", "thanks", "thank you", "ok", "okay", "how are you",
+    "good morning", "good night", "chat with me", "do you like pizza",
+}
+
+# ========================== Complexity ==========================
+def Trivial(query):
+    """ Small talk, or a bare word or two that is not a question. """
+    words = re.findall(r"[\w']+", query.lower())
+    return (not words or " ".join(words) in SmallTalk
+            or (len(words) <= ShortQueryWords and not QuestionWords.intersection(words)))
+
+def Complexity(query, intent, has_context=False):
+    """ 0 (trivial) .. 1 (worth the large model), from cheap features of the request. """
+    words = re.findall(r"[\w']+", query.lower())
+    if not words or " ".join(words) in SmallTalk:
+        return 0.0
+    score = 0.15 + min(len(words) / 40, 0.35)
+    if ReasoningWords.intersection(words):
+        score += 0.3
+    if intent == "content":
+        score += 0.2  # long-form writing
+    if has_context:
+        score -= 0.15  # grounded in search results; mostly summarising
+    return round(max(0.0, min(score, 1.0)), 3)
+
+# ========================== Router ==========================
+class Route:
+    """ Decision for one request: the model to ask first and the hedge, if any. """
+
+    def __init__(self, intent, complexity, budget, model, hedge, hedge_after):
+        self.intent = intent
+        self.complexity = complexity
+        self.budget = budget
+        self.model = model
+        self.hedge = hedge
+        self.hedge_after = hedge_after  # ms
+
+class ModelRouter:
+    def __init__(self, log_path):
+        self.lock = threading.Lock()
+        self.first_token = dict(FirstTokenGuess)  # model -> smoothed first-token ms
+        self.sampled = {model: time.monotonic() for model in FirstTokenGuess}  # last first-token sample
+        self.moved = 0  # requests moved off 70B since it was last asked
+        self.probes = 0
+        self.log = TraceWriter(log_path, 5 * 1024 * 1024, 2)
+        self.stats = {}  # model -> counters
+
+    def Choose(self, intent, query, has_context=False):
+        complexity = Complexity(query, intent, has_context)
+        budget = LatencyBudgets.get(intent, LatencyBudgets["general"])
+        if not RoutingEnabled:
+            return Route(intent, complexity, budget, DefaultModels.get(intent, LargeModel), None, 0)
+        if ComplexityThreshold:
+            model = LargeModel if complexity >= ComplexityThreshold else SmallModel
+        else:
+            model = DefaultModels.get(intent, LargeModel)
+            if Trivial(query):
+                model = SmallModel
+        probe = False
+        with self.lock:
+            if model == LargeModel and self.first_token[LargeModel] > budget:
+                # 70B is currently too slow to meet the budget; without an
+                # occasional probe its estimate would never be updated again
+                self.moved += 1
+                probe = self.moved > ProbeEvery or time.monotonic() - self.sampled[LargeModel] >= ProbeAfterS
+                if probe:
+                    self.moved, self.probes = 0, self.probes + 1
+                else:
+                    model = SmallModel
+            # Never hedge sooner than the chosen model usually needs, but a
+            # probe hands over to the hedge within the budget
+            hedge_after = max(HedgeAfterMs, self.first_token[model] * 1.5)
+            if probe:
+                hedge_after = min(hedge_after, budget)
+        hedge = (SmallModel if model == LargeModel else LargeModel) if HedgingEnabled else None
+        return Route(intent, complexity, budget, model, hedge, hedge_after)
+
+    def Stream(self, route, open_stream, cancel=None):
+        """ Yield tokens of open_stream(model, stop) for route.model.
+
+        If no token has arrived after route.hedge_after ms, or the first
+        model fails before its first token, open_stream(route.hedge, stop)
+        is started too; the first model to produce a token wins and the
+        other is stopped. Errors are raised only when no attempt succeeds.
+        """
+        events = queue.Queue()
+        stops = {}  # model -> stop event of its attempt
+        finished = set()
+
+        def attempt(model, stop):
+            stream = open_stream(model, stop)
+            try:
+                for token in stream:
+                    if stop.is_set():
+                        break
+                    events.put((model, token, None))
+            except Exception as e:
+                events.put((model, None, e))
+                return
+            finally:
+                stream.close()
+            events.put((model, None, None))
+
+        def launch(model):
+            launched[model] = time.perf_counter()
+            stops[model] = threading.Event()
+            threading.Thread(target=Bind(attempt), args=(model, stops[model]),
+                             name=f"route-{model}", daemon=True).start()
+
+        started = time.perf_counter()
+        launched = {}  # model -> when its attempt started; first tokens are timed from there
+        winner, first_at, error = None, None, None
+        tokens = chars = 0
+        launch(route.model)
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    return
+                elapsed = (time.perf_counter() - started) * 1000
+                if winner is None and route.hedge and route.hedge not in stops and elapsed >= route.hedge_after:
+                    launch(route.hedge)
+                try:
+                    model, token, failure = events.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if winner is not None and model != winner:
+                    continue  # the losing attempt's leftovers
+                if token is not None:
+                    if winner is None:
+                        winner, first_at = model, time.perf_counter()
+                        for other, stop in stops.items():
+                            if other != model:
+                                stop.set()
+                    tokens += 1
+                    chars += len(token)
+                    yield token
+                    continue
+                finished.add(model)
+                if failure is not None:
+                    error = failure
+                if winner == model:
+                    if failure is not None:
+                        raise failure
+                    return
+                # An attempt ended before producing anything
+                if route.hedge and route.hedge not in stops:
+                    launch(route.hedge)
+                elif finished >= set(stops):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            for stop in stops.values():
+                stop.set()
+            self._record(route, winner, first_at, launched, started, tokens, chars, route.hedge in stops,
+                         error if winner is None else None)  # a failure the hedge covered is not an error
+
+    # ---------------------- Measurements ----------------------
+    def _record(self, route, winner, first_at, launched, started, tokens, chars, hedged, error):
+        ended = time.perf_counter()
+        total_ms = (ended - started) * 1000
+        first_ms = (first_at - launched[winner]) * 1000 if winner is not None else None
+        with self.lock:
+            if winner is not None:
+                self.first_token[winner] += Smoothing * (first_ms - self.first_token[winner])
+                self.sampled[winner] = time.monotonic()
+            if hedged and winner != route.model:
+                # The first model was slower than this; count it as a lower bound
+                waited = ((first_at or ended) - launched[route.model]) * 1000
+                self.first_token[route.model] += Smoothing * max(0.0, waited - self.first_token[route.model])
+            stats = self.stats.setdefault(route.model, {"requests": 0, "hedged": 0, "hedge_wins": 0, "failures": 0})
+            stats["requests"] += 1
+            stats["hedged"] += hedged
+            stats["hedge_wins"] += hedged and winner == route.hedge
+            stats["failures"] += winner is None and error is not None
+        self.log.write({
+            "ts": round(time.time(), 3),
+            "intent": route.intent,
+            "complexity": route.complexity,
+            "budget_ms": route.budget,
+            "model": route.model,
+            "hedged": hedged,
+            "winner": winner,
+            "first_token_ms": round(first_ms, 1) if first_ms is not None else None,  # from the winner's own launch
+            "answer_ms": round((first_at - started) * 1000, 1) if first_at is not None else None,
+            "total_ms": round(total_ms, 1),
+            "tokens": tokens,
+            "chars": chars,
+            "error": type(error).__name__ if error is not None else None,
+        })
+
+    def Stats(self):
+        with self.lock:
+            return {
+                "first_token_ms": {model: round(ms, 1) for model, ms in self.first_token.items()},
+                "probes": self.probes,
+                "models": {model: dict(counters) for model, counters in self.stats.items()},
+            }
+
+# Process-wide router shared by Chatbot, RealtimesearchEngine and Automation
+Router = ModelRouter(RoutingLogPath)
+
+# ========================== Report ==========================
+def SummariseRouting(records):
+    """ Quality/latency trade-off per (intent, answering model, complexity band). """
+    groups = {}
+    for record in records:
+        band = "high" if record["complexity"] >= ReportBand else "low"
+        key = (record["intent"], record["winner"] or record["model"], band)
+        groups.setdefault(key, []).append(record)
+    rows = []
+    for (intent, model, band), items in sorted(groups.items(), key=lambda item: tuple(map(str, item[0]))):
+        first = sorted(r["first_token_ms"] for r in items if r["first_token_ms"] is not None)
+        answered = [r for r in items if r["winner"] is not None]
+        rows.append({
+            "intent": intent, "model": model, "complexity": band, "n": len(items),
+            "first_p50": Percentile(first, 50), "first_p95": Percentile(first, 95),
+            "mean_chars": round(sum(r["chars"] for r in answered) / len(answered)) if answered else 0,
+            "hedged": round(sum(r["hedged"] for r in items) / len(items), 3),
+            "errors": sum(1 for r in items if r["error"]),
+        })
+    return rows
+
+# ========================== Recovery Check ==========================
+def SimulatedModels(first_ms):
+    """ open_stream stand-in: each model's first token after first_ms[model] ms, then a few more. """
+    def open_stream(model, stop):
+        if stop.wait(first_ms[model] / 1000):
+            return
+        for token in ("simulated ", "answer ", "tokens"):
+            yield token
+    return open_stream
+
+def CheckRecovery(slow_ms=1500, healthy_ms=300, small_ms=60, max_turns=40):
+    """ Drive a fresh router while 70B is slow, then after it recovers.
+    {"left": turns until general questions moved to 8B, "back": turns of
+    healthy 70B until they were routed there again without a probe (None if
+    never), "small_ms": 8B estimate, "stats"}. """
+    import tempfile
+    router = ModelRouter(os.path.join(tempfile.mkdtemp(), "Routing.jsonl"))
+
+    def turns_until(first_ms, model):
+        for turn in range(1, max_turns + 1):
+            probes = router.probes
+            route = router.Choose("general", "what is the capital of france")
+            for _ in router.Stream(route, SimulatedModels(first_ms)):
+                pass
+            if route.model == model and router.probes == probes:  # a probe is not a return to 70B
+                return turn
+        return None
+
+    left = turns_until({LargeModel: slow_ms, SmallModel: small_ms}, SmallModel)
+    back = turns_until({LargeModel: healthy_ms, SmallModel: small_ms}, LargeModel) if left else None
+    return {"left": left, "back": back, "small_ms": round(router.first_token[SmallModel], 1), "stats": router.Stats()}
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--check-recovery"]:
+        result = CheckRecovery()
+        print(f"70B slow: moved to 8B after {result['left']} turns; "
+              f"70B healthy: back on 70B after {result['back']} turns; 8B first token ~{result['small_ms']} ms")
+        print(result["stats"])
+        # 8B answers in ~60 ms of its own; the hedge delay must not be counted
+        sys.exit(0 if result["left"] and result["back"] and result["back"] <= ProbeEvery + 2
+                 and result["small_ms"] < FirstTokenGuess[SmallModel] else 1)
+    path = sys.argv[1] if len(sys.argv) > 1 else RoutingLogPath
+    rows = SummariseRouting(ReadSpans(path))
+    print(f"{'intent':<10}{'model':<26}{'band':<6}{'n':>6}{'first p50':>11}{'first p95':>11}{'chars':>8}{'hedged':>8}{'errors':>8}")
+    for row in rows:
+        print(f"{row['intent']:<10}{row['model']:<26}{row['complexity']:<6}{row['n']:>6}"
+              f"{row['first_p50'] or 0:>11.1f}{row['first_p95'] or 0:>11.1f}{row['mean_chars']:>8}{row['hedged']:>8}{row['errors']:>8}")
@@ -0,0 +1,343 @@
+"""
+Deep mode for realtime answers: the text of the top result pages.
+
+The pages are fetched concurrently by one pooled httpx.AsyncClient that runs
+on its own event loop thread. Each host gets at most PerHostConnections
+requests at a time, each body is read up to PageMaxBytes, and each page has
+PageDeadlineMs to finish. The whole stage stops after DeepSearchBudgetMs, and
+any page that is not ready by then keeps its snippet. HTML is parsed while it
+streams in, and reading stops once enough main text has been found. The
+paragraphs most relevant to the question are kept within PageTokenBudget.
+
+Extracted text is cached by URL. It is reused as-is for PageFreshMinutes and
+then revalidated with If-None-Match / If-Modified-Since, so an unchanged
+page costs a 304 instead of a download. Cache changes are kept in memory
+and written once per Fetch on a worker thread, never on the event loop.
+
+    texts = Pages.Fetch({"https://...": query, ...})  # url -> text, for the pages that made it
+"""
+
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.Tracing import Span  # Latency tracing
+from Backend.SnippetRanker import BM25, Tokens  # Paragraph relevance
+from Backend.Text import CountTokens  # Prompt token estimate
+from html.parser import HTMLParser  # Streaming HTML parsing
+from collections import OrderedDict  # LRU order
+from urllib.parse import urlsplit  # Host of a URL
+import concurrent.futures  # Waiting on the loop from a worker thread
+import threading  # Event loop thread / cache lock
+import asyncio  # Concurrent fetches
+import codecs  # Incremental decoding
+import json  # On-disk cache
+import time  # Budget / freshness
+import os  # Paths
+
+# ========================== Settings ==========================
+DeepSearchEnabled = env_vars.get("DeepSearch", "False") == "True"
+DeepSearchPages = int(env_vars.get("DeepSearchPages") or 3)  # top results whose pages are read
+DeepSearchBudgetMs = float(env_vars.get("DeepSearchBudgetMs") or 1500)  # whole stage
+PageDeadlineMs = float(env_vars.get("PageDeadlineMs") or 1200)  # one page
+PageMaxBytes = int(env_vars.get("PageMaxBytes") or 512 * 1024)
+PageTokenBudget = int(env_vars.get("PageTokenBudget") or 250)  # extracted text kept per page
+PerHostConnections = 2
+MaxConnections = 16
+ConnectTimeout = 1.0
+
+PageCachePath = env_vars.get("PageCachePath") or r"Data\PageCache.json"
+PageCacheSize = int(env_vars.get("PageCacheSize") or 300)
+PageFresh = float(env_vars.get("PageFreshMinutes") or 30) * 60  # served without asking the site
+PageKeep = float(env_vars.get("PageKeepHours") or 24) * 3600  # kept for revalidation
+
+UserAgent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+# ========================== Extraction ==========================
+SkippedTags = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "button", "select"}
+BlockTags = {"p", "div", "li", "h1", "h2", "h3", "h4", "td", "section", "article", "main", "br", "blockquote", "pre"}
+MainTags = {"article", "main"}
+MinParagraphChars = 40  # shorter blocks are menus, captions and buttons
+EnoughChars = 20000  # main text read before the rest of the page is skipped
+VoidTags = {"br", "img", "hr", "meta", "link", "input", "source", "wbr"}
+
+class MainText(HTMLParser):
+    """ Paragraphs of a page, fed chunk by chunk as it downloads.
+
+    Text inside navigation, scripts, forms and the like is ignored. When the
+    page marks its content with <article> or <main>, only that is kept.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skipping = 0  # depth inside SkippedTags
+        self.main = 0  # depth inside MainTags
+        self.current = []
+        self.paragraphs = []  # (inside main, text)
+        self.chars = 0
+
+    @property
+    def done(self):
+        return self.chars >= EnoughChars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VoidTags:
+            if tag == "br":
+                self._end_block()
+            return
+        if tag in SkippedTags:
+            self.skipping += 1
+        elif tag in BlockTags:
+            self._end_block()
+        if tag in MainTags:
+            self.main += 1
+
+    def handle_endtag(self, tag):
+        if tag in SkippedTags:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in BlockTags:
+            self._end_block()
+        if tag in MainTags:
+            self.main = max(0, self.main - 1)
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.current.append(data)
+
+    def _end_block(self):
+        text = " ".join("".join(self.current).split())
+        self.current = []
+        if len(text) >= MinParagraphChars:
+            self.paragraphs.append((self.main > 0, text))
+            self.chars += len(text)
+
+    def Paragraphs(self):
+        self._end_block()
+        inside = [text for main, text in self.paragraphs if main]
+        return inside or [text for _, text in self.paragraphs]
+
+def Relevant(query, paragraphs, budget=PageTokenBudget):
+    """ The paragraphs that best match query, in page order, within budget tokens. """
+    scores = BM25(Tokens(query), [Tokens(p) for p in paragraphs])
+    chosen, spent = set(), 0
+    for i in sorted(range(len(paragraphs)), key=lambda i: (-scores[i], i)):
+        cost = CountTokens(paragraphs[i])
+        if chosen and (scores[i] <= 0 or spent + cost > budget):
+            break
+        chosen.add(i)
+        spent += cost
+    text = " ".join(paragraphs[i] for i in sorted(chosen))
+    # A single long paragraph can still be over budget; cut it at a word boundary
+    limit = budget * 4
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " ..."
+
+# ========================== Page Cache ==========================
+class PageCache:
+    """ Extracted paragraphs by URL, with the validators needed to revalidate them. """
+
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        self.entries = OrderedDict()  # url -> {"paragraphs", "etag", "last_modified", "checked"}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # one writer of the file at a time
+        self.dirty = False  # changed since the last Save
+        self.Load()
+
+    def Get(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None or time.time() - entry["checked"] > PageKeep:
+                return None
+            self.entries.move_to_end(url)
+            return entry
+
+    def Put(self, url, paragraphs, etag=None, last_modified=None):
+        with self.lock:
+            self.entries[url] = {"paragraphs": paragraphs, "etag": etag,
+                                 "last_modified": last_modified, "checked": time.time()}
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def Touch(self, url):
+        """ The site confirmed the cached copy (304). """
+        with self.lock:
+            if url in self.entries:
+                self.entries[url]["checked"] = time.time()
+                self.dirty = True
+
+    def Clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.dirty = True
+        self.Save()
+
+    # ---------------------- Persistence ----------------------
+    def Load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        entries = [(url, entry) for url, entry in data.get("entries", []) if now - entry["checked"] <= PageKeep]
+        with self.lock:
+            self.entries = OrderedDict(entries[-self.capacity:])
+
+    def Save(self):
+        """ Write the cache if it changed since the last Save; replaced atomically.
+        Blocking file I/O, so keep it off the fetcher's event loop. """
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                entries = [(url, dict(entry)) for url, entry in self.entries.items()]
+                self.dirty = False
+            try:
+                folder = os.path.dirname(self.path)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                temp = self.path + ".tmp"
+                with open(temp, "w", encoding="utf-8") as f:
+                    json.dump({"entries": entries}, f)
+                os.replace(temp, self.path)
+            except OSError as e:
+                print(f"Page cache save failed: {e}")
+                with self.lock:
+                    self.dirty = True  # retried after the next Fetch
+
+# ========================== Page Fetcher ==========================
+class PageFetcher:
+    """ Pooled async page downloads, driven from the (threaded) rest of the app. """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.loop = None
+        self.client = None
+        self.hosts = {}  # host -> semaphore limiting its concurrent requests
+        self.stats = {"requests": 0, "fresh": 0, "revalidated": 0, "downloaded": 0, "truncated": 0,
+                      "timeouts": 0, "failures": 0, "degraded": 0}
+
+    # ---------------------- Event loop ----------------------
+    def Start(self):
+        """ Start the event loop thread and its client, once. """
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="page-fetch", daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self._open(), self.loop).result()
+        return self.loop
+
+    async def _open(self):
+        import httpx  # Pooled async HTTP client
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MaxConnections, max_keepalive_connections=MaxConnections),
+            timeout=httpx.Timeout(PageDeadlineMs / 1000, connect=ConnectTimeout),
+            headers={"User-Agent": UserAgent, "Accept": "text/html,application/xhtml+xml"},
+            follow_redirects=True,
+        )
+
+    def _host(self, url):
+        # Only touched from the loop thread
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(PerHostConnections)
+        return self.hosts[host]
+
+    # ---------------------- Fetching ----------------------
+    def Fetch(self, pages, budget_ms=DeepSearchBudgetMs):
+        """ {url: text relevant to its query} for the pages ({url: query}) read
+        within budget_ms; the others are left out, so their snippets are used instead. """
+        urls = [u for u in pages if u and u.startswith(("http://", "https://"))]
+        if not urls:
+            return {}
+        loop = self.Start()
+        with Span("search.pages", pages=len(urls)) as span:
+            future = asyncio.run_coroutine_threadsafe(self._fetch_all(urls, budget_ms / 1000), loop)
+            try:
+                read = future.result(budget_ms / 1000 + 0.25)  # the stage enforces the budget itself
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                read = {}
+            texts = {url: Relevant(pages[url], paragraphs) for url, paragraphs in read.items() if paragraphs}
+            span.fields.update(read=len(texts))
+        self._count("degraded", len(urls) - len(texts))
+        return texts
+
+    async def _fetch_all(self, urls, budget):
+        tasks = {asyncio.ensure_future(self._fetch_one(url)): url for url in urls}
+        done, pending = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            task.cancel()
+        pages = {}
+        for task in done:
+            if not task.cancelled() and task.exception() is None and task.result():
+                pages[tasks[task]] = task.result()
+        # One write for every Put / Touch of this Fetch, on a worker thread
+        asyncio.get_running_loop().run_in_executor(None, self.cache.Save)
+        return pages
+
+    async def _fetch_one(self, url):
+        cached = self.cache.Get(url)
+        if cached is not None and time.time() - cached["checked"] <= PageFresh:
+            self._count("fresh")
+            return cached["paragraphs"]
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+        try:
+            async with self._host(url):
+                return await asyncio.wait_for(self._download(url, headers, cached), PageDeadlineMs / 1000)
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+        except Exception as e:
+            self._count("failures")
+            print(f"Page fetch of {url} failed: {type(e).__name__}: {e}")
+        return None
+
+    async def _download(self, url, headers, cached):
+        self._count("requests")
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                self.cache.Touch(url)
+                self._count("revalidated")
+                return cached["paragraphs"]
+            kind = response.headers.get("content-type", "")
+            if response.status_code >= 400 or ("html" not in kind and kind):
+                return None
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+            parser = MainText()
+            read = 0
+            async for chunk in response.aiter_bytes():
+                read += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.done:
+                    break
+                if read >= PageMaxBytes:
+                    self._count("truncated")
+                    break
+            paragraphs = parser.Paragraphs()
+        if paragraphs:
+            self._count("downloaded")
+            self.cache.Put(url, paragraphs, response.headers.get("etag"), response.headers.get("last-modified"))
+        return paragraphs
+
+    # ---------------------- Metrics ----------------------
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def Stats(self):
+        with self.lock:
+            return dict(self.stats, cached_pages=len(self.cache.entries))
+
+# Process-wide fetcher used by RealtimesearchEngine.GoogleSearch in deep mode
+Pages = PageFetcher(PageCache(PageCachePath, PageCacheSize))
+
+def WarmUp():
+    if DeepSearchEnabled:
+        Pages.Start()  # event loop and client ready before the first realtime question
@@ -1,43 +1,145 @@
-from googlesearch import search
-from groq import Groq
-from json import load, dump
 import datetime
-from dotenv import dotenv_values
+import re
+from concurrent.futures import ThreadPoolExecutor
+from Backend.Config import env_vars
+from Backend.Tracing import Span, Bind
+from Backend.ChatStore import Store
+from Backend.ContextWindow import Context, FitMessages
+from Backend.LLMClient import Clients
+from Backend.SingleFlight import Flights, Key
+from Backend.DecisionCache import NormaliseQuery
+from Backend.ModelRouter import Router
+from Backend.SearchCache import Searches
+from Backend.SnippetRanker import Compress, SnippetTokenBudget
+from Backend.PageFetcher import Pages, DeepSearchEnabled, DeepSearchPages
+from Backend.KnowledgeStore import Knowledge
 
-# Load environment variables
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
-GroqAPIKey = env_vars.get("GroqAPIKey")
 
-# Initialize Groq client
-client = Groq(api_key=GroqAPIKey)
+# Searches for the topics of one question run on this pool, so several
+# topics cost one search round trip
+SearchWorkers = int(env_vars.get("SearchWorkers") or 4)
+SearchPool = ThreadPoolExecutor(max_workers=SearchWorkers, thread_name_prefix="search")
+
+# Search results are the grounding here, so the chat history gets a smaller
+# share of the prompt than in general chat
+RealtimeHistoryTokens = int(env_vars.get("RealtimeHistoryTokens") or 1200)
 
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which has real-time up-to-date information from the internet.
 *** Provide Answers In a Professional Way, make sure to add full stops, commas, question marks, and use proper grammar.***
 *** Just answer the question from the provided data in a professional way. ***"""
 
-# Initialize chat log
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-except FileNotFoundError:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
-    
-
 # System instructions placeholder
 
 
-# Function to perform Google search
-def GoogleSearch(query):
-    results = list(search(query, advanced=True, num_results=5))
-    Answer = f"The search results for '{query}' are:\n[start]\n"
-    for i in results:
-        Answer += f"Title: {i.title}\nDescription: {i.description}\n\n"
+# Function to fetch Google results; identical searches already running share that request
+def FetchResults(query):
+    from googlesearch import search
+    def fetch():
+        with Span("google_search"):
+            return [{"url": i.url, "title": i.title, "description": i.description}
+                    for i in search(query, advanced=True, num_results=5)]
+    return Flights.Do("search", NormaliseQuery(query), fetch)
+
+# Function to get results for one query; related questions already answered from
+# fresh results are grounded locally, and repeated searches are served from the
+# search cache (with the time they were really fetched, so the store ages them right)
+def SearchResultsFor(query):
+    return Knowledge.Get(query, lambda: Searches.Lookup(query, lambda: FetchResults(query)))
+
+# Function to split a realtime question into independently searchable topics
+TopicSplit = re.compile(r"\s*(?:,|;|\band also\b|\band\b)\s*")
+QuestionStarts = ("who", "what", "when", "where", "which", "why", "how", "tell", "is", "are", "latest", "current")
+
+def SplitSubQueries(prompt):
+    """ ["who is x", "what is today's news"] for "who is x and what is today's news";
+    the prompt itself unless every part reads like a question of its own. """
+    parts = [part for part in TopicSplit.split(prompt.strip().rstrip("?.!")) if part]
+    if len(parts) > 1 and all(part.split()[0].lower() in QuestionStarts and len(part.split()) >= 2 for part in parts):
+        return parts
+    return [prompt]
+
+# Function to merge the results of several topics, dropping repeated pages
+def PageKey(url):
+    url = re.sub(r"^https?://(www\.)?", "", (url or "").lower())
+    return url.split("#")[0].rstrip("/")
+
+def MergeResults(groups):
+    """ [(query, results)] -> [(query, results)] with each page kept once, under its first topic. """
+    seen_urls, seen_titles, merged = set(), set(), []
+    for query, results in groups:
+        kept = []
+        for result in results:
+            url, title = PageKey(result.get("url")), NormaliseQuery(result.get("title") or "")
+            if (url and url in seen_urls) or (title and title in seen_titles):
+                continue
+            seen_urls.add(url)
+            seen_titles.add(title)
+            kept.append(result)
+        merged.append((query, kept))
+    return merged
+
+def FormatResults(groups):
+    Answer = f"The search results for {', '.join(repr(query) for query, _ in groups)} are:\n[start]\n"
+    for query, results in groups:
+        if len(groups) > 1:
+            Answer += f"Results for '{query}':\n"
+        for i in results:
+            Answer += f"Title: {i['title']}\nDescription: {i['description']}\n"
+            if i.get("content"):
+                Answer += f"Content: {i['content']}\n"
+            Answer += "\n"
     Answer += "[end]"
     return Answer
 
+# Function to keep the most relevant, distinct snippets of each topic within the token budget
+def CompressResults(groups):
+    budget = SnippetTokenBudget // max(1, len(groups))
+    with Span("search.compress") as span:
+        compressed = [(query, Compress(query, results, budget)) for query, results in groups]
+        span.fields.update(results=sum(len(r) for _, r in groups), kept=sum(len(r) for _, r in compressed))
+    return compressed
+
+# Function to add the text of the top pages (deep mode); slow pages keep just their snippet
+def AddPageText(groups):
+    """ groups with a "content" field on the top DeepSearchPages results,
+    taken in turn from each topic. """
+    chosen = []  # (url, the topic it answers)
+    for rank in range(DeepSearchPages):
+        for query, results in groups:
+            if rank < len(results):
+                chosen.append((results[rank].get("url"), query))
+    pages = dict(chosen[:DeepSearchPages])
+    texts = Pages.Fetch(pages)
+    for query in set(pages.values()):
+        Knowledge.RecordPages(query, {url: text for url, text in texts.items() if pages[url] == query})
+    return [(query, [dict(r, content=texts[r.get("url")]) if r.get("url") in texts else r for r in results])
+            for query, results in groups]
+
+# Function to perform Google search for one or more topics
+def GoogleSearch(query, SubQueries=None, Deep=None):
+    """ One merged context block for query; each of SubQueries (default: the
+    topics found in query) is searched concurrently on SearchPool. With Deep
+    (default: the DeepSearch setting) the top pages are read as well. """
+    queries = SubQueries or SplitSubQueries(query)
+    deep = DeepSearchEnabled if Deep is None else Deep
+    if len(queries) == 1:
+        groups = CompressResults([(queries[0], SearchResultsFor(queries[0]))])
+        return FormatResults(AddPageText(groups) if deep else groups)
+    with Span("search.fanout", topics=len(queries)):
+        futures = [SearchPool.submit(Bind(SearchResultsFor), q) for q in queries]
+        groups = []
+        for q, future in zip(queries, futures):
+            try:
+                groups.append((q, future.result()))
+            except Exception as e:
+                print(f"Search for '{q}' failed: {e}")  # answer from the other topics
+        if not groups:
+            raise RuntimeError("every search failed")
+    groups = CompressResults(MergeResults(groups))
+    return FormatResults(AddPageText(groups) if deep else groups)
+
 # Function to clean up the answer
 def AnswerModifier(Answer):
     lines = Answer.split('\n')
@@ -71,49 +173,72 @@ def Information():
     data += f"Time: {hour} hours, {minute} minutes, {second} seconds.\n"
     return data
 
-# Main function to handle real-time search and AI responses
-def RealtimeSearchEngine(prompt):
-    global SystemChatBot, messages
-    # Load chat log
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-    
+# Streaming function to handle real-time search and AI responses
+def RealtimeSearchStream(prompt, SearchResults=None, SubQueries=None, Deep=None):
+    """ Yield answer tokens as they arrive; the finished answer is saved to
+    the chat log. SearchResults may carry GoogleSearch(prompt) output fetched
+    ahead of time; SubQueries are the separately searched topics of prompt;
+    Deep reads the top pages too (see GoogleSearch).
+    Nothing module-level is modified, so several answers can stream at once. """
+    # Load the budgeted chat history (summary + recent turns)
+    messages = Context.Messages("llama-3.3-70b-versatile", budget=RealtimeHistoryTokens, query=prompt)
+
     # Append user prompt
     messages.append({"role": "user", "content": prompt})
 
-    # Add Google search results to system messages
-    SystemChatBot.append({"role": "system", "content": GoogleSearch(prompt)})
-
-    # Generate response using Groq
-    completion = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=SystemChatBot + [{"role": "system", "content": Information()}] + messages,
-        temperature=0.7,
-        max_tokens=2048,
-        top_p=1,
-        stream=True,
-        stop=None
-    )
-
-    # Collect streamed response
-    Answer = ""
-    for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content
-
-    # Clean up response
-    Answer = Answer.strip().replace("</s>", "")
-    messages.append({"role": "assistant", "content": Answer})
-
-    # Save updated chat log
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump(messages, f, indent=4)
-
-    # Remove the most recent system message to avoid duplication
-    SystemChatBot.pop()
-
-    # Return formatted answer
-    return AnswerModifier(Answer)
+    # Add Google search results to this request's system messages only, so
+    # several answers can stream at once
+    if SearchResults is None:
+        SearchResults = GoogleSearch(prompt, SubQueries, Deep)
+    SystemMessages = SystemChatBot + [{"role": "system", "content": SearchResults}]
+
+    # Generate response using Groq on the routed model; an identical request
+    # already streaming is shared, and its answer is saved once
+    def complete(model, stop):
+        with Span("groq.realtime", model=model) as span:
+            completion = Clients.Stream(
+                "groq", Clients.Groq().chat.completions.create,
+                model=model,
+                messages=SystemMessages + [{"role": "system", "content": Information()}] + FitMessages(messages, model),
+                temperature=0.7,
+                max_tokens=2048,
+                top_p=1,
+                stream=True,
+                stop=None
+            )
+            for chunk in completion:
+                if stop.is_set():
+                    return
+                if chunk.choices[0].delta.content:
+                    span.mark("first_token")
+                    yield chunk.choices[0].delta.content
+
+    def produce(cancel):
+        # Pass tokens on while collecting the full answer
+        Answer = ""
+        for token in Router.Stream(Router.Choose("realtime", prompt, has_context=True), complete, cancel):
+            Answer += token
+            yield token
+        if cancel.is_set():
+            return  # every reader has gone; nothing is saved
+
+        # Clean up response
+        Answer = Answer.strip().replace("</s>", "")
+
+        # Append the prompt and answer to the chat log
+        Store.AppendMany([
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": Answer}
+        ])
+        Context.Refresh()
+
+    yield from Flights.Stream("groq.realtime", Key("realtime", messages, SearchResults), produce)
+
+# Main function to handle real-time search and AI responses
+def RealtimeSearchEngine(prompt, SearchResults=None, SubQueries=None, Deep=None):
+    """ Complete, formatted answer; see RealtimeSearchStream. """
+    Answer = "".join(RealtimeSearchStream(prompt, SearchResults, SubQueries, Deep))
+    return AnswerModifier(Answer.strip().replace("</s>", ""))
 
 # Main program loop
 if __name__ == "__main__":
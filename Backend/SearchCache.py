@@ -0,0 +1,163 @@
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.DecisionCache import NormaliseQuery  # Shared query normalisation
+from Backend.Tracing import Span, Bind  # Latency tracing / background refresh context
+from collections import OrderedDict  # LRU order
+import threading  # Cache lock / background refresh
+import json  # On-disk format
+import time  # TTL
+import os  # Paths
+
+# ========================== Settings ==========================
+SearchCacheEnabled = env_vars.get("SearchCache", "True") == "True"
+SearchCachePath = env_vars.get("SearchCachePath") or r"Data\SearchCache.json"
+SearchCacheSize = int(env_vars.get("SearchCacheSize") or 500)
+SearchStaleFor = float(env_vars.get("SearchStaleHours") or 24) * 3600  # past the TTL, served while refreshing
+
+# Query class -> (words that select it, TTL in seconds); first match wins
+QueryClasses = [
+    ("news", {"news", "headline", "headlines", "today", "today's", "latest", "live", "score", "scores",
+              "weather", "price", "stock", "now", "current", "currently", "recent", "update"},
+     float(env_vars.get("SearchTTLNewsMinutes") or 10) * 60),
+    ("entity", {"who", "who's", "ceo", "president", "minister", "founder", "owner", "biography"},
+     float(env_vars.get("SearchTTLEntityHours") or 12) * 3600),
+]
+DefaultTTL = float(env_vars.get("SearchTTLHours") or 2) * 3600
+
+# Selectors are compared with normalised queries, so they are normalised the
+# same way ("today's" -> "todays")
+QueryClasses = [(name, {NormaliseQuery(word) for word in selectors}, ttl) for name, selectors, ttl in QueryClasses]
+
+def QueryClass(query):
+    """ (class name, TTL seconds) for a normalised query. """
+    words = set(query.split())
+    for name, selectors, ttl in QueryClasses:
+        if words & selectors:
+            return name, ttl
+    return "default", DefaultTTL
+
+# ========================== Search Cache ==========================
+class SearchCache:
+    """ googlesearch results by normalised query, persisted to a JSON file.
+
+    Fresh entries are returned as they are. An entry past its class TTL but
+    within SearchStaleFor is still returned at once, and a background
+    refresh replaces it for the next caller. The least recently used entry
+    is dropped when the cache is full.
+    """
+
+    def __init__(self, path, capacity, stale_for, clock=time.time):
+        self.path = path
+        self.capacity = capacity
+        self.stale_for = stale_for
+        self.clock = clock  # replaced when replaying fixtures
+        self.entries = OrderedDict()  # key -> (stored at, results); oldest first
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.stats = {"fresh": 0, "stale": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0, "evictions": 0}
+        self.Load()
+
+    # ---------------------- Lookup ----------------------
+    def Get(self, query, fetch):
+        """ Results for query; fetch() (a list of {"url", "title", "description"})
+        is called on a miss, or in the background for a stale entry. """
+        return self.Lookup(query, fetch)[0]
+
+    def Lookup(self, query, fetch):
+        """ (results, time they were fetched) for query, as Get. A stale entry
+        keeps its original time, so callers that store the results can tell. """
+        if not SearchCacheEnabled:
+            return fetch(), self.clock()
+        key = NormaliseQuery(query)
+        kind, ttl = QueryClass(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            age = self.clock() - entry[0] if entry is not None else None
+            if entry is not None and age <= ttl + self.stale_for:
+                self.entries.move_to_end(key)
+                state = "fresh" if age <= ttl else "stale"
+                self.stats[state] += 1
+            else:
+                state = "miss"
+                self.stats["misses"] += 1
+        with Span("search_cache", state=state, kind=kind):
+            if state == "stale":
+                self._refresh_later(key, fetch)
+            if state != "miss":
+                return list(entry[1]), entry[0]
+        results = fetch()
+        return results, self.Put(key, results)
+
+    def Put(self, key, results):
+        """ Store results for key; returns the time they are stored at. """
+        stored = self.clock()
+        if not results:
+            return stored  # an empty page is more likely a blocked request than an answer
+        with self.lock:
+            self.entries[key] = (stored, list(results))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._save()
+        return stored
+
+    def _refresh_later(self, key, fetch):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                self.Put(key, fetch())
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_failures")
+                print(f"Search refresh for '{key}' failed: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+        threading.Thread(target=Bind(refresh), name="search-refresh", daemon=True).start()
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def Clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._save()
+
+    def Stats(self):
+        with self.lock:
+            lookups = self.stats["fresh"] + self.stats["stale"] + self.stats["misses"]
+            served = self.stats["fresh"] + self.stats["stale"]
+            return dict(self.stats, size=len(self.entries),
+                        hit_rate=round(served / lookups, 3) if lookups else 0.0)
+
+    # ---------------------- Persistence ----------------------
+    def Load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = self.clock()
+        entries = [(key, (stored, results)) for key, stored, results in data.get("entries", [])
+                   if now - stored <= QueryClass(key)[1] + self.stale_for]
+        with self.lock:
+            self.entries = OrderedDict(entries[-self.capacity:])
+
+    def _save(self):
+        # Called with the lock held; replaced atomically
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"entries": [[key, stored, results] for key, (stored, results) in self.entries.items()]}, f)
+        os.replace(temp, self.path)
+
+# Process-wide cache used by RealtimesearchEngine.GoogleSearch
+Searches = SearchCache(SearchCachePath, SearchCacheSize, SearchStaleFor)
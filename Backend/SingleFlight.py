@@ -0,0 +1,143 @@
+"""
+Single-flight de-duplication of identical in-flight upstream requests.
+
+When speculative work, typed input and voice input overlap, the same DMM
+query, Google search or Groq completion can be requested several times at
+once. Callers that ask for a key already in flight join the running call
+instead of starting another one:
+
+    decision = Flights.Do("dmm", NormaliseQuery(prompt), lambda: Decide(prompt))
+    for token in Flights.Stream("groq.chat", Key(model, messages), produce):
+        ...
+
+Only concurrent calls are merged; a finished call is forgotten at once, so
+nothing here is a cache.
+"""
+
+# ========================== Imports ==========================
+from collections import OrderedDict  # Bounded per-key counters
+from concurrent.futures import Future  # Shared result of a call
+from Backend.Streaming import AnswerStream  # Shared token stream
+from Backend.Tracing import Bind  # Keep upstream spans on the leader's turn
+import threading  # Flight table lock / stream pumps
+import hashlib  # Request keys
+import json  # Request keys
+
+SharedKeyLimit = 128  # keys remembered in the per-key metrics
+
+def Key(*parts):
+    """ Stable key for a request made of JSON-serialisable parts (model, messages, ...). """
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+# ========================== Single Flight ==========================
+class StreamFlight:
+    """ One upstream token stream and the callers reading it. """
+
+    def __init__(self):
+        self.stream = AnswerStream()
+        self.cancel = threading.Event()  # set once every reader has left early
+        self.readers = 0
+
+class SingleFlight:
+    """ Table of in-flight calls, grouped by kind ("dmm", "search", "groq.chat", ...). """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # (kind, key) -> Future
+        self.streams = {}  # (kind, key) -> StreamFlight
+        self.stats = {}  # kind -> counters
+        self.shared_keys = OrderedDict()  # (kind, key) -> times joined, most recent last
+
+    def _count(self, kind, joined, key):
+        # Called with the lock held
+        stats = self.stats.setdefault(kind, {"calls": 0, "upstream": 0, "shared": 0})
+        stats["calls"] += 1
+        if joined:
+            stats["shared"] += 1
+            self.shared_keys[(kind, key)] = self.shared_keys.pop((kind, key), 0) + 1
+            while len(self.shared_keys) > SharedKeyLimit:
+                self.shared_keys.popitem(last=False)
+        else:
+            stats["upstream"] += 1
+
+    # ---------------------- Calls ----------------------
+    def Do(self, kind, key, function):
+        """ function()'s result, shared with any identical call already running.
+        Errors are shared too: every waiting caller gets the leader's exception. """
+        with self.lock:
+            future = self.calls.get((kind, key))
+            leader = future is None
+            if leader:
+                future = self.calls[(kind, key)] = Future()
+            self._count(kind, not leader, key)
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(function())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.calls[(kind, key)]
+        return future.result()
+
+    # ---------------------- Streams ----------------------
+    def Stream(self, kind, key, producer):
+        """ Iterate producer(cancel)'s tokens, shared with identical streams in flight.
+
+        The first caller starts producer on its own thread; everyone, the
+        first caller included, reads the same AnswerStream from the start.
+        If every reader stops early, cancel is set so the producer can stop.
+        """
+        with self.lock:
+            flight = self.streams.get((kind, key))
+            leader = flight is None
+            if leader:
+                flight = self.streams[(kind, key)] = StreamFlight()
+            flight.readers += 1
+            self._count(kind, not leader, key)
+        if leader:
+            threading.Thread(target=Bind(self._pump), args=(kind, key, flight, producer),
+                             name=f"flight-{kind}", daemon=True).start()
+        try:
+            yield from flight.stream
+        finally:
+            with self.lock:
+                flight.readers -= 1
+                if flight.readers == 0 and not flight.stream.done:
+                    flight.cancel.set()
+                    self._forget(kind, key, flight)  # later callers start a fresh stream
+
+    def _pump(self, kind, key, flight, producer):
+        try:
+            for token in producer(flight.cancel):
+                flight.stream.Put(token)
+        except Exception as e:
+            flight.stream.Close(e)
+        else:
+            flight.stream.Close()
+        finally:
+            with self.lock:
+                self._forget(kind, key, flight)
+
+    def _forget(self, kind, key, flight):
+        # Called with the lock held; a newer flight for the key may have replaced this one
+        if self.streams.get((kind, key)) is flight:
+            del self.streams[(kind, key)]
+
+    # ---------------------- Metrics ----------------------
+    def Stats(self):
+        """ Per-kind counters, in-flight counts and the most often shared keys. """
+        with self.lock:
+            stats = {kind: dict(counters) for kind, counters in self.stats.items()}
+            for kind, _ in list(self.calls) + list(self.streams):
+                stats.setdefault(kind, {"calls": 0, "upstream": 0, "shared": 0})
+                stats[kind]["in_flight"] = stats[kind].get("in_flight", 0) + 1
+            top = sorted(self.shared_keys.items(), key=lambda item: item[1], reverse=True)[:10]
+        for counters in stats.values():
+            counters["share_rate"] = round(counters["shared"] / counters["calls"], 3) if counters["calls"] else 0.0
+        stats["top_shared"] = [(kind, key[:12], count) for (kind, key), count in top]
+        return stats
+
+# Process-wide flight table shared by Model, Chatbot and RealtimesearchEngine
+Flights = SingleFlight()
@@ -0,0 +1,165 @@
+"""
+Re-ranking and compression of search snippets before they are prompted.
+
+Snippets are scored against the query with BM25 (statistics taken over the
+result set itself) plus a prior for Google's original rank and the site's
+authority, near-duplicates are dropped with MinHash over word shingles of
+the descriptions, and the best ones are kept until a token budget is spent.
+
+Check it offline on recorded result sets:
+    python -m Backend.SnippetRanker [Benchmark\\SearchResults.json]
+Exits 1 when a recorded set's "expect" (best title, dropped titles) is not met.
+"""
+
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+from Backend.Text import StopWords, TokenPattern, CountTokens  # Shared tokenising / token estimate
+from collections import Counter  # Term frequencies
+from urllib.parse import urlsplit  # Site of a result
+import numpy as np  # MinHash signatures
+import json  # Recorded result sets
+import math  # BM25 idf
+import zlib  # Stable shingle hashing
+import sys  # CLI arguments
+import os  # Default paths
+
+# ========================== Settings ==========================
+SnippetTokenBudget = int(env_vars.get("SnippetTokenBudget") or 600)  # for all topics of one question
+MaxSnippetChars = 400  # longer descriptions are cut at a word boundary
+K1, B = 1.5, 0.75  # BM25 parameters
+NearDuplicate = 0.6  # estimated Jaccard similarity at which a snippet is dropped
+ShingleSize = 2  # words per shingle
+NumHashes = 64
+
+# Added to the BM25 score scaled to 0..1; BM25 alone favours short pages that
+# repeat the query (social profiles) over the reference page Google ranked first
+RankPrior = 0.3  # times 1/(1 + Google's rank)
+SitePriors = {
+    "wikipedia.org": 0.3, "britannica.com": 0.2,
+    "instagram.com": -0.3, "facebook.com": -0.3, "twitter.com": -0.3, "x.com": -0.3,
+    "pinterest.com": -0.3, "tiktok.com": -0.3, "linkedin.com": -0.2,
+}
+
+# ========================== Scoring ==========================
+def Tokens(text):
+    return [w for w in TokenPattern.findall(text.lower()) if w not in StopWords]
+
+def SitePrior(url):
+    """ Authority bonus (or profile-page penalty) for the site of url. """
+    host = (urlsplit(url or "").hostname or "").lower()
+    for site, prior in SitePriors.items():
+        if host == site or host.endswith("." + site):
+            return prior
+    return 0.0
+
+def BM25(query, documents):
+    """ BM25 score of each tokenised document for the tokenised query. """
+    if not documents:
+        return []
+    lengths = [len(doc) for doc in documents]
+    average = sum(lengths) / len(documents) or 1.0
+    frequencies = [Counter(doc) for doc in documents]
+    scores = []
+    for counts, length in zip(frequencies, lengths):
+        score = 0.0
+        for term in set(query):
+            tf = counts.get(term, 0)
+            if not tf:
+                continue
+            df = sum(1 for other in frequencies if term in other)
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+        scores.append(score)
+    return scores
+
+# ========================== Near-duplicates ==========================
+Prime = (1 << 61) - 1
+_random = np.random.RandomState(1)  # fixed seeds so signatures are stable
+HashA = _random.randint(1, 1 << 31, NumHashes).astype(np.uint64)
+HashB = _random.randint(0, 1 << 31, NumHashes).astype(np.uint64)
+
+def MinHash(tokens):
+    """ NumHashes-long signature of the word shingles of tokens. """
+    shingles = {" ".join(tokens[i:i + ShingleSize]) for i in range(max(1, len(tokens) - ShingleSize + 1))}
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+    return ((HashA[:, None] * hashes[None, :] + HashB[:, None]) % Prime).min(axis=1)
+
+def Similarity(a, b):
+    """ Estimated Jaccard similarity of two MinHash signatures. """
+    return float(np.mean(a == b))
+
+# ========================== Compression ==========================
+def Shorten(text, limit=MaxSnippetChars):
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " ..."
+
+def Compress(query, results, budget=SnippetTokenBudget):
+    """ results ranked by BM25 against query plus the rank and site priors,
+    with near-duplicates and results sharing no word with the query dropped,
+    cut to about budget tokens. The best result is always kept. """
+    texts = [f"{r.get('title') or ''} {r.get('description') or ''}" for r in results]
+    documents = [Tokens(text) for text in texts]
+    scores = BM25(Tokens(query), documents)
+    top = max(scores, default=0.0) or 1.0
+    relevance = [score / top + RankPrior / (1 + i) + SitePrior(r.get("url"))
+                 for i, (score, r) in enumerate(zip(scores, results))]
+    # Zero-score results go last; within a near-duplicate group the best ranked copy is kept
+    order = sorted(range(len(results)), key=lambda i: (scores[i] <= 0, -relevance[i], i))
+    kept, signatures, spent = [], [], 0
+    for i in order:
+        if kept and scores[i] <= 0:
+            break  # shares no word with the query
+        # Compared on the description alone: mirrors of a page differ mostly in the title's site name
+        signature = MinHash(Tokens(results[i].get("description") or "") or documents[i])
+        if any(Similarity(signature, other) >= NearDuplicate for other in signatures):
+            continue
+        result = dict(results[i], description=Shorten(results[i].get("description") or ""))
+        cost = CountTokens(f"Title: {result.get('title')}\nDescription: {result['description']}\n\n")
+        if kept and spent + cost > budget:
+            break
+        kept.append(result)
+        signatures.append(signature)
+        spent += cost
+    return kept
+
+# ========================== Offline Check ==========================
+DefaultFixtures = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Benchmark", "SearchResults.json")
+
+def Report(recorded, budget=SnippetTokenBudget):
+    """ Per recorded query: tokens before/after and the kept titles, best first. """
+    rows = []
+    for item in recorded:
+        before = sum(CountTokens(f"Title: {r['title']}\nDescription: {r['description']}\n\n") for r in item["results"])
+        kept = Compress(item["query"], item["results"], budget)
+        after = sum(CountTokens(f"Title: {r['title']}\nDescription: {r['description']}\n\n") for r in kept)
+        rows.append({"query": item["query"], "results": len(item["results"]), "kept": len(kept),
+                     "tokens_before": before, "tokens_after": after, "titles": [r["title"] for r in kept],
+                     "problems": Unmet(item.get("expect") or {}, [r["title"] for r in kept])})
+    return rows
+
+def Unmet(expect, titles):
+    """ Expectations of a recorded set that the kept titles do not meet. """
+    problems = []
+    if expect.get("first") and (not titles or titles[0] != expect["first"]):
+        problems.append(f"expected {expect['first']!r} first, got {titles[0] if titles else None!r}")
+    for title in expect.get("dropped", []):
+        if title in titles:
+            problems.append(f"expected {title!r} to be dropped")
+    for title in expect.get("kept", []):
+        if title not in titles:
+            problems.append(f"expected {title!r} to be kept")
+    return problems
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DefaultFixtures
+    with open(path, "r", encoding="utf-8") as f:
+        recorded = json.load(f)
+    rows = Report(recorded)
+    for row in rows:
+        print(f"{row['query']!r}: {row['kept']}/{row['results']} results, {row['tokens_before']} -> {row['tokens_after']} tokens")
+        for title in row["titles"]:
+            print(f"    {title}")
+        for problem in row["problems"]:
+            print(f"    FAIL {problem}")
+    sys.exit(1 if any(row["problems"] for row in rows) else 0)
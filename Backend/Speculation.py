@@ -0,0 +1,107 @@
+# ========================== Imports ==========================
+from concurrent.futures import ThreadPoolExecutor  # Background speculative work
+import threading  # Cancellation events
+
+from Backend.Chatbot import ChatBotStream, ChatBotRetryStream
+from Backend.Streaming import StartStream, AnswerStream, WithFallback, FallbackAnswer
+from Backend.AnswerCache import Answers
+from Backend.RealtimesearchEngine import GoogleSearch
+from Backend.Tracing import Bind
+from Backend.ContextWindow import Context
+from Backend.DecisionCache import NormaliseQuery  # Same keys as the decision, search and single-flight caches
+
+# ========================== Intent Prediction ==========================
+# Queries starting with these never go to ChatBot/RealtimeSearchEngine alone,
+# so there is nothing worth speculating on.
+TaskPrefixes = [
+    "open", "close", "play", "generate image", "system", "content",
+    "google search", "youtube search", "remind", "set a reminder", "bye", "exit",
+    "mute", "unmute", "volume"
+]
+
+# Words that usually make the DMM answer 'realtime' instead of 'general'.
+RealtimeHints = [
+    "news", "today", "today's", "latest", "recent", "current", "currently", "now",
+    "who is", "who's", "price", "weather", "score", "headline", "headlines",
+    "update", "stock", "prime minister", "president", "ceo", "net worth", "networth"
+]
+
+# Questions about time are answered by ChatBot from RealtimeInformation().
+GeneralOverrides = ["time", "date", "day", "month", "year"]
+
+# Compared with normalised queries, so normalised the same way ("today's" -> "todays")
+TaskPrefixes = [NormaliseQuery(prefix) for prefix in TaskPrefixes]
+RealtimeHints = [NormaliseQuery(hint) for hint in RealtimeHints]
+
+# Speculative searches; general answers stream on Backend.Streaming's pool.
+# Two workers so a new turn never queues behind a search that is still draining.
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculation")
+
+def PredictIntent(Query):
+    """ Cheap guess of the DMM decision: 'general', 'realtime' or None. """
+    q = NormaliseQuery(Query)
+    if not q or any(q.startswith(prefix) for prefix in TaskPrefixes):
+        return None
+    if " and " in q:
+        return None  # compound requests usually split into several intents
+    words = q.split()
+    if any(hint in q for hint in RealtimeHints if " " in hint) or any(hint in words for hint in RealtimeHints):
+        if any(word in words for word in GeneralOverrides) and "news" not in words:
+            return "general"
+        return "realtime"
+    return "general"
+
+# ========================== Speculative Turn ==========================
+class SpeculativeTurn:
+    """ Starts the likely answer path for a prompt while the DMM decides.
+
+    general  -> the cached answer, or ChatBotStream over the current chat
+                log into an AnswerStream (nothing is saved)
+    realtime -> GoogleSearch(prompt)
+
+    Commit() hands the stream / search results over when the decision
+    matches the guess; anything else cancels the work.
+    """
+
+    def __init__(self, Prompt):
+        self.Prompt = Prompt
+        self.Intent = PredictIntent(Prompt)
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.stream = None
+        # Bind keeps the speculative spans on the current turn
+        if self.Intent == "general":
+            Cached = Answers.Get(Prompt)
+            self.stream = AnswerStream.FromText(Cached) if Cached is not None else StartStream(self._general)
+        elif self.Intent == "realtime":
+            self.future = executor.submit(Bind(GoogleSearch), Prompt)
+
+    def _general(self):
+        messages = Context.Messages(query=self.Prompt)
+        messages.append({"role": "user", "content": self.Prompt})
+        yield from WithFallback(ChatBotStream(messages, cancel=self.cancel_event),
+                                retry=lambda: ChatBotRetryStream(self.Prompt), fallback=FallbackAnswer)
+
+    def Matches(self, Intent, Prompt):
+        return ((self.future is not None or self.stream is not None) and Intent == self.Intent
+                and NormaliseQuery(Prompt) == NormaliseQuery(self.Prompt))
+
+    def Commit(self, Intent, Prompt):
+        """ Result of the speculative work if it answers (Intent, Prompt), else None. """
+        if self.future is None and self.stream is None:
+            return None
+        if not self.Matches(Intent, Prompt):
+            self.Cancel()
+            return None
+        if self.stream is not None:
+            return self.stream  # still streaming; the caller reads it as it arrives
+        try:
+            return self.future.result()
+        except Exception as e:
+            print(f"Speculative {self.Intent} failed: {e}")
+            return None
+
+    def Cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
@@ -1,14 +1,10 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from dotenv import dotenv_values
+from Backend.Config import env_vars
+from Backend.StateBus import Bus
+from Backend.Tracing import Span
+import threading
 import os
 import mtranslate as mt
 
-# Load environment variables from the .env file.
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
 # Get the input language setting from the environment variables.
 InputLanguage = env_vars.get("InputLanguage")
 
@@ -62,25 +58,43 @@ current_dir = os.getcwd()
 # Generate the file path for the HTML file.
 Link = f"{current_dir}/Data/Voice.html"
 
-# Set Chrome options for the WebDriver.
-chrome_options = Options()
-user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; X64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
-chrome_options.add_argument(f'user-agent={user_agent}')
-chrome_options.add_argument("--use-fake-ui-for-media-stream")
-chrome_options.add_argument("--use-fake-device-for-media-stream")
-chrome_options.add_argument("--headless=new")
-
-# Initialize the Chrome WebDriver using ChromeDriverManager.
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
+# The Chrome WebDriver is started on first use (or by WarmUp in the background)
+# so importing this module does not launch a browser.
+driver = None
+driver_lock = threading.Lock()
+
+def GetDriver():
+    global driver
+    with driver_lock:
+        if driver is None:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            from selenium.webdriver.chrome.options import Options
+            from webdriver_manager.chrome import ChromeDriverManager
+
+            # Set Chrome options for the WebDriver.
+            chrome_options = Options()
+            user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; X64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
+            chrome_options.add_argument(f'user-agent={user_agent}')
+            chrome_options.add_argument("--use-fake-ui-for-media-stream")
+            chrome_options.add_argument("--use-fake-device-for-media-stream")
+            chrome_options.add_argument("--headless=new")
+
+            # Initialize the Chrome WebDriver using ChromeDriverManager.
+            service = Service(ChromeDriverManager().install())
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+    return driver
+
+# Start Chrome ahead of the first recognition.
+def WarmUp():
+    GetDriver()
 
 # Define the path for temporary files.
 TempDirPath = rf"{current_dir}/Frontend/Files"
 
-# Function to set the assistant's status by writing it to a file.
+# Function to set the assistant's status by publishing it on the state bus.
 def SetAssistantStatus(Status):
-    with open(rf'{TempDirPath}/Status.data', "w", encoding='utf-8') as file:
-        file.write(Status)
+    Bus.publish("status", Status)
 
 # Function to modify a query to ensure proper punctuation and formatting.
 def QueryModifier(Query):
@@ -104,33 +118,40 @@ def QueryModifier(Query):
 
 # Function to translate text to English.
 def UniversalTranslator(Text):
-    english_translation = mt.translate(Text, "en", "auto")
+    with Span("speech.translate"):
+        english_translation = mt.translate(Text, "en", "auto")
     return english_translation.capitalize()
 
 # Function to perform speech recognition using the WebDriver.
 def SpeechRecognition():
-    driver.get("file:///" + Link)
-    driver.find_element(by=By.ID, value="start").click()
-   
-    while True:
-        try:
-            # Get the recognized text from the HTML output element.
-            Text = driver.find_element(by=By.ID, value="output").text
-
-            if Text:
-                # Stop recognition by clicking the stop button.
-                driver.find_element(by=By.ID, value="end").click()
-
-                # If the input language is English, return the modified query.
-                if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
-                    return QueryModifier(Text)
-                else:
-                    # If the input language is not English, translate the text and return it.
-                    SetAssistantStatus("Translating...")
-                    return QueryModifier(UniversalTranslator(Text))
-                
-        except Exception as e:
-            pass
+    from selenium.webdriver.common.by import By
+    driver = GetDriver()
+
+    # Trace the time spent waiting for the user to speak.
+    with Span("speech.wait"):
+        driver.get("file:///" + Link)
+        driver.find_element(by=By.ID, value="start").click()
+
+        while True:
+            try:
+                # Get the recognized text from the HTML output element.
+                Text = driver.find_element(by=By.ID, value="output").text
+
+                if Text:
+                    # Stop recognition by clicking the stop button.
+                    driver.find_element(by=By.ID, value="end").click()
+                    break
+
+            except Exception as e:
+                pass
+
+    # If the input language is English, return the modified query.
+    if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
+        return QueryModifier(Text)
+    else:
+        # If the input language is not English, translate the text and return it.
+        SetAssistantStatus("Translating...")
+        return QueryModifier(UniversalTranslator(Text))
 
 # Main execution block.
 if __name__ == "__main__":
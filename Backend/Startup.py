@@ -0,0 +1,77 @@
+# ========================== Imports ==========================
+import importlib  # Deferred module loading
+import threading  # Background warm-up
+import time  # Import timing
+import sys  # Already-imported modules
+
+# ========================== Import Timing ==========================
+# Seconds spent in each timed import, warm-up step or startup milestone.
+ImportTimes = {}
+_lock = threading.Lock()
+
+def Record(name, seconds):
+    with _lock:
+        ImportTimes.setdefault(name, seconds)
+
+def TimedImport(name):
+    """ Import a module, recording how long its first import took. """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    Record(name, time.perf_counter() - start)
+    return module
+
+def PrintImportTimes(title="Startup timings"):
+    with _lock:
+        rows = list(ImportTimes.items())
+    print(f"\n{title}:")
+    for name, seconds in sorted(rows, key=lambda row: row[1], reverse=True):
+        print(f"  {name:<40}{seconds * 1000:>10.1f} ms")
+
+# ========================== Lazy Handles ==========================
+class LazyFunction:
+    """ Stands in for module.attr and imports the module on first call. """
+
+    def __init__(self, module, attr):
+        self.module = module
+        self.attr = attr
+        self.target = None
+
+    def resolve(self):
+        if self.target is None:
+            self.target = getattr(TimedImport(self.module), self.attr)
+        return self.target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+class LazyObject(LazyFunction):
+    """ Like LazyFunction, but forwards attribute access (module-level singletons). """
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+# ========================== Warm-up ==========================
+def WarmUp(modules):
+    """ Import each module and run its WarmUp() hook, if it has one. """
+    for name in modules:
+        try:
+            module = TimedImport(name)
+            hook = getattr(module, "WarmUp", None)
+            if hook is not None:
+                start = time.perf_counter()
+                hook()
+                Record(f"{name}.WarmUp()", time.perf_counter() - start)
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+
+def WarmUpInBackground(modules, on_done=None):
+    def run():
+        WarmUp(modules)
+        if on_done is not None:
+            on_done()
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
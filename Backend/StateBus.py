@@ -0,0 +1,193 @@
+# ========================== Imports ==========================
+import threading  # Condition variable used for change notifications
+import time  # Mirror write throttling
+import os  # File paths for the compatibility mirror
+
+# ========================== Topics ==========================
+# Every topic carries one value of a fixed type. Publishing a value of the
+# wrong type is a programming error and raises TypeError.
+TOPICS = {
+    "mic": str,          # "True" / "False", same strings as Mic.data
+    "status": str,       # Assistant status line, same text as Status.data
+    "responses": str,    # Text shown on the chat screen, same as Responses.data
+    "image-job": dict,   # Latest image generation job state
+}
+
+# Applied to every published value, so readers can compare exactly. The mic
+# file may have been edited by hand and end with a newline.
+NORMALISE = {
+    "mic": str.strip,
+}
+
+# Values served before anything has been published.
+DEFAULTS = {
+    "mic": "False",
+    "status": "Available...",
+    "responses": "",
+    "image-job": {},
+}
+
+# ========================== State Bus ==========================
+class StateBus:
+    """In-process publish/subscribe store for the assistant's shared state.
+
+    Readers either call get() for the current value, block in wait_for() /
+    wait_for_change() until a publish wakes them, or subscribe() a callback.
+    Sinks see every publish and are used to mirror state to disk.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._values = dict(DEFAULTS)
+        self._versions = {topic: 0 for topic in TOPICS}
+        self._subscribers = {topic: [] for topic in TOPICS}
+        self._sinks = []
+
+    def _check(self, topic, value):
+        if topic not in TOPICS:
+            raise KeyError(f"Unknown state topic: {topic}")
+        if not isinstance(value, TOPICS[topic]):
+            raise TypeError(f"Topic '{topic}' expects {TOPICS[topic].__name__}, got {type(value).__name__}")
+
+    @staticmethod
+    def _normalise(topic, value):
+        normalise = NORMALISE.get(topic)
+        return normalise(value) if normalise else value
+
+    def _notify(self, topic, value, subscribers, sinks):
+        # Callbacks run outside the lock so they may publish themselves.
+        for sink in sinks:
+            try:
+                sink(topic, value)
+            except Exception as e:
+                print(f"State sink error on '{topic}': {e}")
+        for callback in subscribers:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"State subscriber error on '{topic}': {e}")
+
+    def publish(self, topic, value):
+        self._check(topic, value)
+        value = self._normalise(topic, value)
+        with self._cond:
+            self._values[topic] = value
+            self._versions[topic] += 1
+            subscribers = list(self._subscribers[topic])
+            sinks = list(self._sinks)
+            self._cond.notify_all()
+        self._notify(topic, value, subscribers, sinks)
+
+    def update(self, topic, function):
+        """Atomically replace a topic's value with function(old value)."""
+        with self._cond:
+            value = function(self._values[topic])
+            self._check(topic, value)
+            value = self._normalise(topic, value)
+            self._values[topic] = value
+            self._versions[topic] += 1
+            subscribers = list(self._subscribers[topic])
+            sinks = list(self._sinks)
+            self._cond.notify_all()
+        self._notify(topic, value, subscribers, sinks)
+        return value
+
+    def get(self, topic):
+        with self._cond:
+            return self._values[topic]
+
+    def version(self, topic):
+        with self._cond:
+            return self._versions[topic]
+
+    def wait_for(self, topic, predicate, timeout=None):
+        """Block until predicate(value) is true. Returns the value, or None on timeout."""
+        with self._cond:
+            if self._cond.wait_for(lambda: predicate(self._values[topic]), timeout):
+                return self._values[topic]
+            return None
+
+    def wait_for_change(self, topic, since_version, timeout=None):
+        """Block until the topic moves past since_version. Returns (version, value)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._versions[topic] != since_version, timeout)
+            return self._versions[topic], self._values[topic]
+
+    def subscribe(self, topic, callback):
+        """Call callback(value) after every publish. Returns an unsubscribe function."""
+        if topic not in TOPICS:
+            raise KeyError(f"Unknown state topic: {topic}")
+        with self._cond:
+            self._subscribers[topic].append(callback)
+
+        def unsubscribe():
+            with self._cond:
+                if callback in self._subscribers[topic]:
+                    self._subscribers[topic].remove(callback)
+        return unsubscribe
+
+    def add_sink(self, sink):
+        with self._cond:
+            self._sinks.append(sink)
+
+# ========================== File Mirror Sink ==========================
+class FileMirrorSink:
+    """Mirrors string topics to the legacy Frontend/Files/*.data files.
+
+    Only needed by tools that still read those files; the assistant itself
+    works from the bus. A topic is written at most once per interval: a
+    streamed answer publishes "responses" every few milliseconds, and
+    rewriting the whole file each time costs O(n^2) bytes per answer. The
+    last value is always written once publishing stops.
+    """
+
+    FILES = {"mic": "Mic.data", "status": "Status.data", "responses": "Responses.data"}
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}  # topic -> newest value not yet written
+        self._written = {}  # topic -> monotonic time of the last write
+        self._timers = {}  # topic -> timer of the trailing write
+
+    def path(self, topic):
+        return os.path.join(self.directory, self.FILES[topic])
+
+    def load(self, bus):
+        # Seed the bus from the files so state survives a restart as before.
+        for topic in self.FILES:
+            try:
+                with open(self.path(topic), "r", encoding="utf-8") as f:
+                    bus.publish(topic, f.read())
+            except OSError:
+                pass
+
+    def __call__(self, topic, value):
+        if topic not in self.FILES:
+            return
+        with self._lock:
+            self._pending[topic] = value
+            wait = self._written.get(topic, float("-inf")) + self.interval - time.monotonic()
+            if wait > 0:
+                if topic not in self._timers:
+                    timer = threading.Timer(wait, self.flush, args=(topic,))
+                    timer.daemon = True
+                    self._timers[topic] = timer
+                    timer.start()
+                return
+        self.flush(topic)
+
+    def flush(self, topic):
+        """Write the newest pending value of topic now."""
+        with self._lock:
+            self._timers.pop(topic, None)
+            if topic not in self._pending:
+                return
+            value = self._pending.pop(topic)
+            self._written[topic] = time.monotonic()
+            with open(self.path(topic), "w", encoding="utf-8") as f:
+                f.write(value)
+
+# Process-wide bus shared by the GUI and the assistant thread.
+Bus = StateBus()
@@ -0,0 +1,135 @@
+# ========================== Imports ==========================
+from concurrent.futures import ThreadPoolExecutor  # Background token producers
+from Backend.Tracing import Bind  # Keep producer spans on the current turn
+import threading  # Stream condition variable
+import re  # Sentence boundaries
+
+# Said (and shown) when no answer could be produced at all
+FallbackAnswer = "Sorry, I could not answer that right now. Please try again."
+
+# ========================== Answer Stream ==========================
+class AnswerStream:
+    """ Tokens of one answer, readable while they are still arriving.
+
+    Every `for token in stream` loop gets all tokens from the start, so the
+    GUI, TTS and the chat log can each consume the same answer at their own
+    pace. Result() waits for the final text.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    @classmethod
+    def FromText(cls, text):
+        """ An already finished stream holding text (e.g. a precomputed answer). """
+        stream = cls()
+        if text:
+            stream.Put(text)
+        stream.Close()
+        return stream
+
+    # ---------------------- Producer ----------------------
+    def Put(self, token):
+        with self.condition:
+            self.tokens.append(token)
+            self.condition.notify_all()
+
+    def Close(self, error=None):
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    # ---------------------- Consumers ----------------------
+    def __iter__(self):
+        index = 0
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: index < len(self.tokens) or self.done)
+                if index >= len(self.tokens):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                token = self.tokens[index]
+            index += 1
+            yield token
+
+    def Text(self):
+        """ Everything received so far. """
+        with self.condition:
+            return "".join(self.tokens)
+
+    def Result(self, timeout=None):
+        """ The complete answer; raises the producer's error or TimeoutError. """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.done, timeout):
+                raise TimeoutError("answer stream did not finish in time")
+            if self.error is not None:
+                raise self.error
+            return "".join(self.tokens)
+
+# ========================== Producers ==========================
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="stream")
+
+def StartStream(producer):
+    """ Run producer() (a token generator) in the background; returns its AnswerStream. """
+    stream = AnswerStream()
+
+    def pump():
+        try:
+            for token in producer():
+                stream.Put(token)
+        except Exception as e:
+            print(f"Answer stream failed: {e}")
+            stream.Close(e)
+        else:
+            stream.Close()
+    executor.submit(Bind(pump))
+    return stream
+
+def WithFallback(tokens, retry=None, fallback=""):
+    """ Yield tokens. If they fail before the first token, retry() (another
+    token iterator) is tried once; if that fails too, or an answer breaks off
+    midway, fallback is yielded, so the screen and TTS still say something. """
+    sent = False
+    for attempt in (lambda: tokens, retry):
+        if attempt is None:
+            break
+        try:
+            for token in attempt():
+                sent = True
+                yield token
+            return
+        except Exception as e:
+            print(f"Answer stream failed: {e}")
+            if sent:
+                break  # a partial answer cannot be replayed
+    if fallback:
+        yield ("\n" if sent else "") + fallback
+
+# ========================== Sentence Splitter ==========================
+# End of sentence: .!? (plus closing quotes/brackets) followed by whitespace,
+# or a line break. Needs the next token to arrive, so "3.5" never splits.
+SentenceEnd = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+Abbreviations = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "no.", "approx."}
+MinSentenceChars = 12  # shorter pieces ("1.", "Yes.") are joined to the next sentence
+
+def Sentences(tokens):
+    """ Yield complete sentences from a token iterator as soon as each one ends. """
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        start = 0
+        for match in SentenceEnd.finditer(buffer):
+            sentence = buffer[start:match.end()].strip()
+            words = sentence.split()
+            if len(sentence) < MinSentenceChars or (words and words[-1].lower() in Abbreviations):
+                continue
+            yield sentence
+            start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
@@ -0,0 +1,17 @@
+# ========================== Imports ==========================
+# Tokenising and token counting shared by retrieval, caches and search
+# ranking. Nothing here touches disk, so tools can import it freely.
+import re  # Tokenising
+
+# ========================== Tokenising ==========================
+StopWords = set("""a an and are as at be but by do does did for from had has have he her his how i if in is it
+its me my no not of on or our she so that the their them they this to was we were what when where which who
+why will with you your""".split())
+
+TokenPattern = re.compile(r"\w+")
+
+# ========================== Token Counting ==========================
+def CountTokens(text):
+    """ Approximate llama token count (about four characters per token).
+    Only used for budgeting, so an estimate is enough. """
+    return len(text) // 4 + 1
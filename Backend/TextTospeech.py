@@ -3,28 +3,28 @@ import random  # For random choices in responses
 import asyncio  # For asynchronous operations
 import edge_tts  # For text-to-speech functionality
 import os  # For file path handling
-from dotenv import dotenv_values  # For reading environment variables
+import queue  # For handing synthesised sentences to playback
+import threading  # For synthesising ahead of playback
+from Backend.Config import env_vars  # For reading settings from .env
+from Backend.Tracing import Span, Bind  # For per-turn latency tracing
 
-# Load environment variables from a .env file
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
 AssistantVoice = env_vars.get("AssistantVoice")  # Get the AssistantVoice from the environment
 
 # Asynchronous function to convert text to an audio file
-async def TextToAudioFile(text) -> None:
-    file_path = r"Data\speech.mp3"
-
+async def TextToAudioFile(text, file_path=r"Data\speech.mp3") -> None:
     if os.path.exists(file_path):
         os.remove(file_path)  # Remove if exists to avoid overwrite errors
 
     communicate = edge_tts.Communicate(text, AssistantVoice, pitch='+5Hz', rate='+13%')
-    await communicate.save(r'Data\speech.mp3')  # Save the generated speech
+    await communicate.save(file_path)  # Save the generated speech
 
 # Function to manage Text-to-Speech (TTS) functionality
 def TTS(Text, func=lambda r=None: True):
     while True:
         try:
             # Convert text to an audio file asynchronously
-            asyncio.run(TextToAudioFile(Text))
+            with Span("tts.synthesis", chars=len(Text)):
+                asyncio.run(TextToAudioFile(Text))
 
             # Initialize pygame mixer for audio playback
             pygame.mixer.init()
@@ -34,10 +34,11 @@ def TTS(Text, func=lambda r=None: True):
             pygame.mixer.music.play()
 
             # Loop until the audio is done playing or the function stops
-            while pygame.mixer.music.get_busy():
-                if func() == False:
-                    break
-                pygame.time.Clock().tick(10)  # Limit loop to 10 ticks per second
+            with Span("tts.playback"):
+                while pygame.mixer.music.get_busy():
+                    if func() == False:
+                        break
+                    pygame.time.Clock().tick(10)  # Limit loop to 10 ticks per second
 
             return True  # Audio played successfully
 
@@ -53,37 +54,119 @@ def TTS(Text, func=lambda r=None: True):
             except Exception as e:
                 print(f"Error in finally block: {e}")
 
+# Lines spoken instead of the rest of a long answer
+responses = [
+    "The rest of the result has been printed to the chat screen, kindly check it out sir.",
+    "The rest of the text is now on the chat screen, sir, please check it.",
+    "You can see the rest of the text on the chat screen, sir.",
+    "The remaining part of the text is now on the chat screen, sir.",
+    "Sir, you'll find more text on the chat screen for you to see.",
+    "The rest of the answer is now on the chat screen, sir.",
+    "Sir, please look at the chat screen, the rest of the answer is there.",
+    "You'll find the complete answer on the chat screen, sir.",
+    "The next part of the text is on the chat screen, sir.",
+    "Sir, please check the chat screen for more information.",
+    "There's more text on the chat screen for you, sir.",
+    "Sir, take a look at the chat screen for additional text.",
+    "You'll find more to read on the chat screen, sir.",
+    "Sir, check the chat screen for the rest of the text.",
+    "The chat screen has the rest of the text, sir.",
+    "There's more to see on the chat screen, sir, please look.",
+    "Sir, the chat screen holds the continuation of the text.",
+    "You'll find the complete answer on the chat screen, kindly check it out sir.",
+    "Please review the chat screen for the rest of the text, sir.",
+    "Sir, look at the chat screen for the complete answer."
+]
+
 # Function to manage Text-to-Speech with additional responses for long text
 def TextToSpeech(Text, func=lambda r=None: True):
     Data = str(Text).split(".")  # Split the text into sentences
-    responses = [
-        "The rest of the result has been printed to the chat screen, kindly check it out sir.",
-        "The rest of the text is now on the chat screen, sir, please check it.",
-        "You can see the rest of the text on the chat screen, sir.",
-        "The remaining part of the text is now on the chat screen, sir.",
-        "Sir, you'll find more text on the chat screen for you to see.",
-        "The rest of the answer is now on the chat screen, sir.",
-        "Sir, please look at the chat screen, the rest of the answer is there.",
-        "You'll find the complete answer on the chat screen, sir.",
-        "The next part of the text is on the chat screen, sir.",
-        "Sir, please check the chat screen for more information.",
-        "There's more text on the chat screen for you, sir.",
-        "Sir, take a look at the chat screen for additional text.",
-        "You'll find more to read on the chat screen, sir.",
-        "Sir, check the chat screen for the rest of the text.",
-        "The chat screen has the rest of the text, sir.",
-        "There's more to see on the chat screen, sir, please look.",
-        "Sir, the chat screen holds the continuation of the text.",
-        "You'll find the complete answer on the chat screen, kindly check it out sir.",
-        "Please review the chat screen for the rest of the text, sir.",
-        "Sir, look at the chat screen for the complete answer."
-    ]
     # If the text is very long (more than 4 sentences and 250 characters), split it
     if len(Data) > 4 and len(Text) >= 250:
         TTS(" ".join(Text.split(".")[0:2]) + ". " + random.choice(responses), func)
     else:
         TTS(Text, func)
 
+# ========================== Streaming Speech ==========================
+SpeechSlots = [rf"Data\speech{i}.mp3" for i in range(3)]  # playing / queued / being synthesised
+
+def SpokenSentences(Sentences):
+    """ Apply TextToSpeech's long-answer rule to sentences as they arrive: the
+    first two are spoken, and once the answer reaches four sentences and 250
+    characters a pointer to the chat screen replaces the rest. """
+    held, count, chars = [], 0, 0
+    for sentence in Sentences:
+        count += 1
+        chars += len(sentence)
+        if count <= 2:
+            yield sentence
+            continue
+        held.append(sentence)
+        if count >= 4 and chars >= 250:
+            yield random.choice(responses)
+            return
+    yield from held
+
+def TextToSpeechStream(Sentences, func=lambda r=None: True):
+    """ Speak sentences while they are still being produced. The next
+    sentence is synthesised while the current one plays. """
+    ready = queue.Queue(maxsize=1)  # one sentence ahead keeps slot reuse safe
+    stop = threading.Event()
+
+    def hand_over(item):
+        # Give up once playback has stopped so this thread never blocks forever
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                pass
+
+    def synthesise():
+        try:
+            for i, sentence in enumerate(SpokenSentences(Sentences)):
+                if stop.is_set():
+                    break
+                path = SpeechSlots[i % len(SpeechSlots)]
+                with Span("tts.synthesis", chars=len(sentence)):
+                    asyncio.run(TextToAudioFile(sentence, path))
+                hand_over(path)
+        except Exception as e:
+            print(f"Error in TTS: {e}")
+        finally:
+            hand_over(None)
+
+    threading.Thread(target=Bind(synthesise), name="tts-synthesis", daemon=True).start()
+    try:
+        pygame.mixer.init()
+        with Span("tts.stream") as stream_span:
+            while True:
+                path = ready.get()
+                if path is None:
+                    break
+                pygame.mixer.music.load(path)
+                pygame.mixer.music.play()
+                stream_span.mark("first_audio")
+                with Span("tts.playback"):
+                    while pygame.mixer.music.get_busy():
+                        if func() == False:
+                            stop.set()
+                            break
+                        pygame.time.Clock().tick(10)  # Limit loop to 10 ticks per second
+                if stop.is_set():
+                    break
+        return True
+    except Exception as e:
+        print(f"Error in TTS: {e}")
+    finally:
+        stop.set()  # the synthesis thread stops at its next sentence
+        try:
+            func(False)
+            pygame.mixer.music.stop()
+            pygame.mixer.quit()
+        except Exception as e:
+            print(f"Error in finally block: {e}")
+
 # Main execution loop
 if __name__ == "__main__":
     while True:
@@ -0,0 +1,205 @@
+# ========================== Imports ==========================
+from Backend.Config import env_vars  # Settings parsed once from .env
+import contextvars  # Turn id that follows the call chain
+import itertools  # Turn ids
+import threading  # Background writer
+import queue  # Hand-off from callers to the writer
+import json  # JSONL encoding
+import math  # Percentile ranks
+import time  # Span timing
+import sys  # CLI arguments
+import os  # Rotation
+
+# ========================== Load Environment Variables ==========================
+TraceEnabled = env_vars.get("TraceEnabled", "True") == "True"
+TracePath = env_vars.get("TracePath") or r"Data\Trace.jsonl"
+TraceMaxBytes = int(env_vars.get("TraceMaxBytes") or 5 * 1024 * 1024)
+TraceBackups = int(env_vars.get("TraceBackups") or 3)
+
+# ========================== Turn Ids ==========================
+# Each spoken turn gets an id; spans recorded anywhere below it carry it.
+_turn = contextvars.ContextVar("trace_turn", default=None)
+_turn_ids = itertools.count(1)
+_last_turn = None  # Fallback for threads outside the turn's context (GUI)
+_session = f"{int(time.time()):x}"
+
+def NewTurn():
+    """ Start a new turn in the current context and return its id. """
+    global _last_turn
+    turn_id = f"{_session}-{next(_turn_ids)}"
+    _turn.set(turn_id)
+    _last_turn = turn_id
+    return turn_id
+
+def CurrentTurn():
+    return _turn.get() or _last_turn
+
+def Bind(function):
+    """ Wrap function so it runs in the caller's trace context (for threads/executors). """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+# ========================== Writer ==========================
+class TraceWriter:
+    """ Appends spans to a size-rotated JSONL file from a background thread.
+
+    Callers only enqueue a dict, so a span costs a few microseconds on the
+    hot path; encoding and disk I/O happen on the writer thread.
+    """
+
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                    self.thread.start()
+        self.queue.put(record)
+
+    def flush(self, timeout=None):
+        """ Block until every span queued so far is on disk. """
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get())
+            flushes = [item for item in batch if isinstance(item, threading.Event)]
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    self._rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    for record in batch:
+                        if not isinstance(record, threading.Event):
+                            f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Trace write failed: {e}")
+            for done in flushes:
+                done.set()
+
+Writer = TraceWriter(TracePath, TraceMaxBytes, TraceBackups)
+
+# ========================== Spans ==========================
+class Span:
+    """ Times one pipeline stage.
+
+        with Span("dmm") as span:
+            for event in stream:
+                span.mark("first_token")
+
+    mark() records the first occurrence only, as '<name>_ms' from the start.
+    """
+
+    def __init__(self, stage, **fields):
+        self.stage = stage
+        self.fields = fields
+        self.marks = {}
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = round((time.perf_counter() - self.start) * 1000, 2)
+
+    def __enter__(self):
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not TraceEnabled:
+            return False
+        record = {
+            "turn": CurrentTurn(),
+            "stage": self.stage,
+            "ts": round(self.wall, 3),
+            "ms": round((time.perf_counter() - self.start) * 1000, 2),
+            "ok": exc_type is None,
+        }
+        for name, value in self.marks.items():
+            record[f"{name}_ms"] = value
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(self.fields)
+        Writer.write(record)
+        return False
+
+def Traced(stage):
+    """ Decorator form of Span for whole functions. """
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            with Span(stage):
+                return function(*args, **kwargs)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+    return decorator
+
+# ========================== Summary ==========================
+def ReadSpans(path=TracePath):
+    """ Yield spans from the trace file and its rotated backups, oldest first. """
+    paths = [f"{path}.{i}" for i in range(TraceBackups, 0, -1)] + [path]
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    pass  # torn line from a crash
+
+def Percentile(values, pct):
+    """ Nearest-rank percentile of a sorted list. """
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+def Summarise(spans):
+    """ {stage or stage.mark: {"n", "p50", "p95", "p99"}} over total and marked times. """
+    samples = {}
+    for span in spans:
+        samples.setdefault(span["stage"], []).append(span["ms"])
+        for key, value in span.items():
+            if key.endswith("_ms"):
+                samples.setdefault(f"{span['stage']}.{key[:-3]}", []).append(value)
+    summary = {}
+    for stage, values in samples.items():
+        values.sort()
+        summary[stage] = {
+            "n": len(values),
+            "p50": Percentile(values, 50),
+            "p95": Percentile(values, 95),
+            "p99": Percentile(values, 99),
+        }
+    return summary
+
+def PrintSummary(summary):
+    print(f"{'stage':<28}{'n':>7}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for stage in sorted(summary):
+        row = summary[stage]
+        print(f"{stage:<28}{row['n']:>7}{row['p50']:>12.1f}{row['p95']:>12.1f}{row['p99']:>12.1f}")
+
+# Usage: python -m Backend.Tracing [trace.jsonl]
+if __name__ == "__main__":
+    PrintSummary(Summarise(ReadSpans(sys.argv[1] if len(sys.argv) > 1 else TracePath)))
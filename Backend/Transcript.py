@@ -0,0 +1,71 @@
+# ========================== Imports ==========================
+import threading  # Update lock
+import os  # File sizes / paths
+
+# ========================== Transcript Renderer ==========================
+class TranscriptRenderer:
+    """ Keeps a rendered chat transcript file in step with the chat store.
+
+    Only turns newer than the high-water mark are formatted and appended, so
+    updating costs the same however long the history is. The mark and the
+    file size it belongs to live in a small side file (<path>.mark); if the
+    transcript and the mark disagree after a crash, the file is trimmed back
+    to the recorded size, or rebuilt when that is not possible.
+    """
+
+    def __init__(self, store, path, names):
+        self.store = store
+        self.path = path
+        self.mark_path = path + ".mark"
+        self.names = names  # role -> speaker name shown in the transcript
+        self.lock = threading.Lock()
+        self.mark = None  # (last turn id, file size), loaded on first update
+
+    @staticmethod
+    def Clean(text):
+        # Drop empty lines inside a message so every turn stays compact
+        return "\n".join(line for line in text.splitlines() if line.strip())
+
+    def Format(self, turn):
+        name = self.names.get(turn["role"])
+        if name is None:
+            return ""
+        return f"{name} : {self.Clean(turn['content'])}\n"
+
+    # ---------------------- High-water Mark ----------------------
+    def _load_mark(self):
+        try:
+            with open(self.mark_path, "r", encoding="utf-8") as f:
+                last_id, size = (int(x) for x in f.read().split())
+        except (OSError, ValueError):
+            return 0, 0
+        actual = os.path.getsize(self.path) if os.path.exists(self.path) else -1
+        if actual < size or (last_id and not self.store.Has(last_id)):
+            return 0, 0  # transcript lost or store cleared: rebuild
+        if actual > size:
+            with open(self.path, "r+b") as f:
+                f.truncate(size)  # drop a half-written append
+        return last_id, size
+
+    def _save_mark(self):
+        with open(self.mark_path, "w", encoding="utf-8") as f:
+            f.write(f"{self.mark[0]} {self.mark[1]}")
+
+    # ---------------------- Update ----------------------
+    def Update(self):
+        """ Append turns saved since the last update. Returns how many were added. """
+        with self.lock:
+            if self.mark is None:
+                self.mark = self._load_mark()
+            last_id, size = self.mark
+            if last_id and not self.store.Has(last_id):
+                last_id, size = 0, 0  # the store was cleared
+            turns = self.store.TurnsSince(last_id)
+            if not turns and size:
+                return 0
+            text = "".join(self.Format(turn) for turn in turns).encode("utf-8")
+            with open(self.path, "ab" if size else "wb") as f:
+                f.write(text)
+            self.mark = (turns[-1]["id"] if turns else last_id, size + len(text))
+            self._save_mark()
+            return len(turns)
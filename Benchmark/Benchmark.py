@@ -0,0 +1,168 @@
+"""
+Offline end-to-end benchmark for the voice pipeline.
+
+Drives Main.MainExecution over a scripted corpus with local stand-ins for
+Groq, Cohere, Google search, edge_tts, pygame playback and the Selenium
+recognizer, then reports per-stage latency percentiles from the trace
+spans and compares them with a stored baseline.
+
+Usage (from the repository root):
+    python -m Benchmark.Benchmark --profile typical --turns 36
+    python -m Benchmark.Benchmark --update-baseline
+Exit status is 1 when any stage regresses past the tolerance, or when the
+semantic answer cache confuses a question with its negation.
+"""
+
+# ========================== Imports ==========================
+import argparse  # Command line options
+import tempfile  # Isolated working directory
+import json  # Corpus and baseline files
+import time  # Wall clock throughput
+import sys  # Import path / exit status
+import os  # Paths
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DefaultCorpus = os.path.join(ROOT, "Benchmark", "Corpus.json")
+DefaultBaseline = os.path.join(ROOT, "Benchmark", "Baseline.json")
+
+# ========================== Environment ==========================
+def PrepareWorkdir():
+    """ Fresh cwd so the run never touches the real chat log or state files. """
+    workdir = tempfile.mkdtemp(prefix="jervis-bench-")
+    os.chdir(workdir)
+    os.makedirs("Data", exist_ok=True)
+    return workdir
+
+# ========================== Baseline ==========================
+def CompareWithBaseline(summary, baseline, tolerance, floor_ms):
+    """ List of (stage, metric, baseline, current) that got slower than allowed. """
+    regressions = []
+    for stage, base in baseline["stages"].items():
+        current = summary.get(stage)
+        if current is None:
+            continue
+        for metric in ("p50", "p95"):
+            if current[metric] > base[metric] * (1 + tolerance) + floor_ms:
+                regressions.append((stage, metric, base[metric], current[metric]))
+    return regressions
+
+# ========================== Answer Cache ==========================
+# (cached question, asked question, should hit). Every question must be
+# cacheable; the negated pairs score above the similarity threshold, so only
+# the polarity check keeps them apart, and the paraphrases must still hit
+CachePairs = [
+    ("can pregnant women eat sushi from a japanese restaurant",
+     "can pregnant women not eat sushi from a japanese restaurant", False),
+    ("should children under five years old drink coffee or energy drinks",
+     "should children under five years old never drink coffee or energy drinks", False),
+    ("is the speed of light in a vacuum constant for every observer",
+     "isn't the speed of light in a vacuum constant for every observer", False),
+    ("is python fast", "is python not fast", False),
+    ("what are the health benefits of green tea", "what are the main health benefits of green tea", True),
+    ("what is the capital of france", "What's the capital of France?", True),
+]
+
+def CheckAnswerCache(workdir):
+    """ Problems of the semantic answer cache with CachePairs, as messages. """
+    from Backend.AnswerCache import SemanticAnswerCache, Cacheable
+    failures = []
+    for i, (cached, asked, should_hit) in enumerate(CachePairs):
+        uncacheable = [q for q in (cached, asked) if not Cacheable(q)]
+        if uncacheable:
+            failures.append(f"{uncacheable[0]!r} is never cached, so the pair tests nothing")
+            continue
+        cache = SemanticAnswerCache(os.path.join(workdir, f"CacheCheck{i}"), 16, 0.9, 3600)
+        cache.Put(cached, f"answer to {cached}")
+        if (cache.Get(asked) is not None) != should_hit:
+            failures.append(f"{'missed' if should_hit else 'served'} {asked!r} after caching {cached!r}")
+    return failures
+
+# ========================== Run ==========================
+def RunBenchmark(args):
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    sequence = [corpus[i % len(corpus)] for i in range(args.turns)]
+
+    workdir = PrepareWorkdir()
+
+    import Backend.Tracing as Tracing
+    Tracing.TraceEnabled = True
+    Tracing.Writer.path = os.path.join(workdir, "Trace.jsonl")
+
+    from Frontend.GUI import QueryModifier
+    from Benchmark.Fakes import Install, ScaledProfiles
+    Install(ScaledProfiles(args.profile, args.scale), sequence, args.answer_tokens, QueryModifier, Tracing.Span)
+
+    import Main  # imported after the fakes so module-level clients pick them up
+    from Backend.Startup import WarmUp
+    WarmUp(Main.WarmModules)  # keep cold imports out of the first measured turn
+
+    started = time.perf_counter()
+    for i in range(args.turns):
+        Tracing.NewTurn()
+        Main.MainExecution()
+        print(f"\rturn {i + 1}/{args.turns}", end="", flush=True)
+    elapsed = time.perf_counter() - started
+    print()
+
+    Tracing.Writer.flush()
+    summary = Tracing.Summarise(Tracing.ReadSpans(Tracing.Writer.path))
+    Tracing.PrintSummary(summary)
+    print(f"\nDMM decision cache: {sys.modules['Backend.Model'].Decisions.Stats()}")
+    print(f"LLM client pool: {sys.modules['Backend.LLMClient'].Clients.Stats()}")
+    print(f"Single-flight: {sys.modules['Backend.SingleFlight'].Flights.Stats()}")
+    print(f"Model routing: {sys.modules['Backend.ModelRouter'].Router.Stats()}")
+    print(f"Answer cache: {sys.modules['Backend.AnswerCache'].Answers.Stats()}")
+    print(f"Search cache: {sys.modules['Backend.SearchCache'].Searches.Stats()}")
+    print(f"Knowledge store: {sys.modules['Backend.KnowledgeStore'].Knowledge.Stats()}")
+    args.cache_failures = CheckAnswerCache(workdir)
+    for failure in args.cache_failures:
+        print(f"ANSWER CACHE {failure}")
+    print(f"\n{args.turns} turns in {elapsed:.2f} s ({args.turns / elapsed:.2f} turns/s), profile={args.profile} scale={args.scale}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency benchmark for MainExecution")
+    parser.add_argument("--corpus", default=DefaultCorpus)
+    parser.add_argument("--baseline", default=DefaultBaseline)
+    parser.add_argument("--profile", default="typical", choices=["fast", "typical", "slow"])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every simulated latency")
+    parser.add_argument("--turns", type=int, default=24)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--floor-ms", type=float, default=5.0, help="absolute slack added to every check")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    args.corpus = os.path.abspath(args.corpus)
+    args.baseline = os.path.abspath(args.baseline)
+
+    summary = RunBenchmark(args)
+
+    if args.cache_failures:
+        return 1
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"profile": args.profile, "scale": args.scale, "stages": summary}, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored yet; run with --update-baseline to create one.")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if (baseline.get("profile"), baseline.get("scale")) != (args.profile, args.scale):
+        print(f"Warning: baseline was recorded with profile={baseline.get('profile')} scale={baseline.get('scale')}")
+
+    regressions = CompareWithBaseline(summary, baseline, args.tolerance, args.floor_ms)
+    for stage, metric, base, current in regressions:
+        print(f"REGRESSION {stage} {metric}: {base:.1f} ms -> {current:.1f} ms")
+    if not regressions:
+        print("No regressions against baseline.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# ========================== Imports ==========================
+from types import SimpleNamespace  # Lightweight SDK-shaped objects
+import asyncio  # edge_tts is async
+import random  # Latency jitter
+import types  # Stand-in recognizer module
+import time  # Simulated latency
+import sys  # Module patching
+import os  # Fake audio files
+import re  # Query normalisation
+
+# ========================== Latency Profiles ==========================
+class LatencyProfile:
+    """ Time to first token plus a steady token rate, with relative jitter. """
+
+    def __init__(self, first_ms, tokens_per_s=0, jitter=0.1):
+        self.first_ms = first_ms
+        self.tokens_per_s = tokens_per_s
+        self.jitter = jitter
+
+    def _sleep(self, ms):
+        if ms > 0:
+            time.sleep(ms * random.uniform(1 - self.jitter, 1 + self.jitter) / 1000)
+
+    def first(self):
+        self._sleep(self.first_ms)
+
+    def token(self):
+        if self.tokens_per_s:
+            self._sleep(1000 / self.tokens_per_s)
+
+# Named profiles; every value is scaled by --scale on the command line.
+PROFILES = {
+    "fast": {
+        "speech": LatencyProfile(50),
+        "cohere": LatencyProfile(120, 400),
+        "groq-70b": LatencyProfile(150, 300),
+        "groq-8b": LatencyProfile(60, 800),
+        "search": LatencyProfile(250),
+        "tts": LatencyProfile(80, 2000),      # tokens_per_s = characters per second
+        "playback": LatencyProfile(0, 400),   # characters per second of speech
+    },
+    "typical": {
+        "speech": LatencyProfile(150),
+        "cohere": LatencyProfile(350, 120),
+        "groq-70b": LatencyProfile(400, 150),
+        "groq-8b": LatencyProfile(150, 500),
+        "search": LatencyProfile(900),
+        "tts": LatencyProfile(250, 1000),
+        "playback": LatencyProfile(0, 60),
+    },
+    "slow": {
+        "speech": LatencyProfile(300),
+        "cohere": LatencyProfile(900, 60),
+        "groq-70b": LatencyProfile(1200, 60),
+        "groq-8b": LatencyProfile(400, 200),
+        "search": LatencyProfile(2500),
+        "tts": LatencyProfile(600, 500),
+        "playback": LatencyProfile(0, 40),
+    },
+}
+
+def ScaledProfiles(name, scale=1.0):
+    profiles = {}
+    for key, p in PROFILES[name].items():
+        profiles[key] = LatencyProfile(p.first_ms * scale, p.tokens_per_s / scale if p.tokens_per_s else 0, p.jitter)
+    return profiles
+
+def Normalise(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+# ========================== Fake Groq ==========================
+class FakeGroqStream:
+    """ Iterates chunks shaped like groq's ChatCompletionChunk. """
+
+    def __init__(self, profile, tokens):
+        self.profile = profile
+        self.tokens = tokens
+        self.closed = False
+
+    def __iter__(self):
+        self.profile.first()
+        for i, token in enumerate(self.tokens):
+            if self.closed:
+                return
+            if i:
+                self.profile.token()
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    def close(self):
+        self.closed = True
+
+class FakeGroq:
+    """ Drop-in for groq.Groq; answers with `answer_tokens` filler tokens. """
+    profiles = {}
+    answer_tokens = 60
+
+    def __init__(self, api_key=None, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, stream=False, **kwargs):
+        profile = self.profiles["groq-8b" if "8b" in model else "groq-70b"]
+        tokens = [f"word{i} " if i % 12 else f"Sentence{i}. " for i in range(self.answer_tokens)]
+        if stream:
+            return FakeGroqStream(profile, tokens)
+        profile.first()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="".join(tokens)))])
+
+# ========================== Fake Cohere ==========================
+class FakeCohereChat:
+    """ Replacement for cohere.Client.chat_stream driven by the corpus decisions. """
+    profile = None
+    decisions = {}
+
+    def __call__(self, client=None, message="", **kwargs):
+        decision = self.decisions.get(Normalise(message), f"general {message}")
+        self.profile.first()
+        for i, word in enumerate(decision.split(" ")):
+            if i:
+                self.profile.token()
+            yield SimpleNamespace(event_type="text-generation", text=word if i == 0 else " " + word)
+        yield SimpleNamespace(event_type="stream-end", text="")
+
+# ========================== Fake Google Search ==========================
+def MakeFakeSearch(profile):
+    def search(query, advanced=False, num_results=10, **kwargs):
+        profile.first()
+        for i in range(num_results):
+            yield SimpleNamespace(
+                url=f"https://example.com/{Normalise(query).replace(' ', '-')}/{i}",
+                title=f"Result {i + 1} for {query}",
+                description=f"Recorded description {i + 1} about {query}. " * 3,
+            )
+    return search
+
+# ========================== Fake edge_tts / pygame ==========================
+class FakeCommunicate:
+    """ Drop-in for edge_tts.Communicate; writes one byte per character. """
+    profile = None
+
+    def __init__(self, text, voice=None, **kwargs):
+        self.text = text
+
+    async def save(self, path):
+        delay = self.profile.first_ms / 1000
+        if self.profile.tokens_per_s:
+            delay += len(self.text) / self.profile.tokens_per_s
+        await asyncio.sleep(delay)
+        with open(path, "wb") as f:
+            f.write(b"\0" * len(self.text))
+
+class FakeMusic:
+    """ pygame.mixer.music stand-in whose playback length follows the text length. """
+    profile = None
+
+    def __init__(self):
+        self.until = 0
+        self.length = 0
+
+    def load(self, path):
+        self.length = os.path.getsize(path)
+
+    def play(self):
+        self.until = time.perf_counter() + self.length / self.profile.tokens_per_s
+
+    def get_busy(self):
+        return time.perf_counter() < self.until
+
+    def stop(self):
+        self.until = 0
+
+class FakeMixer:
+    def __init__(self):
+        self.music = FakeMusic()
+
+    def init(self):
+        pass
+
+    def quit(self):
+        pass
+
+# ========================== Fake Recognizer ==========================
+def MakeFakeSpeechToText(queries, profile, QueryModifier, Span):
+    """ Module object replacing Backend.SpeechToText (which starts Chrome at import). """
+    module = types.ModuleType("Backend.SpeechToText")
+    pending = list(queries)
+
+    def SpeechRecognition():
+        with Span("speech.wait"):
+            profile.first()
+            return QueryModifier(pending.pop(0))
+
+    module.SpeechRecognition = SpeechRecognition
+    module.QueryModifier = QueryModifier
+    module.UniversalTranslator = lambda Text: Text
+    module.SetAssistantStatus = lambda Status: None
+    module.pending = pending
+    return module
+
+# ========================== Installation ==========================
+def Install(profiles, corpus, answer_tokens, QueryModifier, Span):
+    """ Patch the SDK entry points; must run before Main/Backend are imported. """
+    import groq
+    import cohere
+    import googlesearch
+    import edge_tts
+    import pygame
+
+    FakeGroq.profiles = profiles
+    FakeGroq.answer_tokens = answer_tokens
+    groq.Groq = FakeGroq
+
+    FakeCohereChat.profile = profiles["cohere"]
+    FakeCohereChat.decisions = {Normalise(QueryModifier(item["query"])): item["decision"] for item in corpus}
+    fake_chat = FakeCohereChat()
+    cohere.Client.chat_stream = lambda client, **kwargs: fake_chat(client, **kwargs)
+
+    googlesearch.search = MakeFakeSearch(profiles["search"])
+
+    FakeCommunicate.profile = profiles["tts"]
+    edge_tts.Communicate = FakeCommunicate
+
+    FakeMusic.profile = profiles["playback"]
+    pygame.mixer = FakeMixer()
+
+    recognizer = MakeFakeSpeechToText([item["query"] for item in corpus], profiles["speech"], QueryModifier, Span)
+    sys.modules["Backend.SpeechToText"] = recognizer
+    return recognizer
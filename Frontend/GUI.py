@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 """
 Jervis Desktop GUI (PyQt5)
-- Uses your existing assets and file I/O scheme:
+- Uses your existing assets and state scheme:
     - .env -> Assistantname
     - Graphics directory for icons/gif
-    - Files directory for Mic.data, Status.data, Responses.data
+    - Backend.StateBus for mic/status/responses, optionally mirrored to
+      Files directory (Mic.data, Status.data, Responses.data)
 - Pages:
     1) Welcome (GIF + mic toggle + status)
     2) Chat (read-only chat stream + input box + send)
@@ -25,16 +26,19 @@ from PyQt5.QtGui import (
     QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap,
     QTextBlockFormat, QCursor
 )
-from PyQt5.QtCore import Qt, QSize, QTimer, QRect
-from dotenv import dotenv_values
-import sys, os, datetime
+from PyQt5.QtCore import Qt, QSize, QTimer, QRect, QObject, pyqtSignal
+from Backend.Config import env_vars
+from Backend.StateBus import Bus, FileMirrorSink
+from Backend.Tracing import Span
+from Backend.ChatStore import Store
+import sys, os, datetime, time
 
 # =========================
 #   ENV + GLOBAL PATHS
 # =========================
 
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
 AssistantName = env_vars.get("Assistantname", "Jervis")
+MirrorStateFiles = env_vars.get("MirrorStateFiles", "False") == "True"
 
 current_dir = os.getcwd()
 TempDirPath = rf"{current_dir}\Frontend\Files"
@@ -50,6 +54,12 @@ def TempDirectoryPath(fname: str) -> str:
 os.makedirs(TempDirPath, exist_ok=True)
 os.makedirs(GraphicsDirPath, exist_ok=True)
 
+# Keep Frontend/Files/*.data in sync for external tools (MirrorStateFiles=True)
+if MirrorStateFiles:
+    _mirror = FileMirrorSink(TempDirPath)
+    _mirror.load(Bus)
+    Bus.add_sink(_mirror)
+
 # =========================
 #   FILE I/O HELPERS
 # =========================
@@ -65,27 +75,43 @@ def get_text(filepath: str) -> str:
     except Exception:
         return ""
 
+# =========================
+#   STATE HELPERS (bus-backed)
+# =========================
+
 def SetMicrophoneStatus(value: str) -> None:
-    set_text(TempDirectoryPath("Mic.data"), value)
+    Bus.publish("mic", value)
 
 def GetMicrophoneStatus() -> str:
-    return get_text(TempDirectoryPath("Mic.data"))
+    return Bus.get("mic")
+
+def WaitForMicrophoneStatus(value: str, timeout=None):
+    # Blocks the caller until the mic topic equals value (None on timeout)
+    return Bus.wait_for("mic", lambda v: v == value, timeout)
 
 def SetAssistantStatus(value: str) -> None:
-    set_text(TempDirectoryPath("Status.data"), value)
+    Bus.publish("status", value)
 
 def GetAssistantStatus() -> str:
-    return get_text(TempDirectoryPath("Status.data"))
+    return Bus.get("status")
 
 def ShowTextToScreen(value: str) -> None:
-    set_text(TempDirectoryPath("Responses.data"), value)
+    Bus.publish("responses", value)
 
 def AppendToResponses(line: str) -> None:
-    path = TempDirectoryPath("Responses.data")
-    old = get_text(path)
-    if old and not old.endswith("\n"):
-        old += "\n"
-    set_text(path, (old or "") + line)
+    def append(old: str) -> str:
+        if old and not old.endswith("\n"):
+            old += "\n"
+        return (old or "") + line
+    Bus.update("responses", append)
+
+def StreamToResponses(text: str) -> None:
+    # Continue the current line (streamed answer tokens)
+    Bus.update("responses", lambda old: (old or "") + text)
+
+def ReplaceResponsesTail(old: str, new: str) -> None:
+    # Swap the end of the responses text, e.g. a streamed answer for its cleaned-up form
+    Bus.update("responses", lambda text: text[:len(text) - len(old)] + new if old and text.endswith(old) else text)
 
 def MicButtonInitialed():
     # Note: original used "False" when mic icon shows "on"
@@ -135,6 +161,19 @@ def icon_or_blank(name: str) -> QIcon:
         return QIcon(path)
     return QIcon()  # blank if not found
 
+class BusSignals(QObject):
+    """Re-emits StateBus publishes as a Qt signal.
+
+    Bus callbacks run on the publishing thread; the queued signal hops them
+    onto the GUI thread so widgets can be updated safely.
+    """
+    changed = pyqtSignal(str, object)
+
+    def __init__(self, topics):
+        super().__init__()
+        for topic in topics:
+            Bus.subscribe(topic, lambda value, t=topic: self.changed.emit(t, value))
+
 # =========================
 #   COMMON UI BUILDERS
 # =========================
@@ -312,7 +351,7 @@ class SideBar(QWidget):
         self.btn_settings.clicked.connect(lambda: self.pages.setCurrentIndex(3))
 
         # Initialize mic status visual from file
-        mic_is_off = (GetMicrophoneStatus().strip() == "True")
+        mic_is_off = (GetMicrophoneStatus() == "True")
         self._set_mic_icon(not mic_is_off)
         self.mic_label.setText(f"Mic: {'On' if not mic_is_off else 'Off'}")
 
@@ -352,7 +391,7 @@ class SideBar(QWidget):
     def toggle_mic(self):
         # File scheme from your project:
         # "False" -> mic ON (initialed) ; "True" -> mic closed/off
-        current = GetMicrophoneStatus().strip()
+        current = GetMicrophoneStatus()
         is_off = (current == "True")
         if is_off:
             MicButtonInitialed()  # set "False"
@@ -414,6 +453,10 @@ class WelcomePage(QWidget):
         self.timer.timeout.connect(lambda: None)
         self.timer.start(2000)
 
+        # Live status updates pushed from the bus
+        self.signals = BusSignals(["status"])
+        self.signals.changed.connect(lambda _, value: self.status_label.setText(value or "Idle"))
+
     def refresh_status(self):
         self.status_label.setText(GetAssistantStatus() or "Idle")
 
@@ -429,7 +472,38 @@ class ChatPage(QWidget):
         base.setSpacing(12)
 
         base.addWidget(make_section_title("Chat"))
-        base.addWidget(make_note("Stream from Frontend/Files/Responses.data"))
+        base.addWidget(make_note("Live stream of assistant responses"))
+
+        # History search (full-text index over every saved turn)
+        search_row = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search past conversations...")
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                background:#151515; color:#eaeaea; border:1px solid #2d2d2d;
+                border-radius: 10px; height: 36px; padding: 0 12px;
+            }
+        """)
+        self.search_range = QComboBox()
+        self.search_range.addItems(list(self.SEARCH_RANGES))
+        search_btn = QPushButton("Search")
+        set_smooth_button(search_btn)
+        search_row.addWidget(self.search_input, 4)
+        search_row.addWidget(self.search_range, 1)
+        search_row.addWidget(search_btn, 1)
+        base.addLayout(search_row)
+
+        self.search_results = QTextEdit()
+        self.search_results.setReadOnly(True)
+        self.search_results.setMaximumHeight(180)
+        self.search_results.setStyleSheet("""
+            QTextEdit {
+                background:#121212; color:#cfcfcf; border:1px solid #2d2d2d; border-radius: 12px;
+                padding: 8px;
+            }
+        """)
+        self.search_results.hide()
+        base.addWidget(self.search_results)
 
         # Chat text area
         self.chat = QTextEdit()
@@ -477,22 +551,31 @@ class ChatPage(QWidget):
 
         base.addLayout(bottom)
 
-        # Timer to load messages
+        # Render responses whenever the bus publishes them
         self.old = ""
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.load_messages)
-        self.timer.start(300)
+        self.signals = BusSignals(["responses"])
+        self.signals.changed.connect(lambda _, value: self.load_messages(value))
+        self.load_messages()
 
         # Buttons
         send_btn.clicked.connect(self.handle_send)
         clear_btn.clicked.connect(self.clear_chat)
+        search_btn.clicked.connect(self.handle_search)
+        self.search_input.returnPressed.connect(self.handle_search)
 
-    def load_messages(self):
-        path = TempDirectoryPath("Responses.data")
-        txt = get_text(path)
+    def load_messages(self, txt=None):
+        if txt is None:
+            txt = Bus.get("responses")
         if txt != self.old:
-            self.chat.setPlainText(txt)
-            self.chat.moveCursor(self.chat.textCursor().End)
+            with Span("gui.render", chars=len(txt)):
+                if self.old and txt.startswith(self.old):
+                    # Streamed tokens: insert only what is new
+                    cursor = self.chat.textCursor()
+                    cursor.movePosition(cursor.End)
+                    cursor.insertText(txt[len(self.old):])
+                else:
+                    self.chat.setPlainText(txt)
+                self.chat.moveCursor(self.chat.textCursor().End)
             self.old = txt
 
     def handle_send(self):
@@ -512,6 +595,27 @@ class ChatPage(QWidget):
         self.chat.clear()
         self.old = ""
 
+    # Range label -> seconds to look back (None = everything)
+    SEARCH_RANGES = {"Any time": None, "Today": 86400, "Last 7 days": 7 * 86400, "Last 30 days": 30 * 86400}
+
+    def handle_search(self):
+        query = self.search_input.text().strip()
+        if not query:
+            self.search_results.clear()
+            self.search_results.hide()
+            return
+        window = self.SEARCH_RANGES[self.search_range.currentText()]
+        since = time.time() - window if window else None
+        with Span("gui.search"):
+            hits = Store.Search(query, since=since, limit=25)
+        lines = []
+        for hit in hits:
+            when = datetime.datetime.fromtimestamp(hit["created"]).strftime("%Y-%m-%d %H:%M")
+            who = "You" if hit["role"] == "user" else AssistantName
+            lines.append(f"[{when}] {who}: {hit['snippet']}")
+        self.search_results.setPlainText("\n".join(lines) or f"No past messages match '{query}'.")
+        self.search_results.show()
+
 # =========================
 #   PAGE: CONSOLE (RAW FILES)
 # =========================
@@ -524,13 +628,14 @@ class ConsolePage(QWidget):
         root.setSpacing(12)
 
         root.addWidget(make_section_title("Console"))
-        root.addWidget(make_note("Quick view/edit of project text files."))
+        root.addWidget(make_note("Quick view/edit of live assistant state."))
 
         grid = QGridLayout()
         grid.setHorizontalSpacing(12)
         grid.setVerticalSpacing(10)
 
-        # File viewers
+        # State viewers (topic on the bus, legacy mirror file)
+        self.topics = {"Mic": "mic", "Status": "status", "Responses": "responses"}
         self.paths = {
             "Mic": TempDirectoryPath("Mic.data"),
             "Status": TempDirectoryPath("Status.data"),
@@ -550,7 +655,7 @@ class ConsolePage(QWidget):
 
             te = QTextEdit()
             te.setStyleSheet("background:#111; color:#eee; border:1px solid #333; border-radius: 8px;")
-            te.setPlainText(get_text(path))
+            te.setPlainText(Bus.get(self.topics[name]))
             self.edits[name] = te
             grid.addWidget(te, r, 0, 1, 3)
             r += 1
@@ -581,13 +686,13 @@ class ConsolePage(QWidget):
             QMessageBox.warning(self, "Not Found", f"File not found:\n{path}")
 
     def reload_all(self):
-        for name, path in self.paths.items():
-            self.edits[name].setPlainText(get_text(path))
+        for name, topic in self.topics.items():
+            self.edits[name].setPlainText(Bus.get(topic))
 
     def save_all(self):
-        for name, path in self.paths.items():
-            set_text(path, self.edits[name].toPlainText())
-        QMessageBox.information(self, "Saved", "All files saved.")
+        for name, topic in self.topics.items():
+            Bus.publish(topic, self.edits[name].toPlainText())
+        QMessageBox.information(self, "Saved", "All values published.")
 
 # =========================
 #   PAGE: SETTINGS
@@ -712,13 +817,16 @@ class MainWindow(QMainWindow):
 #   ENTRY
 # =========================
 
-def GraphicalUserInterface():
+def GraphicalUserInterface(on_shown=None):
     app = QApplication(sys.argv)
     # store QApplication reference globally if SettingsPage accesses it
     global qApp
     qApp = app
     mw = MainWindow()
     mw.show()
+    # fires once the event loop has painted the first frame
+    if on_shown:
+        QTimer.singleShot(0, on_shown)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
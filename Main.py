@@ -1,6 +1,9 @@
 # ========================
 # Imports
 # ========================
+# Only the GUI is imported eagerly; backends load lazily (see Startup below).
+from time import perf_counter
+StartupBegan = perf_counter()
 from Frontend.GUI import (
     GraphicalUserInterface,
     SetAssistantStatus,
@@ -10,67 +13,85 @@ from Frontend.GUI import (
     AnswerModifier,
     QueryModifier,
     GetMicrophoneStatus,
-    GetAssistantStatus
+    GetAssistantStatus,
+    WaitForMicrophoneStatus,
+    AppendToResponses,
+    StreamToResponses,
+    ReplaceResponsesTail
 )
-from Backend.Model import FirstLayerDMM
-from Backend.RealtimesearchEngine import RealtimeSearchEngine
-from Backend.Automation import Automation
-from Backend.SpeechToText import SpeechRecognition
-from Backend.Chatbot import ChatBot
-from Backend.TextTospeech import TextToSpeech
-from dotenv import dotenv_values
+from Backend.Startup import LazyFunction, LazyObject, Record, WarmUp, WarmUpInBackground, PrintImportTimes
+from Backend.Tracing import NewTurn, Traced
+from Backend.Dispatcher import TaskGraph
+from Backend.Streaming import StartStream, Sentences, AnswerStream, WithFallback, FallbackAnswer
+from Backend.ChatStore import Store, AsMessages
+from Backend.Transcript import TranscriptRenderer
+from Backend.Config import env_vars
+Record("Frontend.GUI", perf_counter() - StartupBegan)
+
+FirstLayerDMM = LazyFunction("Backend.Model", "FirstLayerDMM")
+RealtimeSearchStream = LazyFunction("Backend.RealtimesearchEngine", "RealtimeSearchStream")
+Automation = LazyFunction("Backend.Automation", "Automation")
+SpeechRecognition = LazyFunction("Backend.SpeechToText", "SpeechRecognition")
+ChatBot = LazyFunction("Backend.Chatbot", "ChatBot")
+ChatBotStream = LazyFunction("Backend.Chatbot", "ChatBotStream")
+ChatBotRetryStream = LazyFunction("Backend.Chatbot", "ChatBotRetryStream")
+TextToSpeechStream = LazyFunction("Backend.TextTospeech", "TextToSpeechStream")
+SpeculativeTurn = LazyFunction("Backend.Speculation", "SpeculativeTurn")
+ImageWorker = LazyObject("Backend.ImageWorker", "Worker")
+Context = LazyObject("Backend.ContextWindow", "Context")
+Answers = LazyObject("Backend.AnswerCache", "Answers")
 from asyncio import run
-from time import sleep
-import subprocess
 import threading
-import json
 import os
 
 # ========================
 # Environment Setup
 # ========================
-env_vars = dotenv_values(r"c:\Users\user\Desktop\jervisai\.env")
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
+SpeculativeMode = env_vars.get("SpeculativeMode", "True") == "True"
+LazyStartup = env_vars.get("LazyStartup", "True") == "True"
 DefaultMessage = f"""{Username} : Hello {Assistantname}, How are you?
 {Assistantname}: Welcome {Username}. I am doing well. How may I help you?"""
 
-subprocesses = []
 Functions = ["open", "close", "play", "system", "content", "google search", "youtube search"]
 
+# Backends needed on nearly every turn; Chrome and the pooled SDK connections are warmed
+# in the background. Automation and image generation load on first dispatch.
+WarmModules = [
+    "Backend.SpeechToText",
+    "Backend.LLMClient",
+    "Backend.Model",
+    "Backend.Memory",
+    "Backend.AnswerCache",
+    "Backend.Chatbot",
+    "Backend.RealtimesearchEngine",
+    "Backend.PageFetcher",
+    "Backend.Speculation",
+    "Backend.TextTospeech",
+]
+OnDemandModules = ["Backend.Automation", "Backend.ImageWorker"]
+
+# Seconds each kind of dispatched task may take before the turn moves on
+TaskTimeouts = {"automation": 30, "image": 10, "answer": 90, "speech": 180}
+ScreenFlushInterval = 0.05  # seconds between GUI updates while an answer streams
+
 # ========================
 # Utility Functions
 # ========================
 def ShowDefaultIfNoChats():
-    with open(TempDirectoryPath('Responses.data'), 'w', encoding='utf-8') as file:
-        file.write(DefaultMessage)
+    ShowTextToScreen(DefaultMessage)
 
-def ReadChatLogJson():
-    with open(r'Data\ChatLog.json', 'r', encoding='utf-8') as file:
-        chatlog_data = json.load(file)
-    return chatlog_data
+def ReadChatLog():
+    return AsMessages(Store.AllTurns())
+
+# Database.data mirrors the chat store; only turns added since the last
+# update are formatted and appended.
+Transcript = TranscriptRenderer(Store, TempDirectoryPath('Database.data'),
+                                {"user": Username, "assistant": Assistantname})
 
 def ChatLogIntegration():
-    json_data = ReadChatLogJson()
-    formatted_chatlog = ""
-    for entry in json_data:
-        if entry["role"] == "user":
-            formatted_chatlog += f"User: {entry['content']}\n"
-        elif entry["role"] == "assistant":
-            formatted_chatlog += f"Assistant: {entry['content']}\n"
-    formatted_chatlog = formatted_chatlog.replace("User", Username + " ")
-    formatted_chatlog = formatted_chatlog.replace("Assistant", Assistantname + " ")
-
-    with open(TempDirectoryPath('Database.data'), 'w', encoding='utf-8') as file:
-        file.write(AnswerModifier(formatted_chatlog))
-
-def ShowChatsOnGUI():
-    with open(TempDirectoryPath('Database.data'), "r", encoding="utf-8") as file:
-        data = file.read()
-    if len(str(data)) > 0:
-        lines = data.split('\n')
-        result = '\n'.join(lines)
-        file.close()
+    Transcript.Update()
 
 # ========================
 # Main Execution Flow
@@ -78,64 +99,138 @@ def ShowChatsOnGUI():
 def InitialExecution():
     ShowDefaultIfNoChats()
     ChatLogIntegration()
-    ShowChatsOnGUI()
 
-def MainExecution():
-    TaskExecution = False
-    ImageExecution = False
-    ImageGenerationQuery = ""
+def AnswerTask(Kind, QueryFinal, History, Speculation=None, Topics=None):
+    """ Start one general/realtime answer, reusing matching speculative work.
+    Returns an AnswerStream; the realtime stream saves itself when it ends.
+    Topics are the realtime questions answered together in QueryFinal.
+    A failed answer is retried (general) or replaced by FallbackAnswer, so
+    the screen and TTS never stay silent. """
+    Prepared = Speculation.Commit(Kind, QueryFinal) if Speculation else None
+    if Kind == "realtime":
+        SetAssistantStatus("Searching...")
+        return StartStream(lambda: WithFallback(RealtimeSearchStream(QueryFinal, Prepared, Topics), fallback=FallbackAnswer))
+    if Prepared is None:
+        Cached = Answers.Get(QueryFinal)  # a repeated question goes straight to the screen and TTS
+        if Cached is not None:
+            return AnswerStream.FromText(Cached)
+        Prepared = StartStream(lambda: WithFallback(ChatBotStream(History + [{"role": "user", "content": QueryFinal}]),
+                                                    retry=lambda: ChatBotRetryStream(QueryFinal), fallback=FallbackAnswer))
+    return Prepared
+
+def ShowStream(Stream):
+    """ Append answer tokens to the chat screen as they arrive, then tidy the answer. """
+    Pending, LastFlush = "", 0.0
+    for Token in Stream:  # failures arrive as FallbackAnswer tokens (see AnswerTask)
+        Pending += Token
+        if perf_counter() - LastFlush >= ScreenFlushInterval:
+            StreamToResponses(Pending)
+            Pending, LastFlush = "", perf_counter()
+    StreamToResponses(Pending)
+    Raw = Stream.Text()
+    Final = AnswerModifier(Raw.replace("</s>", ""))
+    if Final != Raw:
+        ReplaceResponsesTail(Raw, Final)  # same clean-up as the saved answer
+
+def PresentTask(Index, Stream):
+    """ Show and speak one answer while it streams; runs strictly in decision order. """
+    if Index == 0:
+        ShowTextToScreen(f"{Assistantname}: ")
+    else:
+        AppendToResponses(f"{Assistantname}: ")
+    SetAssistantStatus("Answering...")
+    Screen = threading.Thread(target=ShowStream, args=(Stream,), daemon=True)
+    Screen.start()
+    TextToSpeechStream(Sentences(Stream))
+    Screen.join()
+
+def BuildTaskGraph(Decision, Speculation):
+    """ Turn the DMM decision list into a dependency-aware task graph.
+
+    - every automation command is its own task; commands on the same target
+      (e.g. 'open notepad' then 'close notepad') keep their order
+    - image prompts are queued on the image worker
+    - each general intent is answered concurrently as a token stream;
+      general answers use history (recent, summarised and recalled turns)
+      taken before any of this turn's answers is saved, and are appended to
+      the chat store once their stream ends
+    - all realtime intents share one answer, in place of the first: each
+      topic is searched concurrently and the results are merged
+    - answers are shown and spoken in decision order while they stream, each
+      as soon as its first tokens arrive and the previous one is done
+    """
+    Graph = TaskGraph()
+    LastOnTarget = {}
 
+    for i, Command in enumerate(Decision):
+        if Command.startswith("generate"):
+            Graph.Add(f"image:{i}", lambda c=Command: ImageWorker.Submit(c), timeout=TaskTimeouts["image"])
+        elif any(Command.startswith(func) for func in Functions):
+            Target = Command.split(" ", 1)[-1].strip().lower()
+            After = [LastOnTarget[Target]] if Target in LastOnTarget else []
+            LastOnTarget[Target] = f"automation:{i}"
+            Graph.Add(f"automation:{i}", lambda c=Command: run(Automation([c])), after=After,
+                      timeout=TaskTimeouts["automation"])
+
+    Intents = [(Command.split()[0], QueryModifier(" ".join(Command.split()[1:])))
+               for Command in Decision if Command.startswith("general") or Command.startswith("realtime")]
+    # Realtime questions are answered together: one search per topic, run
+    # concurrently, and a single answer over the merged results
+    Realtime = [QueryFinal for Kind, QueryFinal in Intents if Kind == "realtime"]
+    Topics = {}
+    if len(Realtime) > 1:
+        First = Intents.index(("realtime", Realtime[0]))
+        Intents = [Intent for Intent in Intents if Intent[0] != "realtime"]
+        Combined = Realtime[0].rstrip("?.!") + "".join(
+            " and " + Query[:1].lower() + Query[1:].rstrip("?.!") for Query in Realtime[1:]) + "?"
+        Intents.insert(First, ("realtime", Combined))
+        Topics[Combined] = Realtime
+    Matched = next((a for a in Intents if Speculation and Speculation.Matches(*a)), None)
+    if Speculation and Matched is None:
+        Speculation.Cancel()
+    # Histories are taken before any answer of this turn is saved
+    Histories = {QueryFinal: Context.Messages(query=QueryFinal) for Kind, QueryFinal in Intents if Kind == "general"}
+
+    Previous = None
+    for i, (Kind, QueryFinal) in enumerate(Intents):
+        Owner = Speculation if (Kind, QueryFinal) == Matched else None
+        History = Histories.get(QueryFinal)
+        Graph.Add(f"answer:{i}", lambda k=Kind, q=QueryFinal, h=History, s=Owner: AnswerTask(k, q, h, s, Topics.get(q)),
+                  timeout=TaskTimeouts["answer"])
+        if Kind == "general":
+            Graph.Add(f"save:{i}", lambda i=i, q=QueryFinal: ChatBot(q, Graph.Result(f"answer:{i}").Result(TaskTimeouts["answer"])),
+                      needs=[f"answer:{i}"], timeout=TaskTimeouts["answer"])
+        else:
+            # RealtimeSearchStream saves to the chat store itself; wait for it to end
+            Graph.Add(f"save:{i}", lambda i=i: Graph.Result(f"answer:{i}").Result(TaskTimeouts["answer"]),
+                      needs=[f"answer:{i}"], timeout=TaskTimeouts["answer"])
+        Graph.Add(f"present:{i}", lambda i=i: PresentTask(i, Graph.Result(f"answer:{i}")),
+                  needs=[f"answer:{i}"], after=[Previous] if Previous else [], timeout=TaskTimeouts["speech"])
+        Previous = f"present:{i}"
+
+    return Graph
+
+@Traced("turn")
+def MainExecution():
     SetAssistantStatus("Listening...")
     Query = SpeechRecognition()
     ShowTextToScreen(f"{Username}: {Query}")
     SetAssistantStatus("Thinking...")
+    # Start the likely answer path while the DMM decides
+    Speculation = SpeculativeTurn(QueryModifier(Query)) if SpeculativeMode else None
     Decision = FirstLayerDMM(Query)
 
     print(f"\nDecision: {Decision}\n")
 
-    # General / Realtime check
-    G = any([i for i in Decision if i.startswith("general")])
-    R = any([i for i in Decision if i.startswith("realtime")])
-
-    Mearged_query = " and ".join(
-        [" ".join(i.split()[1:]) for i in Decision if i.startswith("general") or i.startswith("realtime")]
-    )
-
-    # Image generation
-    for queries in Decision:
-        if "generate" in queries:
-            ImageGenerationQuery = str(queries)
-            ImageExecution = True
-
-    # Task execution
-    for queries in Decision:
-        if TaskExecution == False:
-            if any(queries.startswith(func) for func in Functions):
-                run(Automation(list(Decision)))
-                TaskExecution = True
-
-    if ImageExecution:
-        with open(r"Frontend\Files\ImageGeneration.data", "w") as file:
-            file.write(f"{ImageGenerationQuery},True")
-        try:
-            p1 = subprocess.Popen(
-                ['python', r'Backend\ImageGeneration.py'],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE, shell=False
-            )
-            subprocesses.append(p1)
-        except Exception as e:
-            print(f"Error starting ImageGeneration.py: {e}")
-
-    if G and R or R:
-        SetAssistantStatus("Searching...")
-        Answer = RealtimeSearchEngine(QueryModifier(Mearged_query))
-        ShowTextToScreen(f"{Assistantname}: {Answer}")
+    # Automation, images, answers and speech run concurrently where safe
+    BuildTaskGraph(Decision, Speculation).Run()
+    ChatLogIntegration()
+
+    if any(i.startswith("exit") for i in Decision):
         SetAssistantStatus("Answering...")
-        TextToSpeech(Answer)
-        return True
+        os._exit(1)
 
-    SetAssistantStatus("Answering...")
-    os._exit(1)
+    return True
 
 # ========================
 # Threading
@@ -144,18 +239,25 @@ def FirstThread():
     while True:
         CurrentStatus = GetMicrophoneStatus()
         if CurrentStatus == "True":
+            NewTurn()
             MainExecution()
         else:
             AIStatus = GetAssistantStatus()
-            if "Available" in AIStatus:
-                sleep(0.1)
-            else:
+            if "Available" not in AIStatus:
                 SetAssistantStatus("Available...")
+            # Sleep until the mic is toggled instead of polling its state.
+            WaitForMicrophoneStatus("True")
 
 def SecondThread():
-    GraphicalUserInterface()
+    GraphicalUserInterface(on_shown=lambda: Record("window shown", perf_counter() - StartupBegan))
 
 if __name__ == "__main__":
+    if LazyStartup:
+        WarmUpInBackground(WarmModules, on_done=PrintImportTimes)
+    else:
+        WarmUp(WarmModules + OnDemandModules)
+        PrintImportTimes()
+    ChatLogIntegration()  # catch the transcript up with turns saved since the last run
     thread2 = threading.Thread(target=FirstThread, daemon=True)
     thread2.start()
     SecondThread()
\ No newline at end of file